@@ -0,0 +1,151 @@
+""" This module provide a workflow state storing execution
+metadata in arrays indexed by ids.
+
+Execution ids stored on vertices and ports must be positive
+integers, e.g. the ones produced by EvaluationEnvironment.
+This backend requires numpy.
+"""
+
+import numpy as np
+
+from state import WorkflowState
+
+# marker for ids without entry
+ABSENT = -2
+# marker for entries whose value is None, e.g. never evaluated
+NONE = -1
+
+
+class ExecArray(object):
+    """ Mapping from integer ids to execution ids stored in
+    an array.
+
+    Array is shared with the parent mapping and copied on
+    first write.
+    """
+    def __init__(self, parent=None):
+        if parent is None:
+            self._values = np.full(0, ABSENT, dtype=np.int64)
+        else:
+            self._values = parent._values
+
+        self._shared = parent is not None
+
+    def values(self):
+        """ Access underlying array, must not be modified.
+
+        return:
+            - (array of int64)
+        """
+        return self._values
+
+    def _own(self, size):
+        values = self._values
+        if len(values) < size:
+            new = np.full(max(size, 2 * len(values)), ABSENT, dtype=np.int64)
+            new[:len(values)] = values
+            self._values = new
+        elif self._shared:
+            self._values = values.copy()
+
+        self._shared = False
+
+    def __getitem__(self, key):
+        if key < 0 or key >= len(self._values):
+            raise KeyError(key)
+
+        val = self._values[key]
+        if val == ABSENT:
+            raise KeyError(key)
+        elif val == NONE:
+            return None
+        else:
+            return int(val)
+
+    def __setitem__(self, key, exec_id):
+        if exec_id is None:
+            exec_id = NONE
+        elif exec_id < 0:
+            raise ValueError("execution ids must be positive: '%s'" % exec_id)
+
+        self._own(key + 1)
+        self._values[key] = exec_id
+
+    def __contains__(self, key):
+        return 0 <= key < len(self._values) and self._values[key] != ABSENT
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        self._values = np.full(0, ABSENT, dtype=np.int64)
+        self._shared = False
+
+    def drop(self, keys):
+        """ Remove entries, missing ones are ignored.
+
+        args:
+            - keys (iter of int): ids to remove
+        """
+        keys = [key for key in keys if key in self]
+        if len(keys) > 0:
+            self._own(len(self._values))
+            self._values[keys] = ABSENT
+
+    def fork(self):
+        """ Find mapping to share with forks.
+
+        Once returned, this mapping must not be modified anymore.
+
+        return:
+            - (ExecArray)
+        """
+        return self
+
+
+class ArrayWorkflowState(WorkflowState):
+    """ Workflow state whose last evaluation of vertices and
+    execution ids of ports are stored in arrays.
+
+    Use it for large portgraphs with dense ids.
+    """
+    def _init_tables(self):
+        WorkflowState._init_tables(self)
+
+        self._when = ExecArray()
+        self._last_evaluation = ExecArray()
+        self._input_when = ExecArray()
+
+    def clear(self):
+        """ Clear state
+        """
+        self._data.clear()
+        self._param.clear()
+        self._when.clear()
+        self._reads.clear()
+
+        # vertices are never evaluated
+        vids = np.array(list(self._portgraph.vertices()), dtype=np.int64)
+        last = self._last_evaluation
+        last.clear()
+        if len(vids) > 0:
+            last._own(vids.max() + 1)
+            last.values()[vids] = NONE
+
+        self._edited = set()
+        self.portgraph_changed()
+
+    def outdated_vertices(self, exec_id):
+        values = self._last_evaluation.values()
+        if exec_id is None:
+            exec_id = NONE
+
+        mask = (values != exec_id) & (values != ABSENT)
+
+        # entries of removed vertices are kept in array
+        pg = self._portgraph
+        return set(vid for vid in (int(v) for v in np.flatnonzero(mask))
+                   if vid in pg)
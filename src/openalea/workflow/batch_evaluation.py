@@ -0,0 +1,129 @@
+""" This module provide an evaluation algorithm that processes
+many sets of params in a single traversal of the portgraph.
+
+Each param stored on a lonely input port is a sequence of
+values, one for each sample in the batch. After evaluation,
+each output port holds a list of values, one for each sample.
+"""
+
+from evaluation import BruteEvaluation, EvaluationError
+
+
+def transpose(values, size):
+    """ Convert a list of batches into a batch of lists.
+    """
+    if len(values) == 0:
+        return [[] for i in range(size)]
+
+    return [list(sample) for sample in zip(*values)]
+
+
+class BatchEvaluation(BruteEvaluation):
+    """ Evaluate each node once for the whole batch.
+
+    Vectorized nodes are called once with the whole batch
+    on each input. Other nodes are called once per sample.
+    """
+    def __init__(self, portgraph):
+        BruteEvaluation.__init__(self, portgraph)
+        self._size = None
+
+    def batch_size(self, state):
+        """ Find number of samples in params of a state.
+
+        args:
+            - state (WorkflowState): state with params
+
+        return:
+            - (int): None if no params are defined
+        """
+        pg = self._portgraph
+        size = None
+        for pid in pg.in_ports():
+            if pg.nb_connections(pid) == 0:
+                nb = len(state.get(pid))
+                if size is None:
+                    size = nb
+                elif nb != size:
+                    msg = "params of port %s mismatch batch size" % str(pid)
+                    raise EvaluationError(msg)
+
+        return size
+
+    def eval(self, env, state, vid=None, size=None):
+        """ Evaluate associated portgraph for each sample.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): must be a ready_to_evaluate state
+            - vid (vid): id of vertex to start the evaluation
+                         if None starts from the leaves of the portgraph
+            - size (int): number of samples, only used if
+                          the portgraph has no params
+        """
+        if not state.is_ready_for_evaluation():
+            raise EvaluationError("state not ready for evaluation")
+
+        self._size = self.batch_size(state)
+        if self._size is None:
+            if size is None:
+                raise EvaluationError("unable to find batch size")
+            self._size = size
+
+        try:
+            return BruteEvaluation.eval(self, env, state, vid)
+        finally:
+            self._size = None
+
+    def eval_node(self, env, state, vid):
+        """ Evaluate a single node for all samples.
+        """
+        pg = self._portgraph
+        node = pg.actor(vid)
+        size = self._size
+
+        if any(node.is_delayed(key) for key in node.inputs()):
+            raise EvaluationError("delayed inputs can not be batched")
+
+        # find input batches
+        inputs = []
+        for key in node.inputs():
+            pid = pg.in_port(vid, key)
+            val = state.get(pid)
+            if pg.nb_connections(pid) > 1:
+                val = transpose(val, size)
+            inputs.append(val)
+
+        # perform computation
+        state.set_last_evaluation(vid, env.current_execution())
+        outputs = tuple(node.outputs())
+        if node.is_vectorized():
+            values = node(inputs)
+        else:
+            values = []
+            for sample in transpose(inputs, size):
+                ret = node(sample)
+                try:
+                    if len(ret) != len(outputs):
+                        msg = "mismatch nb out ports vs. function result"
+                        raise EvaluationError(msg)
+                except TypeError:
+                    msg = "Function needs to return a list of values"
+                    raise EvaluationError(msg)
+                values.append(ret)
+
+            values = transpose(values, len(outputs))
+
+        # affect return batches to output ports
+        try:
+            if len(outputs) != len(values):
+                msg = "mismatch nb out ports vs. function result"
+                raise EvaluationError(msg)
+            else:
+                for key, val in zip(outputs, values):
+                    pid = pg.out_port(vid, key)
+                    state.store(pid, val)
+        except TypeError:
+            msg = "Function needs to return a list of values"
+            raise EvaluationError(msg)
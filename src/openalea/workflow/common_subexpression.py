@@ -0,0 +1,119 @@
+""" This module provide an analysis to find vertices that
+perform the same computation and an evaluation algorithm
+that evaluates only one of them.
+
+Two vertices are equivalent if their actors are pure, perform
+the same computation and their inputs are either connected to
+equivalent sources or receive the same params.
+"""
+
+from evaluation import evaluation_order, LazyEvaluation
+from func_node import RawFuncNode
+
+
+def param_key(value):
+    """ Construct a hashable key for a param.
+
+    Unhashable values are compared by identity.
+    """
+    try:
+        hash(value)
+        return ('value', type(value), value)
+    except TypeError:
+        return ('id', id(value))
+
+
+def actor_key(actor):
+    """ Construct a key identifying the computation performed
+    by an actor.
+
+    Many actors share the same id, e.g. closures or nodes
+    wrapping other actors. Hence function nodes are identified
+    by their function and other actors by themselves.
+    """
+    if isinstance(actor, RawFuncNode):
+        return actor.get_id(), id(actor._func)
+
+    return actor.get_id(), id(actor)
+
+
+def find_equivalent_vertices(portgraph, state):
+    """ Find pure vertices that perform the same computation.
+
+    args:
+        - portgraph (PortGraph): portgraph to analyse
+        - state (WorkflowState): state holding params
+
+    return:
+        - (dict of vid: vid): for each vertex that is equivalent to
+                              another one, id of the representative
+                              vertex that will actually be evaluated
+    """
+    pg = portgraph
+    reps = {}
+    signatures = {}
+
+    for vid in evaluation_order(pg):
+        actor = pg.actor(vid)
+        if not actor.is_pure():
+            continue
+
+        sig = [actor_key(actor)]
+        for key in actor.inputs():
+            pid = pg.in_port(vid, key)
+            npids = sorted(pg.connected_ports(pid))
+            if len(npids) == 0:
+                try:
+                    sig.append(param_key(state.get(pid)))
+                except KeyError:
+                    sig.append(('pid', pid))
+            else:
+                sig.append(tuple((reps.get(pg.vertex(npid), pg.vertex(npid)),
+                                  pg.local_id(npid)) for npid in npids))
+
+        sig = tuple(sig)
+        if sig in signatures:
+            reps[vid] = signatures[sig]
+        else:
+            signatures[sig] = vid
+
+    return reps
+
+
+class CSEEvaluation(LazyEvaluation):
+    """ Lazy evaluation that evaluates a single representative
+    for each group of equivalent vertices. Outputs of other
+    vertices of the group are aliases of the outputs of the
+    representative.
+    """
+    def __init__(self, portgraph):
+        LazyEvaluation.__init__(self, portgraph)
+        self._reps = {}
+
+    def eval(self, env, state, vid=None):
+        self._reps = find_equivalent_vertices(self._portgraph, state)
+        try:
+            return LazyEvaluation.eval(self, env, state, vid)
+        finally:
+            self._reps = {}
+
+    def eval_node(self, env, state, vid):
+        """ Evaluate a single node
+
+        If node is equivalent to another one, evaluate
+        the representative instead and alias its outputs.
+        """
+        try:
+            rep = self._reps[vid]
+        except KeyError:
+            return LazyEvaluation.eval_node(self, env, state, vid)
+
+        if state.last_evaluation(rep) != env.current_execution():
+            self.eval_from_node(env, state, rep)
+
+        pg = self._portgraph
+        for key in pg.actor(vid).outputs():
+            val = state.get(pg.out_port(rep, key))
+            state.store(pg.out_port(vid, key), val)
+
+        state.set_last_evaluation(vid, state.last_evaluation(rep))
@@ -0,0 +1,240 @@
+""" This module provide a way to compile a portgraph into
+a single python function.
+
+The generated function calls each actor in evaluation order
+and exchange data through local variables. Hence it bypasses
+WorkflowState and evaluation algorithms entirely.
+"""
+
+from evaluation import evaluation_order
+from func_node import FuncNode
+from node import Node
+
+# code objects already generated, indexed by their source
+_code_cache = {}
+
+
+def default_inputs(portgraph):
+    """ Find ports exposed as inputs by default, i.e.
+    all lonely input ports.
+
+    args:
+        - portgraph (PortGraph): portgraph to consider
+
+    return:
+        - (list of (key, pid)): key is the global pid itself
+    """
+    pg = portgraph
+    return [(pid, pid) for pid in sorted(pg.in_ports())
+            if pg.nb_connections(pid) == 0]
+
+
+def default_outputs(portgraph):
+    """ Find ports exposed as outputs by default, i.e.
+    all output ports not connected to anything.
+
+    args:
+        - portgraph (PortGraph): portgraph to consider
+
+    return:
+        - (list of (key, pid)): key is the global pid itself
+    """
+    pg = portgraph
+    return [(pid, pid) for pid in sorted(pg.out_ports())
+            if pg.nb_connections(pid) == 0]
+
+
+def input_default(node, key):
+    """ Find value used for a lonely input port that is
+    not exposed.
+
+    args:
+        - node (Node): actor owning the port
+        - key (str): id of input port
+
+    return:
+        - (any): default value of the input
+    """
+    default = node.input(key).default
+    if (default is None and isinstance(node, FuncNode) and
+            not node.has_default(key)):
+        msg = "input '%s' of %s has no default value" % (key, node.get_id())
+        raise UserWarning(msg)
+
+    return default
+
+
+def generate_source(portgraph, inputs, outputs, name="compiled_workflow"):
+    """ Generate python code of a function equivalent
+    to the evaluation of the portgraph.
+
+    args:
+        - portgraph (PortGraph): portgraph to compile
+        - inputs (list of (key, pid)): lonely input ports
+                    that will become arguments of the function
+        - outputs (list of (key, pid)): output ports whose values
+                    will be returned by the function
+        - name (str): name of the generated function
+
+    return:
+        - (str, dict): python source and namespace needed to
+                       execute this code
+    """
+    pg = portgraph
+    namespace = {}
+    names = {}  # pid: name of local variable holding its value
+
+    args = []
+    for i, (key, pid) in enumerate(inputs):
+        if not pg.is_in_port(pid) or pg.nb_connections(pid) > 0:
+            msg = "port %s is not a lonely input port" % str(pid)
+            raise UserWarning(msg)
+
+        names[pid] = "i%d" % i
+        args.append(names[pid])
+
+    lines = ["def %s(%s):" % (name, ", ".join(args))]
+
+    for vid in evaluation_order(pg):
+        node = pg.actor(vid)
+        if node.is_streaming():
+            raise UserWarning("streaming nodes can not be compiled")
+
+        if any(node.is_delayed(key) for key in node.inputs()):
+            raise UserWarning("nodes with delayed inputs can not be compiled")
+
+        aname = "a%d" % len(namespace)
+
+        # find input values
+        params = []
+        for key in node.inputs():
+            pid = pg.in_port(vid, key)
+            npids = sorted(pg.connected_ports(pid))
+            if len(npids) == 0:
+                if pid not in names:
+                    # lonely input port not exposed, use default value
+                    dname = "d%d" % len(namespace)
+                    namespace[dname] = input_default(node, key)
+                    names[pid] = dname
+                params.append(names[pid])
+            elif len(npids) == 1:
+                params.append(names[npids[0]])
+            else:
+                params.append("[%s]" % ", ".join(names[npid]
+                                                 for npid in npids))
+
+        # name outputs
+        rets = []
+        for key in node.outputs():
+            pid = pg.out_port(vid, key)
+            names[pid] = "v%d" % len(names)
+            rets.append(names[pid])
+
+        # call actor, FuncNode functions are called directly
+        if isinstance(node, FuncNode):
+            namespace[aname] = node._func
+            call = "%s(%s)" % (aname, ", ".join(params))
+            if node._output_type == 'None':
+                lines.append("    %s" % call)
+            elif node._output_type == 'single':
+                lines.append("    %s = %s" % (rets[0], call))
+            else:
+                lines.append("    %s, = %s" % (", ".join(rets), call))
+        else:
+            namespace[aname] = node
+            call = "%s([%s])" % (aname, ", ".join(params))
+            if len(rets) == 0:
+                lines.append("    %s" % call)
+            else:
+                lines.append("    %s, = %s" % (", ".join(rets), call))
+
+    rets = [names[opid] for key, opid in outputs]
+    lines.append("    return (%s)" % "".join("%s, " % ret for ret in rets))
+
+    return "\n".join(lines) + "\n", namespace
+
+
+def compile_portgraph(portgraph, inputs=None, outputs=None,
+                      name="compiled_workflow"):
+    """ Compile a portgraph into a single python function.
+
+    args:
+        - portgraph (PortGraph): portgraph to compile
+        - inputs (list of (key, pid)): lonely input ports
+                    that will become arguments of the function.
+                    If None, use all lonely input ports.
+        - outputs (list of (key, pid)): output ports whose values
+                    will be returned by the function.
+                    If None, use all non connected output ports.
+        - name (str): name of the generated function
+
+    return:
+        - (function): return a tuple of values, one for each output
+    """
+    if inputs is None:
+        inputs = default_inputs(portgraph)
+    if outputs is None:
+        outputs = default_outputs(portgraph)
+
+    src, namespace = generate_source(portgraph, inputs, outputs, name)
+    try:
+        code = _code_cache[src]
+    except KeyError:
+        code = compile(src, "<%s>" % name, "exec")
+        _code_cache[src] = code
+
+    exec code in namespace
+    func = namespace[name]
+    func.__source__ = src
+    return func
+
+
+class CompiledNode(Node):
+    """ A node whose computation is performed by a compiled
+    version of a portgraph.
+    """
+    _id = "openalea.workflow.compiled_node:CompiledNode"
+
+    def __init__(self, portgraph, inputs=None, outputs=None):
+        """ Constructor
+
+        args:
+            - portgraph (PortGraph): portgraph to compile
+            - inputs (list of (key, pid)): lonely input ports
+                    exposed as inputs of this node.
+                    If None, use all lonely input ports.
+            - outputs (list of (key, pid)): output ports exposed
+                    as outputs of this node.
+                    If None, use all non connected output ports.
+        """
+        Node.__init__(self)
+
+        if inputs is None:
+            inputs = default_inputs(portgraph)
+        if outputs is None:
+            outputs = default_outputs(portgraph)
+
+        for key, pid in inputs:
+            self.add_input(key)
+
+        for key, pid in outputs:
+            self.add_output(key)
+
+        self._lazy = all(portgraph.actor(vid).is_lazy()
+                         for vid in portgraph.vertices())
+
+        self._func = compile_portgraph(portgraph, inputs, outputs)
+
+    def source(self):
+        """ Retrieve python code generated for this node.
+
+        Return:
+          - (str)
+        """
+        return self._func.__source__
+
+    def __call__(self, inputs=()):
+        return self._func(*inputs)
+
+    def reset(self):
+        pass
@@ -0,0 +1,224 @@
+""" CompositeNode class
+
+A CompositeNode is a Node whose computation is performed
+by the evaluation of a whole portgraph.
+"""
+
+from compiled_node import default_inputs, default_outputs, input_default
+from evaluation import LazyEvaluation
+from evaluation_environment import EvaluationEnvironment
+from node import Node
+from state import WorkflowState
+
+
+class CompositeNode(Node):
+    """ Wrap a portgraph to use it as the actor of a single vertex.
+    """
+    _id = "openalea.workflow.composite_node:CompositeNode"
+
+    def __init__(self, portgraph, inputs=None, outputs=None):
+        """ Constructor
+
+        args:
+            - portgraph (PortGraph): inner portgraph
+            - inputs (list of (key, pid)): lonely input ports of
+                    the inner portgraph exposed as inputs of this node.
+                    If None, use all lonely input ports.
+            - outputs (list of (key, pid)): output ports of the inner
+                    portgraph exposed as outputs of this node.
+                    If None, use all non connected output ports.
+        """
+        Node.__init__(self)
+
+        if inputs is None:
+            inputs = default_inputs(portgraph)
+        if outputs is None:
+            outputs = default_outputs(portgraph)
+
+        self._portgraph = portgraph
+        self._input_pids = {}
+        self._output_pids = {}
+
+        for key, pid in inputs:
+            if not portgraph.is_in_port(pid):
+                msg = "port %s is not an input port" % str(pid)
+                raise UserWarning(msg)
+            if portgraph.nb_connections(pid) > 0:
+                msg = "port %s is already connected" % str(pid)
+                raise UserWarning(msg)
+
+            self.add_input(key)
+            self._input_pids[key] = pid
+
+        for key, pid in outputs:
+            if not portgraph.is_out_port(pid):
+                msg = "port %s is not an output port" % str(pid)
+                raise UserWarning(msg)
+
+            self.add_output(key)
+            self._output_pids[key] = pid
+
+        self._lazy = all(portgraph.actor(vid).is_lazy()
+                         for vid in portgraph.vertices())
+
+        self._env = EvaluationEnvironment()
+        self._state = WorkflowState(portgraph)
+        self._algo = LazyEvaluation(portgraph)
+        self._store_defaults()
+
+    def portgraph(self):
+        """ Retrieve inner portgraph.
+
+        Return:
+          - (PortGraph)
+        """
+        return self._portgraph
+
+    def input_pid(self, key):
+        """ Find port of inner portgraph associated to an input.
+
+        args:
+          - key (str): id of input port of this node
+
+        returns:
+          - (pid): global id of port in inner portgraph
+        """
+        return self._input_pids[key]
+
+    def output_pid(self, key):
+        """ Find port of inner portgraph associated to an output.
+
+        args:
+          - key (str): id of output port of this node
+
+        returns:
+          - (pid): global id of port in inner portgraph
+        """
+        return self._output_pids[key]
+
+    def __call__(self, inputs=()):
+        pg = self._portgraph
+        ws = self._state
+        exec_id = self._env.new_execution()
+
+        for key, val in zip(self.inputs(), inputs):
+            ws.store_param(self._input_pids[key], val, exec_id)
+
+        # evaluate only nodes upstream of exposed outputs
+        for pid in self._output_pids.values():
+            self._algo.eval(self._env, ws, pg.vertex(pid))
+
+        return tuple(ws.get(self._output_pids[key])
+                     for key in self.outputs())
+
+    def hidden_params(self):
+        """ Find default values of lonely ports of inner
+        portgraph that are not exposed.
+
+        Ports without default value are not returned, they
+        must be exposed for this node to be evaluated.
+
+        return:
+            - (dict of pid: any)
+        """
+        pg = self._portgraph
+        exposed = set(self._input_pids.values())
+        params = {}
+        for pid in pg.in_ports():
+            if pid not in exposed and pg.nb_connections(pid) == 0:
+                actor = pg.actor(pg.vertex(pid))
+                try:
+                    params[pid] = input_default(actor, pg.local_id(pid))
+                except UserWarning:
+                    pass
+
+        return params
+
+    def _store_defaults(self):
+        """ Lonely ports of inner portgraph not exposed
+        use default value of their actor.
+        """
+        exec_id = self._env.current_execution()
+        for pid, default in self.hidden_params().items():
+            self._state.store_param(pid, default, exec_id)
+
+    def reset(self):
+        self._env.clear()
+        self._state.clear()
+        self._store_defaults()
+
+
+def flatten(portgraph):
+    """ Inline all composite nodes of a portgraph.
+
+    Vertices of inner portgraphs are copied into the portgraph
+    and connected to the neighbors of the composite vertex which
+    is then removed. Nested composites are inlined recursively.
+
+    Warnings: lonely input ports of inner portgraphs that were
+    not exposed become lonely input ports of the portgraph and
+    need a param. Their default values are returned, ports without
+    default are left out. Priority of fan-in connections on ports
+    downstream of a composite follows the new pids.
+
+    args:
+        - portgraph (PortGraph): portgraph to modify in place
+
+    return:
+        - (dict of vid: dict of vid: vid, dict of pid: any): for each
+                       composite vertex that was removed, map between
+                       vertices of its inner portgraph and new vertices.
+                       Default values of new lonely input ports.
+    """
+    pg = portgraph
+    inlined = {}
+    params = {}
+
+    front = [vid for vid in pg.vertices()
+             if isinstance(pg.actor(vid), CompositeNode)]
+    while len(front) > 0:
+        cvid = front.pop(0)
+        composite = pg.actor(cvid)
+        inner = composite.portgraph()
+
+        # copy inner vertices
+        trans = {}
+        for vid in inner.vertices():
+            trans[vid] = pg.add_actor(inner.actor(vid))
+            if isinstance(inner.actor(vid), CompositeNode):
+                front.append(trans[vid])
+
+        def new_pid(pid):
+            vid = trans[inner.vertex(pid)]
+            if inner.is_in_port(pid):
+                return pg.in_port(vid, inner.local_id(pid))
+            else:
+                return pg.out_port(vid, inner.local_id(pid))
+
+        # copy inner edges
+        for eid in inner.edges():
+            pg.connect(new_pid(inner.source_port(eid)),
+                       new_pid(inner.target_port(eid)))
+
+        # hidden ports of inner portgraph become new lonely ports
+        for pid, default in composite.hidden_params().items():
+            params[new_pid(pid)] = default
+
+        # reconnect neighbors of composite vertex
+        for key in composite.inputs():
+            pid = new_pid(composite.input_pid(key))
+            cpid = pg.in_port(cvid, key)
+            if cpid in params:
+                params[pid] = params.pop(cpid)
+            for spid in list(pg.connected_ports(pg.in_port(cvid, key))):
+                pg.connect(spid, pid)
+
+        for key in composite.outputs():
+            pid = new_pid(composite.output_pid(key))
+            for tpid in list(pg.connected_ports(pg.out_port(cvid, key))):
+                pg.connect(pid, tpid)
+
+        pg.remove_vertex(cvid)
+        inlined[cvid] = trans
+
+    return inlined, params
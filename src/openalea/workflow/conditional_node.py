@@ -0,0 +1,81 @@
+""" This module provide nodes that select one value among
+many alternatives.
+
+Alternatives are received on delayed ports such that
+only the selected branch of the workflow is evaluated.
+"""
+
+from node import Node
+
+
+class IfNode(Node):
+    """ Select a value according to a condition.
+
+    Inputs are 'cond', 'if_true' and 'if_false'. Output
+    'res' holds the value of 'if_true' if cond is True,
+    else the value of 'if_false'.
+    """
+    _id = "openalea.workflow.conditional_node:IfNode"
+
+    def __init__(self):
+        Node.__init__(self)
+
+        self.add_input('cond', 'bool', False)
+        self.add_input('if_true')
+        self.add_input('if_false')
+        self.add_output('res')
+
+        self.set_delayed('if_true', True)
+        self.set_delayed('if_false', True)
+        self._pure = True
+
+    def __call__(self, inputs=()):
+        cond, if_true, if_false = inputs
+        if cond:
+            return if_true(),
+        else:
+            return if_false(),
+
+    def reset(self):
+        pass
+
+
+class SwitchNode(Node):
+    """ Select a value among cases according to a key.
+
+    Inputs are 'key' followed by one input for each case.
+    Output 'res' holds the value of the case whose name
+    is equal to key.
+    """
+    _id = "openalea.workflow.conditional_node:SwitchNode"
+
+    def __init__(self, cases):
+        """ Constructor
+
+        args:
+            - cases (list of str): name of each case
+        """
+        Node.__init__(self)
+
+        self.add_input('key', 'str')
+        for case in cases:
+            if case == 'key':
+                raise KeyError("Input 'key' already exists")
+            self.add_input(case)
+            self.set_delayed(case, True)
+
+        self.add_output('res')
+        self._pure = True
+
+    def __call__(self, inputs=()):
+        key = inputs[0]
+        cases = dict(zip(tuple(self.inputs())[1:], inputs[1:]))
+        try:
+            thunk = cases[key]
+        except KeyError:
+            raise KeyError("no case '%s'" % key)
+
+        return thunk(),
+
+    def reset(self):
+        pass
@@ -0,0 +1,146 @@
+""" This module provide an evaluation algorithm that folds
+parts of a portgraph that depend only on params.
+
+Such vertices are evaluated once each time one of their params
+changes and are frozen afterward, i.e. subsequent evaluations
+do not visit them at all.
+"""
+
+from evaluation import EvaluationError, evaluation_order, LazyEvaluation
+
+
+def find_param_only_vertices(portgraph):
+    """ Find vertices whose inputs are all lonely input ports
+    or connected to other such vertices.
+
+    Only vertices whose actor is lazy or pure are considered.
+
+    args:
+        - portgraph (PortGraph): portgraph to analyse
+
+    return:
+        - (list of vid): in evaluation order
+    """
+    pg = portgraph
+    cone = set()
+    order = []
+    for vid in evaluation_order(pg):
+        actor = pg.actor(vid)
+        if not (actor.is_lazy() or actor.is_pure()):
+            continue
+
+        if all(nid in cone for nid in pg.in_neighbors(vid)):
+            cone.add(vid)
+            order.append(vid)
+
+    return order
+
+
+def param_dependencies(portgraph, vids):
+    """ Find vertices impacted by each param.
+
+    args:
+        - portgraph (PortGraph): portgraph to analyse
+        - vids (set of vid): vertices to consider
+
+    return:
+        - (dict of pid: set of vid): for each lonely input port of
+                       a vertex in vids, vertices of vids downstream
+    """
+    pg = portgraph
+    deps = {}
+    for vid in vids:
+        for pid in pg.in_ports(vid):
+            if pg.nb_connections(pid) > 0:
+                continue
+
+            downstream = set()
+            front = [vid]
+            while len(front) > 0:
+                nid = front.pop()
+                if nid not in downstream:
+                    downstream.add(nid)
+                    front.extend(n for n in pg.out_neighbors(nid)
+                                 if n in vids)
+
+            deps[pid] = downstream
+
+    return deps
+
+
+class FoldingEvaluation(LazyEvaluation):
+    """ Lazy evaluation that freezes vertices depending only
+    on params. Frozen vertices are skipped entirely until one
+    of their params is modified.
+    """
+    def __init__(self, portgraph):
+        LazyEvaluation.__init__(self, portgraph)
+
+        self._cone = find_param_only_vertices(portgraph)
+        self._params = param_dependencies(portgraph, set(self._cone))
+
+        self._state = None
+        self._frozen = set()
+        self._snapshot = {}
+
+    def frozen(self):
+        """ Set of vertices currently frozen.
+
+        return:
+            - (set of vid)
+        """
+        return set(self._frozen)
+
+    def unfreeze(self):
+        """ Force all vertices to be evaluated again at next fold.
+        """
+        self._frozen.clear()
+        self._snapshot.clear()
+
+    def fold(self, env, state):
+        """ Evaluate param only vertices whose params changed since
+        last fold and freeze them.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): must be a ready_to_evaluate state
+        """
+        if state is not self._state:
+            self.unfreeze()
+            self._state = state
+        elif len(self._frozen) > 0:
+            # check state has not been cleared since last fold
+            vid = next(iter(self._frozen))
+            if state.last_evaluation(vid) is None:
+                self.unfreeze()
+
+        for pid, vids in self._params.items():
+            when = state.when(pid)
+            if pid not in self._snapshot or self._snapshot[pid] != when:
+                self._frozen.difference_update(vids)
+                self._snapshot[pid] = when
+
+        for vid in self._cone:
+            if vid not in self._frozen:
+                self.eval_from_node(env, state, vid)
+                self._frozen.add(vid)
+
+    def skipped_vertices(self, state):
+        if state is self._state:
+            return set(self._frozen)
+
+        return set()
+
+    def eval(self, env, state, vid=None):
+        if not state.is_ready_for_evaluation():
+            raise EvaluationError("state not ready for evaluation")
+
+        self.fold(env, state)
+        return LazyEvaluation.eval(self, env, state, vid)
+
+    def eval_from_node(self, env, state, vid):
+        if vid in self._frozen:
+            return
+
+        return LazyEvaluation.eval_from_node(self, env, state, vid)
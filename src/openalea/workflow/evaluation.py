@@ -8,6 +8,45 @@ class EvaluationError(Exception):
     pass
 
 
+def evaluation_order(portgraph):
+    """ Compute the order in which nodes are evaluated by BruteEvaluation.
+
+    Leaves are visited by decreasing priority and each node
+    is preceded by all the nodes upstream of it.
+
+    args:
+        - portgraph (PortGraph): the portgraph to sort
+
+    return:
+        - (list of vid)
+    """
+    pg = portgraph
+    leaves = [v for v in pg.vertices() if pg.nb_out_edges(v) == 0]
+    leaves = [(pg.actor(v).priority(), v) for v in leaves]
+    leaves.sort(reverse=True)
+
+    order = []
+    visited = set()
+    for priority, leaf in leaves:
+        if leaf in visited:
+            continue
+
+        visited.add(leaf)
+        stack = [(leaf, iter(tuple(pg.in_neighbors(leaf))))]
+        while len(stack) > 0:
+            vid, nids = stack[-1]
+            for nid in nids:
+                if nid not in visited:
+                    visited.add(nid)
+                    stack.append((nid, iter(tuple(pg.in_neighbors(nid)))))
+                    break
+            else:
+                stack.pop()
+                order.append(vid)
+
+    return order
+
+
 class AbstractEvaluation(object):
     """ Abstract evaluation algorithm
     """
@@ -55,30 +94,187 @@ class BruteEvaluation(AbstractEvaluation):
     def __init__(self, portgraph):
         AbstractEvaluation.__init__(self, portgraph)
 
+        # vertices upstream of delayed ports, see guarded_vertices
+        self._guarded = None
+        # evaluation order, see order
+        self._order = None
+        if hasattr(portgraph, 'register_listener'):
+            portgraph.register_listener(self)
+
+    def notify(self, sender, event):
+        """ Forget information cached about the structure of
+        the portgraph after an edition.
+
+        args:
+            - sender (PortGraph): edited portgraph
+            - event (tuple): see PortGraph
+        """
+        self._guarded = None
+        self._order = None
+
+    def order(self):
+        """ Order in which vertices are visited when evaluating
+        the whole portgraph, see evaluation_order.
+
+        Result is cached until the portgraph is edited.
+
+        return:
+            - (list of vid)
+        """
+        if self._order is None:
+            self._order = evaluation_order(self._portgraph)
+
+        return self._order
+
     def requires_evaluation(self, env, state):
         current_eid = env.current_execution()
+        guarded = self.guarded_vertices()
+        skipped = self.skipped_vertices(state)
 
+        stale = set()
         for vid in self._portgraph.vertices():
-            if state.last_evaluation(vid) != current_eid:
+            if vid in skipped or state.last_evaluation(vid) == current_eid:
+                continue
+
+            if vid not in guarded:
+                # evaluated whatever the values read on delayed ports
                 return True
 
-        return False
+            stale.add(vid)
 
-    def eval(self, env, state, vid=None):
+        if len(stale) == 0:
+            return False
+
+        return len(stale & self.reachable_vertices(state)) > 0
+
+    def skipped_vertices(self, state):
+        """ Find vertices never evaluated by this algorithm
+        whatever their last evaluation.
+
+        args:
+         - state (WorkflowState): current state of workflow
+
+        return:
+            - (set of vid)
+        """
+        return set()
+
+    def stale_vertices(self, env, state):
+        """ Find vertices not evaluated during current execution.
+
+        args:
+         - env (EvaluationEnvironment): environment in which to perform
+                                        the evaluation
+         - state (WorkflowState): current state of workflow
+
+        return:
+            - (set of vid)
+        """
+        stale = state.outdated_vertices(env.current_execution())
+        stale -= self.skipped_vertices(state)
+
+        # vertices only connected to delayed ports not read are never
+        # evaluated and do not need to be
+        guarded = stale & self.guarded_vertices()
+        if len(guarded) == 0:
+            return stale
+
+        return (stale - guarded) | (guarded & self.reachable_vertices(state))
+
+    def guarded_vertices(self):
+        """ Find vertices with at least one path downstream
+        going through a delayed port.
+
+        All other vertices are evaluated whatever the values
+        read on delayed ports. Result is cached until the
+        portgraph is edited.
+
+        return:
+            - (set of vid)
+        """
+        if self._guarded is not None:
+            return self._guarded
+
+        pg = self._portgraph
+        front = []
+        for vid in pg.vertices():
+            node = pg.actor(vid)
+            if node is not None:
+                for key in node.inputs():
+                    if node.is_delayed(key):
+                        pid = pg.in_port(vid, key)
+                        front.extend(pg.vertex(npid)
+                                     for npid in pg.connected_ports(pid))
+
+        guarded = set()
+        while len(front) > 0:
+            vid = front.pop()
+            if vid not in guarded:
+                guarded.add(vid)
+                front.extend(pg.in_neighbors(vid))
+
+        self._guarded = guarded
+        return guarded
+
+    def upstream_vertices(self, state, vid):
+        """ Find vertices evaluated to provide inputs of a node.
+
+        Vertices connected to delayed ports are only considered
+        if the node requested their value during its last evaluation.
+
+        args:
+         - state (WorkflowState): current state of workflow
+         - vid (vid): id of vertex
+
+        return:
+            - (list of vid)
+        """
+        pg = self._portgraph
+        node = pg.actor(vid)
+        if node is None or not any(node.is_delayed(key)
+                                   for key in node.inputs()):
+            return list(pg.in_neighbors(vid))
+
+        pids = [pg.in_port(vid, key) for key in node.inputs()
+                if not node.is_delayed(key)]
+        pids.extend(state.delayed_reads(vid))
+        nids = set(pg.vertex(npid)
+                   for pid in pids for npid in pg.connected_ports(pid))
+
+        return [nid for nid in pg.in_neighbors(vid) if nid in nids]
+
+    def reachable_vertices(self, state):
+        """ Find vertices evaluated when evaluating the whole portgraph.
+
+        args:
+         - state (WorkflowState): current state of workflow
+
+        return:
+            - (set of vid)
+        """
         pg = self._portgraph
+        visited = set()
+        front = [vid for vid in pg.vertices() if pg.nb_out_edges(vid) == 0]
+        while len(front) > 0:
+            vid = front.pop()
+            if vid not in visited:
+                visited.add(vid)
+                front.extend(self.upstream_vertices(state, vid))
 
+        return visited
+
+    def eval(self, env, state, vid=None):
         if not state.is_ready_for_evaluation():
             raise EvaluationError("state not ready for evaluation")
 
         current_eid = env.current_execution()
-        if vid is None:  # start evaluation from leaves in the portgraph
-            leaves = [v for v in pg.vertices() if pg.nb_out_edges(v) == 0]
-            leaves = [(pg.actor(v).priority(), v) for v in leaves]
-            leaves.sort(reverse=True)
-            leaves = [v for priority, v in leaves]
-
-            for vid in leaves:
-                if state.last_evaluation(vid) != current_eid:
+        if vid is None:  # evaluate the whole portgraph
+            # vertices upstream of delayed ports are only evaluated
+            # when one of their consumers requests them
+            guarded = self.guarded_vertices()
+            for vid in self.order():
+                if (vid not in guarded and
+                        state.last_evaluation(vid) != current_eid):
                     self.eval_from_node(env, state, vid)
         else:
             if state.last_evaluation(vid) != current_eid:
@@ -90,16 +286,61 @@ class BruteEvaluation(AbstractEvaluation):
         function provided for convenience to simplify
         derivation from this algo
         """
+        pg = self._portgraph
+        node = pg.actor(vid)
         current_eid = env.current_execution()
 
+        # nodes only connected to delayed ports are evaluated on demand
+        delayed = [key for key in node.inputs() if node.is_delayed(key)]
+        if len(delayed) == 0:
+            nids = pg.in_neighbors(vid)
+        else:
+            eager = set()
+            for key in node.inputs():
+                if key not in delayed:
+                    pid = pg.in_port(vid, key)
+                    eager.update(pg.vertex(npid)
+                                 for npid in pg.connected_ports(pid))
+            nids = [nid for nid in pg.in_neighbors(vid) if nid in eager]
+
         # ensure that all nodes upstream of this node have been evaluated
-        for nid in self._portgraph.in_neighbors(vid):
+        for nid in nids:
             if state.last_evaluation(nid) != current_eid:
                 self.eval_from_node(env, state, nid)
 
         # evaluate the node
         self.eval_node(env, state, vid)
 
+    def eval_upstream(self, env, state, pid):
+        """ Evaluate nodes connected to a given input port
+        if not already done in this execution.
+        """
+        pg = self._portgraph
+        current_eid = env.current_execution()
+        for npid in pg.connected_ports(pid):
+            nid = pg.vertex(npid)
+            if state.last_evaluation(nid) != current_eid:
+                self.eval_from_node(env, state, nid)
+
+    def thunk(self, env, state, pid, reads=None):
+        """ Construct a function that evaluates nodes upstream
+        of an input port and returns its value.
+
+        args:
+            - reads (list of pid): if not None, record pid in it
+                                   when the function is called
+
+        return:
+            - (callable)
+        """
+        def func():
+            if reads is not None and pid not in reads:
+                reads.append(pid)
+            self.eval_upstream(env, state, pid)
+            return state.get(pid)
+
+        return func
+
     def eval_node(self, env, state, vid):
         """ Evaluate a single node
 
@@ -112,14 +353,23 @@ class BruteEvaluation(AbstractEvaluation):
 
         # find input values
         # match node input keys to portgraph in ports
+        # delayed ports receive a thunk instead of their value
         inputs = []
+        reads = None
         for key in node.inputs():
             pid = pg.in_port(vid, key)
-            inputs.append(state.get(pid))
+            if node.is_delayed(key):
+                if reads is None:
+                    reads = []
+                inputs.append(self.thunk(env, state, pid, reads))
+            else:
+                inputs.append(state.get(pid))
 
         # perform computation
         state.set_last_evaluation(vid, env.current_execution())
         values = node(inputs)
+        if reads is not None:
+            state.set_delayed_reads(vid, reads)
 
         # affect return values to output ports
         # match node output keys to portgraph out ports
@@ -145,28 +395,165 @@ class LazyEvaluation(BruteEvaluation):
     def __init__(self, portgraph):
         BruteEvaluation.__init__(self, portgraph)
 
+    def evaluation_reason(self, env, state, vid, rerun=(), delayed=True):
+        """ Find why eval_node would call the node.
+
+        Reasons are:
+            - ('never_evaluated', None)
+            - ('other_branch', eid): node was last evaluated during eid
+                                     in another branch of executions
+            - ('not_lazy', None)
+            - ('input_changed', pid): input port modified after last
+                                      evaluation
+            - ('upstream_rerun', pid): input port connected to a node
+                                       that will be evaluated again
+
+        Delayed ports are only checked if the node requested their
+        value during its last evaluation.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): current state of workflow
+            - vid (vid): id of vertex to check
+            - rerun (set of vid): vertices upstream that will be
+                                  evaluated again in this execution
+            - delayed (bool): whether to check delayed ports read
+                              during last evaluation
+
+        return:
+            - (str, any): None if node will not be called
+        """
+        current_eid = env.current_execution()
+        eid = state.last_evaluation(vid)
+        if eid is None:
+            return 'never_evaluated', None
+        elif eid == current_eid:
+            # node has already been evaluated at this execution
+            return None
+        elif env.is_newer(eid, current_eid):
+            return 'other_branch', eid
+
+        pg = self._portgraph
+        node = pg.actor(vid)
+        if not node.is_lazy():
+            return 'not_lazy', None
+
+        pids = [pg.in_port(vid, key) for key in node.inputs()
+                if not node.is_delayed(key)]
+        if delayed:
+            pids.extend(state.delayed_reads(vid))
+
+        # re evaluate only if inputs have changed after
+        # last evaluation, along the lineage of executions
+        for pid in pids:
+            if env.is_newer(state.when(pid), eid):
+                return 'input_changed', pid
+
+        if len(rerun) > 0:
+            for pid in pids:
+                for npid in pg.connected_ports(pid):
+                    if pg.vertex(npid) in rerun:
+                        return 'upstream_rerun', pid
+
+        return None
+
+    def needs_evaluation(self, env, state, vid, rerun=(), delayed=True):
+        """ Check whether eval_node would call the node.
+
+        see evaluation_reason
+        """
+        reason = self.evaluation_reason(env, state, vid, rerun, delayed)
+        return reason is not None
+
+    def explain(self, env, state):
+        """ Find vertices that eval would call, without calling them,
+        and the reason why they would be called.
+
+        The portgraph is traversed as eval does. Nodes upstream of
+        delayed ports are only considered if the node read these
+        ports during its last evaluation, i.e. nodes are expected
+        to read the same delayed ports again.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): current state of workflow
+
+        return:
+            - (list of (vid, (str, any))): in the order of evaluation,
+                          see evaluation_reason for the meaning of reasons
+        """
+        pg = self._portgraph
+        current_eid = env.current_execution()
+
+        leaves = [v for v in pg.vertices() if pg.nb_out_edges(v) == 0]
+        leaves = [(pg.actor(v).priority(), v) for v in leaves]
+        leaves.sort(reverse=True)
+
+        rerun = set()
+        plan = []
+        visited = set()
+        for priority, leaf in leaves:
+            if leaf in visited:
+                continue
+
+            visited.add(leaf)
+            stack = [(leaf, iter(self.upstream_vertices(state, leaf)))]
+            while len(stack) > 0:
+                vid, nids = stack[-1]
+                if state.last_evaluation(vid) == current_eid:
+                    # already evaluated, eval does not go upstream
+                    stack.pop()
+                    continue
+
+                for nid in nids:
+                    if nid not in visited:
+                        visited.add(nid)
+                        stack.append((nid,
+                                      iter(self.upstream_vertices(state,
+                                                                  nid))))
+                        break
+                else:
+                    stack.pop()
+                    reason = self.evaluation_reason(env, state, vid, rerun)
+                    if reason is not None:
+                        rerun.add(vid)
+                        plan.append((vid, reason))
+
+        return plan
+
+    def evaluation_plan(self, env, state):
+        """ Find vertices that eval would call, without calling them.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): current state of workflow
+
+        return:
+            - (list of vid): in the order of evaluation
+        """
+        return [vid for vid, reason in self.explain(env, state)]
+
     def eval_node(self, env, state, vid):
         """ Evaluate a single node
 
         call BruteEvaluation:
             - if node is not lazy
             - if node is lazy but inputs have changed
+            - if node was last evaluated in another branch
+              of executions
+
+        If other inputs are unchanged, nodes upstream of delayed
+        ports read during last evaluation are evaluated first to
+        check whether these ports changed.
         """
-        if state.last_evaluation(vid) is None:
-            return BruteEvaluation.eval_node(self, env, state, vid)
-        elif state.last_evaluation(vid) == env.current_execution():
-            # node has already been evaluated at this execution
-            # do nothing
-            pass
-        else:
-            pg = self._portgraph
-            node = pg.actor(vid)
+        reads = state.delayed_reads(vid)
+        if (len(reads) > 0 and
+                not self.needs_evaluation(env, state, vid, delayed=False)):
+            for pid in reads:
+                self.eval_upstream(env, state, pid)
 
-            if node.is_lazy():
-                # re evaluate only if inputs have changed after
-                # last evaluation
-                eid = state.last_evaluation(vid)
-                if any(state.when(pid) > eid for pid in pg.in_ports(vid)):
-                    return BruteEvaluation.eval_node(self, env, state, vid)
-            else:
-                return BruteEvaluation.eval_node(self, env, state, vid)
+        if self.needs_evaluation(env, state, vid):
+            return BruteEvaluation.eval_node(self, env, state, vid)
@@ -1,5 +1,10 @@
 """ This module provide data structure to store global parameters
 for a dataflow evaluation.
+
+Executions are organized in a tree. Each new execution
+either follows its parent or is an alternative to it,
+such that many branches can be explored from a common
+baseline.
 """
 
 from openalea.container.id_generator import IdGenerator
@@ -19,12 +24,44 @@ class EvaluationEnvironment(object):
         self._id_gen = IdGenerator()
 
         self._exec_id = self._id_gen.get_id(exec_id)
+        self._init_lineage()
+
+    def _init_lineage(self):
+        # executions are stored as linear segments of the tree
+        # (branches), identified by the id of their first execution
+        self._parent = {}
+        self._rel_type = {}
+        self._depth = {}
+        self._branch = {}
+        self._branch_root = {}  # bid: parent of first execution
+        self._branch_tip = {}  # bid: last execution of branch
+
+        self._add_execution(self._exec_id, None, None)
+
+    def _add_execution(self, eid, parent, rel_type):
+        self._parent[eid] = parent
+        self._rel_type[eid] = rel_type
+        if parent is None:
+            self._depth[eid] = 0
+            bid = eid
+            self._branch_root[bid] = None
+        else:
+            self._depth[eid] = self._depth[parent] + 1
+            bid = self._branch[parent]
+            if self._branch_tip[bid] != parent:
+                # fork a new branch
+                bid = eid
+                self._branch_root[bid] = parent
+
+        self._branch[eid] = bid
+        self._branch_tip[bid] = eid
 
     def clear(self):
         """ Clear environment
         """
         self._id_gen = IdGenerator()
         self._exec_id = self._id_gen.get_id()
+        self._init_lineage()
 
     def current_execution(self):
         """ Return id of current execution.
@@ -35,9 +72,106 @@ class EvaluationEnvironment(object):
         """ Change execution id to a new unused id.
 
         arg:
-            - exec_id (eid): id of parent execution
+            - exec_id (eid): id of parent execution, if None
+                             use current execution
             - rel_type ('>', '+'): type of relation with parent execution
+                        '>' new execution follows its parent
+                        '+' new execution is an alternative to its
+                            parent, i.e. a child of the parent of exec_id
         """
+        if exec_id is None:
+            exec_id = self._exec_id
+
+        if exec_id not in self._parent:
+            raise KeyError("execution %s does not exist" % str(exec_id))
+
+        if rel_type == '>':
+            parent = exec_id
+        elif rel_type == '+':
+            parent = self._parent[exec_id]
+        else:
+            raise ValueError("unknown relation type '%s'" % rel_type)
+
         self._exec_id = self._id_gen.get_id()
+        self._add_execution(self._exec_id, parent, rel_type)
 
         return self._exec_id
+
+    def set_current_execution(self, exec_id):
+        """ Go back to a previous execution, e.g. to start
+        a new branch from it.
+
+        arg:
+            - exec_id (eid): id of existing execution
+        """
+        if exec_id not in self._parent:
+            raise KeyError("execution %s does not exist" % str(exec_id))
+
+        self._exec_id = exec_id
+
+    def parent(self, exec_id):
+        """ Retrieve parent of an execution.
+
+        return:
+            - (eid): None if execution is a root
+        """
+        return self._parent[exec_id]
+
+    def rel_type(self, exec_id):
+        """ Retrieve type of relation of an execution with its parent.
+
+        return:
+            - ('>', '+'): None if execution is a root
+        """
+        return self._rel_type[exec_id]
+
+    def depth(self, exec_id):
+        """ Number of ancestors of an execution.
+
+        return:
+            - (int)
+        """
+        return self._depth[exec_id]
+
+    def is_ancestor(self, eid1, eid2):
+        """ Test whether eid1 is eid2 or one of its ancestors.
+
+        return:
+            - (bool)
+        """
+        branch = self._branch
+        depth = self._depth[eid1]
+        bid = branch[eid2]
+        limit = self._depth[eid2]
+        while True:
+            if branch[eid1] == bid:
+                return depth <= limit
+
+            root = self._branch_root[bid]
+            if root is None:
+                return False
+
+            bid = branch[root]
+            limit = self._depth[root]
+
+    def is_newer(self, eid1, eid2):
+        """ Test whether something that occurred during eid1
+        was unknown to eid2, i.e. eid1 is neither eid2 nor one
+        of its ancestors.
+
+        Executions unknown to this environment are compared
+        using their order.
+
+        return:
+            - (bool)
+        """
+        if eid1 is None:
+            return False
+
+        if eid2 is None:
+            return True
+
+        if eid1 not in self._parent or eid2 not in self._parent:
+            return eid1 > eid2
+
+        return not self.is_ancestor(eid1, eid2)
@@ -26,6 +26,60 @@ def rettype(*ret_types_list):
     return type_decorator
 
 
+def pure(func):
+    """ Declare a function pure, i.e. deterministic
+    and without side effects.
+    """
+    func.__pure__ = True
+    return func
+
+
+def threadsafe(func):
+    """ Declare a function safe to call concurrently.
+    """
+    func.__threadsafe__ = True
+    return func
+
+
+def vectorized(func):
+    """ Declare a function able to process a whole batch
+    of values on each argument at once.
+    """
+    func.__vectorized__ = True
+    return func
+
+
+def picklable(flag):
+    def hint_decorator(func):
+        func.__picklable__ = flag
+        return func
+
+    return hint_decorator
+
+
+def cost(value):
+    def hint_decorator(func):
+        func.__cost__ = value
+        return func
+
+    return hint_decorator
+
+
+def output_size(value):
+    def hint_decorator(func):
+        func.__output_size__ = value
+        return func
+
+    return hint_decorator
+
+
+def is_importable(func):
+    """ Check whether a function can be retrieved from its module.
+    """
+    module = inspect.getmodule(func)
+    return getattr(module, func.__name__, None) is func
+
+
 def elm_to_name(elm):
     if isinstance(elm, ast.Name):
         return elm.id
@@ -69,6 +123,19 @@ class RawFuncNode(Node):
         self._id = ":".join((inspect.getmodule(func).__name__, func.__name__))
         self._func = func
 
+        # execution hints
+        self._pure = getattr(func, '__pure__', False)
+        self._thread_safe = getattr(func, '__threadsafe__', False)
+        self._vectorized = getattr(func, '__vectorized__', False)
+        if hasattr(func, '__picklable__'):
+            self._picklable = func.__picklable__
+        else:
+            self._picklable = is_importable(func)
+        if hasattr(func, '__cost__'):
+            self.set_cost(func.__cost__)
+        if hasattr(func, '__output_size__'):
+            self.set_output_size(func.__output_size__)
+
     def __call__(self, inputs=()):
         return self._func(*inputs)
 
@@ -108,8 +175,12 @@ class FuncNode(RawFuncNode):
         else:
             argtypes = [None] * len(args)
 
-        for name, typ in zip(args, argtypes):
-            self.add_input(name, typ, None, "None")
+        if defaults is None:
+            defaults = ()
+        values = [None] * (len(args) - len(defaults)) + list(defaults)
+
+        for name, typ, default in zip(args, argtypes, values):
+            self.add_input(name, typ, default, "None")
 
         self._output_type = "None"
 
@@ -126,7 +197,17 @@ class FuncNode(RawFuncNode):
         # coarse find return line
         ct = ast.parse(pycode)
         fd = ct.body[0]
-        ret = fd.body[-1]
+        if inspect.isgeneratorfunction(func):
+            # each yield produces a new set of outputs
+            self._streaming = True
+            ret = None
+            for elm in ast.walk(fd):
+                if isinstance(elm, ast.Yield) and elm.value is not None:
+                    ret = ast.Return(elm.value)
+                    break
+        else:
+            ret = fd.body[-1]
+
         if isinstance(ret, ast.Return):
             if isinstance(ret.value, ast.Tuple):
                 self._output_type = "tuple"
@@ -148,11 +229,34 @@ class FuncNode(RawFuncNode):
                     typ = None
                 self.add_output(name, typ, None, "None")
 
-    def __call__(self, inputs=()):
-        ret = self._func(*inputs)
+    def has_default(self, key):
+        """ Check whether the argument associated to an input
+        has a default value in the signature of the function.
+
+        args:
+            - key (str): id of input port
+
+        return:
+            - (bool)
+        """
+        args, varargs, keywords, defaults = inspect.getargspec(self._func)
+        if defaults is None:
+            return False
+
+        return key in args[len(args) - len(defaults):]
+
+    def _format(self, ret):
+        """ Convert value returned by function into a tuple of outputs
+        """
         if self._output_type == 'None':
             return ()
         elif self._output_type == 'single':
             return ret,
         else:
             return ret
+
+    def __call__(self, inputs=()):
+        if self._streaming:
+            return (self._format(ret) for ret in self._func(*inputs))
+
+        return self._format(self._func(*inputs))
@@ -0,0 +1,244 @@
+""" This module provide an optimization pass that fuses
+linear chains of nodes into a single actor.
+
+A chain is a sequence of vertices such that each vertex
+has a single output port connected only to the single
+input port of the next vertex. Streaming nodes and nodes
+with delayed inputs can not be compiled and never belong to
+a chain. Intermediate results of a fused chain are never
+stored in a WorkflowState.
+"""
+
+from compiled_node import CompiledNode
+from sub_port_graph import SubPortGraph
+
+
+class FusedNode(CompiledNode):
+    """ Actor associated to the head vertex of a fused chain.
+    """
+    _id = "openalea.workflow.fusion:FusedNode"
+
+
+class ChainFusion(object):
+    """ Record of the modifications made to a portgraph
+    to fuse a chain. Used to restore the original portgraph.
+    """
+    def __init__(self, portgraph, vids):
+        """ Constructor
+
+        args:
+            - portgraph (PortGraph): portgraph before fusion
+            - vids (list of vid): ordered vertices of the chain
+        """
+        pg = portgraph
+        self.vids = list(vids)
+        self.actors = [pg.actor(vid) for vid in vids]
+        self.ports = dict((vid, [(pid, pg.local_id(pid), pg.is_out_port(pid))
+                                 for pid in sorted(pg.ports(vid))])
+                          for vid in vids)
+        self.edges = []
+        for vid in vids:
+            for eid in pg.out_edges(vid):
+                self.edges.append((eid,
+                                   pg.source_port(eid),
+                                   pg.target_port(eid)))
+
+    def head(self):
+        """ Vertex that holds the fused actor.
+        """
+        return self.vids[0]
+
+    def tail(self):
+        """ Last vertex of the chain.
+        """
+        return self.vids[-1]
+
+
+def is_fusable(portgraph, vid):
+    """ Check whether the actor of a vertex can be compiled
+    in a fused chain.
+
+    args:
+        - portgraph (PortGraph): portgraph to consider
+        - vid (vid): id of vertex
+
+    return:
+        - (bool)
+    """
+    node = portgraph.actor(vid)
+    if node is None or node.is_streaming():
+        return False
+
+    return not any(node.is_delayed(key) for key in node.inputs())
+
+
+def chain_successor(portgraph, vid, pinned=()):
+    """ Find the next vertex in a chain.
+
+    args:
+        - portgraph (PortGraph): portgraph to consider
+        - vid (vid): id of current vertex
+        - pinned (set of pid): output ports whose values must
+                               remain observable
+
+    return:
+        - (vid): None if vid is the last vertex of a chain
+    """
+    pg = portgraph
+    opids = tuple(pg.out_ports(vid))
+    if len(opids) != 1 or opids[0] in pinned:
+        return None
+
+    if not is_fusable(pg, vid):
+        return None
+
+    tpids = tuple(pg.connected_ports(opids[0]))
+    if len(tpids) != 1:
+        return None
+
+    nid = pg.vertex(tpids[0])
+    if nid == vid:
+        return None
+
+    if len(tuple(pg.in_ports(nid))) != 1 or pg.nb_connections(tpids[0]) > 1:
+        return None
+
+    if not is_fusable(pg, nid):
+        return None
+
+    return nid
+
+
+def find_chains(portgraph, pinned=()):
+    """ Find all maximal chains in a portgraph.
+
+    args:
+        - portgraph (PortGraph): portgraph to consider
+        - pinned (set of pid): output ports whose values must
+                               remain observable
+
+    return:
+        - (list of list of vid): ordered vertices of each chain,
+                                 chains have at least two vertices
+    """
+    pg = portgraph
+    pinned = set(pinned)
+
+    succ = {}
+    for vid in pg.vertices():
+        nid = chain_successor(pg, vid, pinned)
+        if nid is not None:
+            succ[vid] = nid
+
+    starts = set(succ) - set(succ.values())
+    chains = []
+    for vid in sorted(starts):
+        chain = [vid]
+        while chain[-1] in succ:
+            chain.append(succ[chain[-1]])
+        chains.append(chain)
+
+    return chains
+
+
+def fuse_chain(portgraph, vids):
+    """ Fuse a chain into a single vertex.
+
+    The head vertex keeps its input ports and receives
+    the output ports of the tail with the same pids. All
+    other vertices of the chain are removed.
+
+    args:
+        - portgraph (PortGraph): portgraph to modify in place
+        - vids (list of vid): ordered vertices of the chain
+
+    return:
+        - (ChainFusion): record to use to restore the chain
+    """
+    pg = portgraph
+    fusion = ChainFusion(pg, vids)
+    head = fusion.head()
+    tail = fusion.tail()
+
+    sub = SubPortGraph(pg, vids)
+    inputs = [(key, pg.in_port(head, key))
+              for key in pg.actor(head).inputs()]
+    outputs = [(key, pg.out_port(tail, key))
+               for key in pg.actor(tail).outputs()]
+    actor = FusedNode(sub, inputs, outputs)
+    actor.set_priority(pg.actor(tail).priority())
+
+    for vid in vids[1:]:
+        pg.remove_vertex(vid)
+
+    for pid in tuple(pg.out_ports(head)):
+        pg.remove_port(pid)
+
+    opids = set()
+    for pid, key, is_out_port in fusion.ports[tail]:
+        if is_out_port:
+            opids.add(pg.add_out_port(head, key, pid))
+
+    for eid, spid, tpid in fusion.edges:
+        if spid in opids:
+            pg.connect(spid, tpid, eid)
+
+    pg.set_actor(head, actor)
+
+    return fusion
+
+
+def unfuse_chain(portgraph, fusion):
+    """ Restore a chain fused by fuse_chain.
+
+    args:
+        - portgraph (PortGraph): portgraph to modify in place
+        - fusion (ChainFusion): record returned by fuse_chain
+    """
+    pg = portgraph
+    head = fusion.head()
+
+    for pid in tuple(pg.out_ports(head)):
+        pg.remove_port(pid)
+
+    for vid in fusion.vids:
+        if vid != head:
+            pg.add_vertex(vid)
+
+        for pid, key, is_out_port in fusion.ports[vid]:
+            if is_out_port:
+                pg.add_out_port(vid, key, pid)
+            elif vid != head:
+                pg.add_in_port(vid, key, pid)
+
+    for eid, spid, tpid in fusion.edges:
+        pg.connect(spid, tpid, eid)
+
+    for vid, actor in zip(fusion.vids, fusion.actors):
+        pg.set_actor(vid, actor)
+
+
+def fuse_chains(portgraph, pinned=()):
+    """ Fuse all maximal chains of a portgraph.
+
+    args:
+        - portgraph (PortGraph): portgraph to modify in place
+        - pinned (set of pid): output ports whose values must
+                               remain observable after fusion
+
+    return:
+        - (list of ChainFusion): records to use to restore chains
+    """
+    return [fuse_chain(portgraph, vids)
+            for vids in find_chains(portgraph, pinned)]
+
+
+def unfuse_chains(portgraph, fusions):
+    """ Restore all chains fused by fuse_chains.
+
+    args:
+        - portgraph (PortGraph): portgraph to modify in place
+        - fusions (list of ChainFusion): records returned by fuse_chains
+    """
+    for fusion in reversed(fusions):
+        unfuse_chain(portgraph, fusion)
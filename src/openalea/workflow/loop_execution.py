@@ -0,0 +1,137 @@
+""" This module provide a driver to evaluate a portgraph
+repeatedly, feeding some outputs back as inputs of the
+next step.
+
+Each step is a new execution evaluated by the algorithm
+given to the driver, which computes the order of evaluation
+once and reuses it at each step. A bounded history of past values is
+kept for recorded ports.
+"""
+
+from collections import deque
+
+from evaluation import LazyEvaluation
+
+
+class LoopExecution(object):
+    """ Evaluate a portgraph for successive time steps.
+    """
+    def __init__(self, portgraph, feedback, history=1, record=(),
+                 algo_cls=LazyEvaluation):
+        """ Constructor
+
+        args:
+            - portgraph (PortGraph): portgraph to evaluate
+            - feedback (list of (pid, pid)): output ports whose value
+                        is used as param of a lonely input port at
+                        the next step
+            - history (int): number of past values kept for each
+                        recorded port
+            - record (list of pid): ports whose values are kept in
+                        history in addition to feedback output ports
+            - algo_cls (class): evaluation algorithm used to
+                        evaluate the portgraph at each step
+        """
+        pg = portgraph
+        for out_pid, in_pid in feedback:
+            if not pg.is_out_port(out_pid):
+                raise UserWarning("port %s is not an output port" %
+                                  str(out_pid))
+            if not pg.is_in_port(in_pid) or pg.nb_connections(in_pid) > 0:
+                raise UserWarning("port %s is not a lonely input port" %
+                                  str(in_pid))
+
+        if history < 1:
+            raise ValueError("history must be positive: '%s'" % history)
+
+        self._portgraph = portgraph
+        self._feedback = list(feedback)
+        self._algo = algo_cls(portgraph)
+
+        self._history = {}
+        for out_pid, in_pid in feedback:
+            self._history[out_pid] = deque(maxlen=history)
+        for pid in record:
+            self._history[pid] = deque(maxlen=history)
+
+        self._nb_steps = 0
+
+    def plan(self):
+        """ Retrieve order in which nodes are visited at each step.
+
+        Nodes skipped by the evaluation algorithm, e.g. lazy nodes
+        whose inputs are unchanged or nodes only connected to
+        delayed ports, are not evaluated.
+
+        return:
+            - (list of vid)
+        """
+        return list(self._algo.order())
+
+    def nb_steps(self):
+        """ Number of steps performed so far.
+
+        return:
+            - (int)
+        """
+        return self._nb_steps
+
+    def history(self, pid):
+        """ Retrieve past values of a recorded port.
+
+        args:
+            - pid (pid): id of recorded port
+
+        return:
+            - (list of any): oldest value first
+        """
+        return list(self._history[pid])
+
+    def clear_history(self):
+        """ Remove all past values and reset step counter.
+        """
+        for values in self._history.values():
+            values.clear()
+
+        self._nb_steps = 0
+
+    def step(self, env, state, params=None):
+        """ Perform a single step.
+
+        Before each step except the first one, values of feedback
+        output ports are stored as params of the associated input
+        ports.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): state updated by the step
+            - params (dict of pid: any): params modified for this step
+        """
+        eid = env.new_execution()
+        if self._nb_steps > 0:
+            for out_pid, in_pid in self._feedback:
+                state.store_param(in_pid, state.get(out_pid), eid)
+
+        if params is not None:
+            for pid, val in params.items():
+                state.store_param(pid, val, eid)
+
+        self._algo.eval(env, state)
+
+        for pid, values in self._history.items():
+            values.append(state.get(pid))
+
+        self._nb_steps += 1
+
+    def run(self, env, state, nb_steps):
+        """ Perform many steps.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): state updated by the steps
+            - nb_steps (int): number of steps to perform
+        """
+        for i in range(nb_steps):
+            self.step(env, state)
@@ -0,0 +1,237 @@
+""" This module provide nodes that apply an actor to each
+element of a collection and that reduce a collection.
+
+Elements can be dispatched across a pool of threads or
+processes. Actors are checked against their execution hints
+(thread safe, picklable) before being dispatched.
+"""
+
+import pickle
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+from node import Node
+
+
+def call_chunk(actor, chunk):
+    """ Call actor on each set of inputs of a chunk.
+    """
+    return [actor(inputs) for inputs in chunk]
+
+
+def _call_pickled_chunk(task):
+    return call_chunk(*pickle.loads(task))
+
+
+class MapNode(Node):
+    """ Apply an actor to each element of collections.
+
+    Inputs are the inputs of the actor. Mapped inputs receive
+    collections of the same length, other inputs are shared
+    by all elements. Each output holds the list of values
+    returned by the actor for each element.
+    """
+    _id = "openalea.workflow.map_reduce:MapNode"
+
+    def __init__(self, actor, over=None, pool=None, nb_workers=None,
+                 chunksize=1):
+        """ Constructor
+
+        args:
+            - actor (Node): node to apply on each element
+            - over (list of str): inputs of actor that receive a
+                        collection. If None, use the first input.
+            - pool (None, 'thread', 'process'): where elements are
+                        dispatched. If None, elements are evaluated
+                        sequentially
+            - nb_workers (int): size of pool, if None use
+                        the number of cpus
+            - chunksize (int): number of elements sent at once
+                        to a worker
+        """
+        Node.__init__(self)
+
+        keys = list(actor.inputs())
+        if over is None:
+            over = keys[:1]
+
+        for key in over:
+            if key not in keys:
+                raise KeyError("Input '%s' does not exist" % key)
+
+        if pool not in (None, 'thread', 'process'):
+            raise UserWarning("unknown pool type '%s'" % pool)
+
+        if pool == 'thread' and not actor.is_thread_safe():
+            raise UserWarning("actor must be thread safe")
+
+        if pool == 'process' and not actor.is_picklable():
+            raise UserWarning("actor must be picklable")
+
+        if chunksize < 1:
+            raise ValueError("chunksize must be positive: '%s'" % chunksize)
+
+        for key in keys:
+            self.add_input(key)
+
+        for key in actor.outputs():
+            self.add_output(key)
+
+        self._actor = actor
+        self._actor_id = actor.get_id()
+        self._over = set(over)
+        self._pool = pool
+        self._nb_workers = nb_workers
+        self._chunksize = chunksize
+
+        self._lazy = actor.is_lazy()
+        self._pure = actor.is_pure()
+        self._thread_safe = actor.is_thread_safe()
+        self._picklable = actor.is_picklable()
+
+    def actor(self):
+        """ Retrieve actor applied on each element.
+
+        Return:
+          - (Node)
+        """
+        return self._actor
+
+    def actor_id(self):
+        """ Retrieve id of actor applied on each element.
+
+        Return:
+          - (str)
+        """
+        return self._actor_id
+
+    def mapped_inputs(self):
+        """ Iterate on inputs that receive collections.
+
+        Returns:
+          - (iter of str)
+        """
+        return (key for key in self.inputs() if key in self._over)
+
+    def __call__(self, inputs=()):
+        keys = tuple(self.inputs())
+        args = [list(val) if key in self._over else val
+                for key, val in zip(keys, inputs)]
+
+        sizes = set(len(val) for key, val in zip(keys, args)
+                    if key in self._over)
+        if len(sizes) > 1:
+            raise ValueError("mapped inputs must have the same length")
+        size = sizes.pop() if len(sizes) > 0 else 0
+
+        elements = [[val[i] if key in self._over else val
+                     for key, val in zip(keys, args)]
+                    for i in range(size)]
+
+        cs = self._chunksize
+        chunks = [elements[i:i + cs] for i in range(0, size, cs)]
+
+        if self._pool is None:
+            rets = [call_chunk(self._actor, chunk) for chunk in chunks]
+        elif self._pool == 'thread':
+            pool = ThreadPool(self._nb_workers)
+            try:
+                rets = pool.map(lambda chunk: call_chunk(self._actor, chunk),
+                                chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            # containers of portgraph do not support binary pickle protocols
+            tasks = [pickle.dumps((self._actor, chunk), 0)
+                     for chunk in chunks]
+            pool = Pool(self._nb_workers)
+            try:
+                rets = pool.map(_call_pickled_chunk, tasks)
+            finally:
+                pool.close()
+                pool.join()
+
+        values = [ret for chunk_rets in rets for ret in chunk_rets]
+        nb = len(tuple(self.outputs()))
+        if len(values) == 0:
+            return tuple([] for i in range(nb))
+
+        return tuple(list(vals) for vals in zip(*values))
+
+    def reset(self):
+        self._actor.reset()
+
+
+class ReduceNode(Node):
+    """ Reduce a collection with an actor that combines
+    two values into one.
+
+    Inputs are 'seq', the collection, and 'initial', the
+    starting value. If initial is None, the first element
+    of the collection is used instead.
+    """
+    _id = "openalea.workflow.map_reduce:ReduceNode"
+
+    def __init__(self, actor):
+        """ Constructor
+
+        args:
+            - actor (Node): node with two inputs, the accumulated
+                            value and an element, and one output
+        """
+        Node.__init__(self)
+
+        if len(tuple(actor.inputs())) != 2:
+            raise UserWarning("actor must have two inputs")
+
+        outputs = tuple(actor.outputs())
+        if len(outputs) != 1:
+            raise UserWarning("actor must have a single output")
+
+        self.add_input('seq')
+        self.add_input('initial')
+        self.add_output(outputs[0])
+
+        self._actor = actor
+        self._actor_id = actor.get_id()
+
+        self._lazy = actor.is_lazy()
+        self._pure = actor.is_pure()
+        self._thread_safe = actor.is_thread_safe()
+        self._picklable = actor.is_picklable()
+
+    def actor(self):
+        """ Retrieve actor used to combine values.
+
+        Return:
+          - (Node)
+        """
+        return self._actor
+
+    def actor_id(self):
+        """ Retrieve id of actor used to combine values.
+
+        Return:
+          - (str)
+        """
+        return self._actor_id
+
+    def __call__(self, inputs=()):
+        seq, initial = inputs
+        elms = iter(seq)
+        if initial is None:
+            try:
+                acc = next(elms)
+            except StopIteration:
+                raise ValueError("reduce of empty sequence with no initial")
+        else:
+            acc = initial
+
+        for elm in elms:
+            acc, = self._actor([acc, elm])
+
+        return acc,
+
+    def reset(self):
+        self._actor.reset()
@@ -43,11 +43,20 @@ class Node(object):
         """
         self._inputs = OrderedDict()
         self._outputs = OrderedDict()
+        self._delayed = set()
 
         self._lazy = True
+        self._pure = False
         self._priority = 0
         self._caption = "caption"
 
+        self._cost = 1
+        self._output_size = None
+        self._thread_safe = False
+        self._picklable = False
+        self._vectorized = False
+        self._streaming = False
+
     def get_id(self):
         """ Construct a unique id based on:
         package.module:local_id
@@ -128,6 +137,34 @@ class Node(object):
 
         self._outputs[key] = Port(type, default, descr)
 
+    def is_delayed(self, key):
+        """ Check whether an input port receives a thunk, i.e. a
+        function without arguments returning the value of the port,
+        instead of the value itself.
+
+        Args:
+          - key (str): id of input port
+        """
+        return key in self._delayed
+
+    def set_delayed(self, key, flag):
+        """ Declare whether an input port receives a thunk.
+
+        Upstream nodes connected to a delayed port are evaluated
+        only when the thunk is called.
+
+        Args:
+          - key (str): id of input port
+          - flag (bool)
+        """
+        if key not in self._inputs:
+            raise KeyError("Input '%s' does not exist" % key)
+
+        if flag:
+            self._delayed.add(key)
+        else:
+            self._delayed.discard(key)
+
     #################################################
     #
     #   Evaluation
@@ -161,6 +198,20 @@ class Node(object):
         """
         self._lazy = flag
 
+    def is_pure(self):
+        """ Check if the node is declared pure, i.e. its outputs
+        depend only on its inputs and it has no side effects.
+        """
+        return self._pure
+
+    def set_pure(self, flag):
+        """ Declare the node as pure.
+
+        args:
+            - flag (bool)
+        """
+        self._pure = flag
+
     def priority(self):
         """ Fetch priority of this node.
 
@@ -199,3 +250,107 @@ class Node(object):
           - caption (str): text
         """
         self._caption = str(caption)
+
+    #################################################
+    #
+    #   Execution hints
+    #
+    #################################################
+    def cost(self):
+        """ Fetch expected cost of an evaluation of this node.
+
+        Unit is arbitrary but must be consistent among nodes
+        of a workflow.
+
+        Returns:
+          - (float)
+        """
+        return self._cost
+
+    def set_cost(self, cost):
+        """ Declare expected cost of an evaluation of this node.
+
+        Args:
+          - cost (float): positive value
+        """
+        if not isinstance(cost, (int, long, float)):
+            raise TypeError("cost must be a number: '%s'" % cost)
+
+        if cost < 0:
+            raise ValueError("cost must be positive: '%s'" % cost)
+
+        self._cost = cost
+
+    def output_size(self):
+        """ Fetch expected size in bytes of the outputs of this node.
+
+        Returns:
+          - (int): None if unknown
+        """
+        return self._output_size
+
+    def set_output_size(self, size):
+        """ Declare expected size in bytes of the outputs of this node.
+
+        Args:
+          - size (int): None if unknown
+        """
+        if size is not None and not isinstance(size, (int, long)):
+            raise TypeError("size must be an integer: '%s'" % size)
+
+        self._output_size = size
+
+    def is_thread_safe(self):
+        """ Check if the node can be evaluated concurrently
+        in different threads.
+        """
+        return self._thread_safe
+
+    def set_thread_safe(self, flag):
+        """ Declare the node as thread safe.
+
+        args:
+            - flag (bool)
+        """
+        self._thread_safe = flag
+
+    def is_picklable(self):
+        """ Check if the node can be sent to another process.
+        """
+        return self._picklable
+
+    def set_picklable(self, flag):
+        """ Declare the node as picklable.
+
+        args:
+            - flag (bool)
+        """
+        self._picklable = flag
+
+    def is_vectorized(self):
+        """ Check if the node accepts a whole batch of values
+        on each input and returns a batch of values on each output.
+        """
+        return self._vectorized
+
+    def set_vectorized(self, flag):
+        """ Declare the node as vectorized.
+
+        args:
+            - flag (bool)
+        """
+        self._vectorized = flag
+
+    def is_streaming(self):
+        """ Check if a call to the node returns an iterator
+        on successive tuples of outputs instead of a single one.
+        """
+        return self._streaming
+
+    def set_streaming(self, flag):
+        """ Declare the node as streaming.
+
+        args:
+            - flag (bool)
+        """
+        self._streaming = flag
@@ -0,0 +1,245 @@
+""" This module provide a driver to evaluate a portgraph
+for many assignments of params.
+
+Runs are ordered such that consecutive runs modify as few
+expensive params as possible. Since the same state is used
+by a lazy evaluation algorithm for consecutive runs, parts of
+the portgraph not impacted by modified params are not
+evaluated again.
+"""
+
+import pickle
+from itertools import product
+from multiprocessing import Pool
+
+from evaluation import LazyEvaluation
+from evaluation_environment import EvaluationEnvironment
+from state import WorkflowState
+
+
+def cartesian(values):
+    """ Construct all combinations of values for params.
+
+    args:
+        - values (list of (pid, list of any)): values to explore
+                       for each param
+
+    return:
+        - (list of dict of pid: any)
+    """
+    pids = [pid for pid, vals in values]
+    return [dict(zip(pids, comb))
+            for comb in product(*[vals for pid, vals in values])]
+
+
+def same_param(val1, val2):
+    """ Test whether two values of a param are the same.
+    """
+    if val1 is val2:
+        return True
+
+    try:
+        return bool(val1 == val2)
+    except (TypeError, ValueError):
+        return False
+
+
+def downstream_cost(portgraph, pid):
+    """ Compute total cost of vertices downstream of a port.
+
+    args:
+        - portgraph (PortGraph): portgraph to consider
+        - pid (pid): input port
+
+    return:
+        - (float): sum of cost of actors
+    """
+    pg = portgraph
+    visited = set()
+    front = [pg.vertex(pid)]
+    while len(front) > 0:
+        vid = front.pop()
+        if vid not in visited:
+            visited.add(vid)
+            front.extend(pg.out_neighbors(vid))
+
+    return sum(pg.actor(vid).cost() for vid in visited)
+
+
+def sweep_order(portgraph, assignments):
+    """ Sort assignments to minimize computation between runs.
+
+    Params whose downstream part of the portgraph is the most
+    expensive vary the least often.
+
+    args:
+        - portgraph (PortGraph): portgraph to consider
+        - assignments (list of dict of pid: any): params for each run
+
+    return:
+        - (list of int): indices of assignments in the order
+                         they should be run
+    """
+    pids = set()
+    for assignment in assignments:
+        pids.update(assignment)
+
+    costs = [(-downstream_cost(portgraph, pid), pid) for pid in pids]
+    pids = [pid for cost, pid in sorted(costs)]
+
+    # replace each value by the index of its first occurrence
+    keys = []
+    for pid in pids:
+        seen = []
+        pkeys = []
+        for assignment in assignments:
+            val = assignment.get(pid)
+            for i, ref in enumerate(seen):
+                if same_param(val, ref):
+                    pkeys.append(i)
+                    break
+            else:
+                pkeys.append(len(seen))
+                seen.append(val)
+        keys.append(pkeys)
+
+    return sorted(range(len(assignments)),
+                  key=lambda ind: tuple(pkeys[ind] for pkeys in keys))
+
+
+def run_sequence(portgraph, params, assignments, outputs, algo_cls):
+    """ Evaluate successively a portgraph for each assignment.
+
+    args:
+        - portgraph (PortGraph): portgraph to evaluate
+        - params (dict of pid: any): params common to all runs
+        - assignments (list of dict of pid: any): params for each run
+        - outputs (list of pid): ports whose values are recorded
+        - algo_cls (class): lazy evaluation algorithm to use
+
+    return:
+        - (list of list of any): for each run, values of outputs
+    """
+    env = EvaluationEnvironment()
+    ws = WorkflowState(portgraph)
+    for pid, val in params.items():
+        ws.store_param(pid, val, env.current_execution())
+
+    return ParameterSweep(portgraph, outputs, algo_cls).run(env, ws,
+                                                            assignments,
+                                                            ordered=True)
+
+
+def _run_chunk(task):
+    return run_sequence(*pickle.loads(task))
+
+
+class ParameterSweep(object):
+    """ Evaluate a portgraph for many assignments of params.
+    """
+    def __init__(self, portgraph, outputs, algo_cls=LazyEvaluation):
+        """ Constructor
+
+        args:
+            - portgraph (PortGraph): portgraph to evaluate
+            - outputs (list of pid): ports whose values are recorded
+                                     after each run
+            - algo_cls (class): lazy evaluation algorithm to use
+        """
+        self._portgraph = portgraph
+        self._outputs = list(outputs)
+        self._algo_cls = algo_cls
+        self._algo = algo_cls(portgraph)
+
+    def run(self, env, state, assignments, ordered=False):
+        """ Evaluate portgraph for each assignment.
+
+        Params not modified by assignments are taken from state.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluations
+            - state (WorkflowState): state used for all runs
+            - assignments (list of dict of pid: any): params for each run
+            - ordered (bool): if True, run assignments in the given order
+                              instead of sorting them first
+
+        return:
+            - (list of list of any): for each assignment, values
+                                     of outputs
+        """
+        if ordered:
+            order = range(len(assignments))
+        else:
+            order = sweep_order(self._portgraph, assignments)
+
+        # values of swept params in state, restored for runs
+        # that do not assign them
+        baseline = {}
+        for assignment in assignments:
+            for pid in assignment:
+                if pid not in baseline:
+                    try:
+                        baseline[pid] = state.get(pid)
+                    except KeyError:
+                        pass
+
+        results = [None] * len(assignments)
+        current = dict(baseline)
+        for ind in order:
+            exec_id = env.new_execution()
+            params = dict(baseline)
+            params.update(assignments[ind])
+            for pid, val in params.items():
+                if pid not in current or not same_param(current[pid], val):
+                    state.store_param(pid, val, exec_id)
+                    current[pid] = val
+
+            self._algo.eval(env, state)
+            results[ind] = [state.get(pid) for pid in self._outputs]
+
+        return results
+
+    def run_parallel(self, params, assignments, nb_processes):
+        """ Evaluate portgraph for each assignment in a pool
+        of processes.
+
+        Ordered assignments are split into contiguous chunks,
+        one for each process.
+
+        args:
+            - params (dict of pid: any): params common to all runs
+            - assignments (list of dict of pid: any): params for each run
+            - nb_processes (int): number of processes to use
+
+        return:
+            - (list of list of any): for each assignment, values
+                                     of outputs
+        """
+        pg = self._portgraph
+        if not all(pg.actor(vid).is_picklable() for vid in pg.vertices()):
+            raise UserWarning("all actors must be picklable")
+
+        order = sweep_order(pg, assignments)
+        size = max(1, -(-len(order) // nb_processes))
+        chunks = [order[i:i + size] for i in range(0, len(order), size)]
+
+        # containers of portgraph do not support binary pickle protocols
+        tasks = [pickle.dumps((pg, params,
+                               [assignments[ind] for ind in chunk],
+                               self._outputs, self._algo_cls), 0)
+                 for chunk in chunks]
+
+        pool = Pool(nb_processes)
+        try:
+            rets = pool.map(_run_chunk, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        results = [None] * len(assignments)
+        for chunk, ret in zip(chunks, rets):
+            for ind, res in zip(chunk, ret):
+                results[ind] = res
+
+        return results
@@ -3,6 +3,8 @@ to identified ports on vertices instead of directly to
 a given vertex.
 """
 
+from weakref import WeakSet
+
 from openalea.container.id_generator import IdGenerator
 from openalea.container.property_graph import (PropertyGraph,
                                                 InvalidVertex,
@@ -28,16 +30,86 @@ class Port(object):
         self.is_out_port = is_out_port
 
 
+class ActorRef(object):
+    """ Placeholder for an actor that is only created
+    the first time it is accessed.
+    """
+
+    def __init__(self, factory, *args):
+        """ Constructor
+
+        args:
+            - factory (callable): function that creates the actor
+            - args (list of any): arguments passed to factory
+        """
+        self._factory = factory
+        self._args = args
+        self._actor = None
+
+    def resolve(self):
+        """ Create actor if needed.
+
+        return:
+            - (IActor)
+        """
+        if self._actor is None:
+            self._actor = self._factory(*self._args)
+
+        return self._actor
+
+
+class PortGraphPatch(object):
+    """ Set of editions that transform a portgraph into another one.
+
+    Editions are applied in the following order:
+        - removed_edges (list of eid)
+        - removed_ports (list of pid)
+        - removed_vertices (list of vid)
+        - added_vertices (list of vid)
+        - added_ports (list of (pid, vid, local_pid, is_out_port))
+        - actors (list of (vid, actor))
+        - added_edges (list of (eid, source_pid, target_pid))
+    """
+    def __init__(self):
+        self.removed_edges = []
+        self.removed_ports = []
+        self.removed_vertices = []
+        self.added_vertices = []
+        self.added_ports = []
+        self.actors = []
+        self.added_edges = []
+
+    def is_empty(self):
+        """ Test whether patch contains no edition.
+        """
+        return not any((self.removed_edges, self.removed_ports,
+                        self.removed_vertices, self.added_vertices,
+                        self.added_ports, self.actors, self.added_edges))
+
+
 class PortGraph(PropertyGraph):
     """ A Port graph defines a graph whose edges connect
     to identified ports on vertices instead of directly to
     a given vertex.
+
+    Each edition is notified to registered listeners as a tuple:
+        - ('add_vertex', vid)
+        - ('remove_vertex', vid)
+        - ('add_port', pid, vid)
+        - ('remove_port', pid, vid)
+        - ('connect', eid, source_pid, target_pid)
+        - ('disconnect', eid, source_pid, target_pid)
+        - ('set_actor', vid)
+        - ('add_actors', vids)
+        - ('clear_edges',)
+        - ('clear',)
     """
 
     def __init__(self):
         PropertyGraph.__init__(self)
         self._ports = {}
         self._pid_generator = IdGenerator()
+        self._listeners = WeakSet()
 
         self.add_edge_property("_source_port")
         self.add_edge_property("_target_port")
@@ -45,6 +117,50 @@ class PortGraph(PropertyGraph):
         self.add_vertex_property("_ports")
         self.add_vertex_property("_actor")
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_listeners']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._listeners = WeakSet()
+
+    ####################################################
+    #
+    #        edition events
+    #
+    ####################################################
+    def register_listener(self, listener):
+        """ Register an object to be notified of each edition.
+
+        Only a weak reference to the listener is kept.
+
+        args:
+            - listener (object): must implement a
+                        'notify(sender, event)' method
+        """
+        self._listeners.add(listener)
+
+    def unregister_listener(self, listener):
+        """ Stop notifying a listener.
+
+        args:
+            - listener (object): a registered listener
+        """
+        self._listeners.discard(listener)
+
+    def notify_listeners(self, event):
+        """ Notify all registered listeners of an edition.
+
+        args:
+            - event (tuple): name of event followed by ids
+                             of modified elements
+        """
+        if len(self._listeners) > 0:
+            for listener in list(self._listeners):
+                listener.notify(self, event)
+
     ####################################################
     #
     #        edge port view
@@ -294,10 +410,16 @@ class PortGraph(PropertyGraph):
             - (IActor)
         """
         try:
-            return self.vertex_property("_actor")[vid]
+            actor = self.vertex_property("_actor")[vid]
         except KeyError:
             raise InvalidVertex("vertex %s does not exist" % vid)
 
+        if isinstance(actor, ActorRef):
+            actor = actor.resolve()
+            self.vertex_property("_actor")[vid] = actor
+
+        return actor
+
     def set_actor(self, vid, actor):
         """ Associate an actor to a given vertex.
 
@@ -323,6 +445,7 @@ class PortGraph(PropertyGraph):
                 raise InvalidPort(msg)
 
         self.vertex_property("_actor")[vid] = actor
+        self.notify_listeners(('set_actor', vid))
 
     # TODO: one day update this function to accept already existing
     # vertices with no actor and create only relevant ports
@@ -354,6 +477,79 @@ class PortGraph(PropertyGraph):
 
         return vid
 
+    def add_actors(self, actors, connections=()):
+        """ Create many vertices and connections at once.
+
+        All arguments are checked before any edition, then
+        vertices, ports and edges are created without further
+        checks and a single 'add_actors' event is notified.
+
+        args:
+            - actors (list of IActor): actors to add
+            - connections (list of (int, key, int, key)): index of
+                        source actor in actors, key of its output,
+                        index of target actor and key of its input
+
+        return:
+            - (list of vid): ids of vertices created for each actor
+        """
+        # validate, keys of ports are fetched before any edition
+        # so that a faulty actor leaves the portgraph untouched
+        nb = len(actors)
+        keys = [(tuple(actor.inputs()), tuple(actor.outputs()))
+                for actor in actors]
+        links = []
+        for src, out_key, tgt, in_key in connections:
+            if not (0 <= src < nb and 0 <= tgt < nb):
+                raise IndexError("no actor for connection %s" %
+                                 str((src, out_key, tgt, in_key)))
+            if out_key not in keys[src][1]:
+                msg = "actor %d has no output '%s'" % (src, out_key)
+                raise InvalidPort(msg)
+            if in_key not in keys[tgt][0]:
+                msg = "actor %d has no input '%s'" % (tgt, in_key)
+                raise InvalidPort(msg)
+            links.append((src, out_key, tgt, in_key))
+
+        # create vertices and ports
+        ports = self._ports
+        get_pid = self._pid_generator.get_id
+        vertex_ports = self.vertex_property("_ports")
+        vertex_actor = self.vertex_property("_actor")
+        vids = []
+        in_pids = []
+        out_pids = []
+        for actor, (in_keys, out_keys) in zip(actors, keys):
+            vid = PropertyGraph.add_vertex(self)
+            ins = {}
+            for key in in_keys:
+                pid = get_pid()
+                ports[pid] = Port(vid, key, False)
+                ins[key] = pid
+            outs = {}
+            for key in out_keys:
+                pid = get_pid()
+                ports[pid] = Port(vid, key, True)
+                outs[key] = pid
+
+            vertex_ports[vid] = set(ins.values()) | set(outs.values())
+            vertex_actor[vid] = actor
+            vids.append(vid)
+            in_pids.append(ins)
+            out_pids.append(outs)
+
+        # create edges
+        source_port = self.edge_property("_source_port")
+        target_port = self.edge_property("_target_port")
+        for src, out_key, tgt, in_key in links:
+            eid = PropertyGraph.add_edge(self, vids[src], vids[tgt])
+            source_port[eid] = out_pids[src][out_key]
+            target_port[eid] = in_pids[tgt][in_key]
+
+        self.notify_listeners(('add_actors', tuple(vids)))
+
+        return vids
+
     #####################################################
     #
     #        mutable concept
@@ -383,6 +579,7 @@ class PortGraph(PropertyGraph):
 
         self._ports[pid] = Port(vid, local_pid, False)
         self.vertex_property("_ports")[vid].add(pid)
+        self.notify_listeners(('add_port', pid, vid))
 
         return pid
 
@@ -410,6 +607,7 @@ class PortGraph(PropertyGraph):
 
         self._ports[pid] = Port(vid, local_pid, True)
         self.vertex_property("_ports")[vid].add(pid)
+        self.notify_listeners(('add_port', pid, vid))
 
         return pid
 
@@ -423,10 +621,12 @@ class PortGraph(PropertyGraph):
         for eid in list(self.connected_edges(pid)):
             self.remove_edge(eid)
 
-        self.vertex_property("_ports")[self.vertex(pid)].remove(pid)
+        vid = self.vertex(pid)
+        self.vertex_property("_ports")[vid].remove(pid)
         self._pid_generator.release_id(pid)
 
         del self._ports[pid]
+        self.notify_listeners(('remove_port', pid, vid))
 
     def add_edge(self, edge=None, eid=None):
         """ Usage of this method is forbidden
@@ -464,12 +664,25 @@ class PortGraph(PropertyGraph):
                                      eid)
         self.edge_property("_source_port")[eid] = source_pid
         self.edge_property("_target_port")[eid] = target_pid
+        self.notify_listeners(('connect', eid, source_pid, target_pid))
 
         return eid
 
+    def remove_edge(self, eid):
+        if not self.has_edge(eid):
+            raise InvalidEdge("edge %s does not exist" % eid)
+
+        source_pid = self.source_port(eid)
+        target_pid = self.target_port(eid)
+        PropertyGraph.remove_edge(self, eid)
+        self.notify_listeners(('disconnect', eid, source_pid, target_pid))
+
+    remove_edge.__doc__ = PropertyGraph.remove_edge.__doc__
+
     def add_vertex(self, vid=None):
         vid = PropertyGraph.add_vertex(self, vid)
         self.vertex_property("_ports")[vid] = set()
+        self.notify_listeners(('add_vertex', vid))
         self.set_actor(vid, None)
         return vid
 
@@ -480,6 +693,7 @@ class PortGraph(PropertyGraph):
             self.remove_port(pid)
 
         PropertyGraph.remove_vertex(self, vid)
+        self.notify_listeners(('remove_vertex', vid))
 
     remove_vertex.__doc__ = PropertyGraph.remove_vertex.__doc__
 
@@ -487,5 +701,130 @@ class PortGraph(PropertyGraph):
         self._ports.clear()
         self._pid_generator = IdGenerator()
         PropertyGraph.clear(self)
+        self.notify_listeners(('clear',))
 
     clear.__doc__ = PropertyGraph.clear.__doc__
+
+    def clear_edges(self):
+        PropertyGraph.clear_edges(self)
+        self.notify_listeners(('clear_edges',))
+
+    clear_edges.__doc__ = PropertyGraph.clear_edges.__doc__
+
+    #####################################################
+    #
+    #        diff and patch
+    #
+    #####################################################
+    def diff(self, other, same_actor=None):
+        """ Compute editions needed to transform this portgraph
+        into another one.
+
+        Vertices, ports and edges are matched by id.
+
+        args:
+            - other (PortGraph): target portgraph
+            - same_actor (callable): function used to compare two
+                        actors. If None, actors must be the same object
+
+        return:
+            - (PortGraphPatch)
+        """
+        if same_actor is None:
+            def same_actor(actor1, actor2):
+                return actor1 is actor2
+
+        patch = PortGraphPatch()
+
+        def edge_def(pg, eid):
+            return pg.source_port(eid), pg.target_port(eid)
+
+        def port_def(pg, pid):
+            port = pg._ports[pid]
+            return port.vid, port.local_pid, port.is_out_port
+
+        for vid in self.vertices():
+            if vid not in other:
+                patch.removed_vertices.append(vid)
+
+        # ports whose definition changed are removed and added again
+        changed = set()
+        for pid in self.ports():
+            if pid not in other._ports or (port_def(self, pid) !=
+                                           port_def(other, pid)):
+                changed.add(pid)
+        for pid in other.ports():
+            if pid not in self._ports:
+                changed.add(pid)
+
+        removed = set(patch.removed_vertices)
+        for pid in self.ports():
+            if pid in changed and self.vertex(pid) not in removed:
+                patch.removed_ports.append(pid)
+
+        def same_edge(eid):
+            sdef = edge_def(self, eid)
+            return (sdef == edge_def(other, eid) and
+                    sdef[0] not in changed and
+                    sdef[1] not in changed)
+
+        for eid in self.edges():
+            if not other.has_edge(eid) or not same_edge(eid):
+                patch.removed_edges.append(eid)
+
+        for vid in other.vertices():
+            if vid not in self:
+                patch.added_vertices.append(vid)
+                patch.actors.append((vid, other.actor(vid)))
+            else:
+                actor = other.actor(vid)
+                if not same_actor(self.actor(vid), actor):
+                    patch.actors.append((vid, actor))
+
+        for pid in other.ports():
+            if pid in changed:
+                patch.added_ports.append((pid, ) + port_def(other, pid))
+
+        # ports edited without changing actor
+        added = set(patch.added_vertices)
+        edited = set(vid for vid, actor in patch.actors)
+        for pid, vid, local_pid, is_out_port in patch.added_ports:
+            if vid not in added and vid not in edited:
+                edited.add(vid)
+                patch.actors.append((vid, other.actor(vid)))
+
+        for eid in other.edges():
+            if not self.has_edge(eid) or not same_edge(eid):
+                patch.added_edges.append((eid, ) + edge_def(other, eid))
+
+        return patch
+
+    def apply_patch(self, patch):
+        """ Apply editions in place.
+
+        args:
+            - patch (PortGraphPatch): editions computed by diff
+        """
+        for eid in patch.removed_edges:
+            self.remove_edge(eid)
+
+        for pid in patch.removed_ports:
+            self.remove_port(pid)
+
+        for vid in patch.removed_vertices:
+            self.remove_vertex(vid)
+
+        for vid in patch.added_vertices:
+            self.add_vertex(vid)
+
+        for pid, vid, local_pid, is_out_port in patch.added_ports:
+            if is_out_port:
+                self.add_out_port(vid, local_pid, pid)
+            else:
+                self.add_in_port(vid, local_pid, pid)
+
+        for vid, actor in patch.actors:
+            self.set_actor(vid, actor)
+
+        for eid, source_pid, target_pid in patch.added_edges:
+            self.connect(source_pid, target_pid, eid)
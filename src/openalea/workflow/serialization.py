@@ -0,0 +1,434 @@
+""" This module provide a compact binary format to save
+and load portgraphs.
+
+Vertices, ports and edges are stored as packed arrays of
+ids. Actors are stored by their id, 'module:name', plus
+constructor data, i.e. literal values of attributes that
+differ from a freshly created actor. They are only created
+the first time they are accessed, so loading a portgraph
+does not import the modules of its nodes.
+
+Actors that can not be described this way are pickled as a
+fallback, only load files from trusted sources.
+
+Layout of a file (little endian):
+    - header: magic, version and number of strings,
+              actors, vertices, ports and edges
+    - strings: kinds, lengths and concatenated bytes
+    - actors: kinds, index of id and index of data in strings
+    - vertices: vid and index of actor (-1 if None)
+    - ports: pid, vid, index of local id in strings and is_out flag
+    - edges: eid, source pid and target pid
+"""
+
+import pickle
+import struct
+import sys
+from array import array
+from ast import literal_eval
+from importlib import import_module
+
+from openalea.container.property_graph import PropertyGraph
+
+from func_node import FuncNode, is_importable
+from port_graph import ActorRef, Port, PortGraph
+
+MAGIC = "OAPG"
+VERSION = 1
+
+_header = struct.Struct("<4sHIIIII")
+
+# kinds of actors
+_FUNC = ord('f')  # FuncNode created from importable function
+_CLASS = ord('c')  # actor created by calling the class named by its id
+_PICKLE = ord('p')  # any other actor, pickled
+
+# settings of freshly created actors, see default_settings
+_defaults = {}
+
+
+def _pack(typecode, values):
+    """ Convert a list of values into little endian bytes.
+    """
+    arr = array(typecode, values)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+
+    return arr.tostring()
+
+
+def _unpack(typecode, data, offset, nb):
+    """ Read nb little endian values from data.
+
+    return:
+        - (array, int): values and offset after them
+    """
+    arr = array(typecode)
+    end = offset + nb * arr.itemsize
+    arr.fromstring(data[offset:end])
+    if sys.byteorder == 'big':
+        arr.byteswap()
+
+    return arr, end
+
+
+def encode_string(key):
+    """ Convert a local id or actor data into bytes.
+
+    return:
+        - (str, str): kind of key and bytes
+    """
+    if isinstance(key, str):
+        return 's', key
+    elif isinstance(key, unicode):
+        return 'u', key.encode('utf-8')
+    elif isinstance(key, (int, long)) and not isinstance(key, bool):
+        return 'i', str(key)
+    else:
+        raise UserWarning("unable to save key '%s'" % str(key))
+
+
+def decode_string(kind, txt):
+    """ Convert bytes back into a local id.
+    """
+    if kind == 's':
+        return txt
+    elif kind == 'u':
+        return txt.decode('utf-8')
+    else:
+        return int(txt)
+
+
+def find_factory(actor_id):
+    """ Retrieve the object named by an actor id.
+
+    args:
+        - actor_id (str): 'module:name' id of actor
+
+    return:
+        - (any): None if id does not name an importable object
+    """
+    try:
+        modname, name = actor_id.split(":")
+        return getattr(import_module(modname), name)
+    except (ValueError, ImportError, AttributeError):
+        return None
+
+
+def create_actor(kind, factory):
+    """ Create an actor with the default settings of its kind.
+    """
+    if kind == _FUNC:
+        return FuncNode(factory)
+
+    return factory()
+
+
+def default_settings(kind, factory):
+    """ Settings of an actor freshly created from factory.
+
+    Results are memoized since creating a FuncNode parses
+    the source of its function.
+
+    return:
+        - (dict): None if factory can not create an actor alone
+    """
+    try:
+        return _defaults[(kind, factory)]
+    except KeyError:
+        try:
+            settings = node_settings(create_actor(kind, factory))
+        except TypeError:
+            settings = None
+
+        _defaults[(kind, factory)] = settings
+        return settings
+
+
+def encode_settings(settings, defaults):
+    """ Convert settings that differ from defaults into text.
+
+    Only literal values, and sets of them, can be encoded.
+    Descriptions of ports must be unchanged.
+
+    return:
+        - (str): None if settings can not be encoded
+    """
+    if set(settings) != set(defaults):
+        return None
+
+    diff = {}
+    for name, val in settings.items():
+        if val != defaults[name]:
+            if name in ('_inputs', '_outputs'):
+                return None
+            if isinstance(val, (set, frozenset)):
+                val = tuple(sorted(val))
+            diff[name] = val
+
+    if len(diff) == 0:
+        return ""
+
+    data = repr(diff)
+    try:
+        if literal_eval(data) != diff:
+            return None
+    except (ValueError, SyntaxError):
+        return None
+
+    return data
+
+
+def resolve_actor(kind, actor_id, data):
+    """ Create an actor from its saved description.
+
+    args:
+        - kind (int): either _FUNC, _CLASS or _PICKLE
+        - actor_id (str): 'module:name' id of actor
+        - data (str): constructor data
+
+    return:
+        - (IActor)
+    """
+    if kind == _PICKLE:
+        return pickle.loads(data)
+
+    actor = create_actor(kind, find_factory(actor_id))
+    if len(data) > 0:
+        for name, val in literal_eval(data).items():
+            if isinstance(getattr(actor, name, None), set):
+                val = set(val)
+            setattr(actor, name, val)
+
+    return actor
+
+
+def node_settings(node):
+    """ Gather all attributes of a node, e.g. lazy, priority
+    or descriptions of ports, in a comparable form.
+
+    return:
+        - (dict)
+    """
+    settings = dict(vars(node))
+    for name in ('_inputs', '_outputs'):
+        settings[name] = [(key, vars(port))
+                          for key, port in settings[name].items()]
+
+    return settings
+
+
+def describe_actor(actor):
+    """ Find how to save an actor.
+
+    FuncNodes of importable functions and actors of classes
+    named by their id are stored by id, plus the attributes
+    that differ from a freshly created actor. Other actors are
+    pickled as a last resort.
+
+    return:
+        - (int, str, str): kind, id and constructor data
+    """
+    actor_id = actor.get_id()
+    if type(actor) is FuncNode and is_importable(actor._func):
+        kind = _FUNC
+        factory = actor._func
+    elif find_factory(actor_id) is type(actor):
+        kind = _CLASS
+        factory = type(actor)
+    else:
+        kind = None
+
+    if kind is not None:
+        defaults = default_settings(kind, factory)
+        if defaults is not None:
+            data = encode_settings(node_settings(actor), defaults)
+            if data is not None:
+                return kind, actor_id, data
+
+    try:
+        # containers of portgraph do not support binary pickle protocols
+        data = pickle.dumps(actor, 0)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        raise UserWarning("actor '%s' can not be saved" % actor_id)
+
+    return _PICKLE, actor_id, data
+
+
+def dumps(portgraph):
+    """ Convert a portgraph into bytes.
+
+    args:
+        - portgraph (PortGraph): portgraph to save
+
+    return:
+        - (str)
+    """
+    pg = portgraph
+    strings = []
+    string_index = {}
+
+    def add_string(key):
+        kind, txt = encode_string(key)
+        try:
+            return string_index[(kind, txt)]
+        except KeyError:
+            ind = len(strings)
+            strings.append((kind, txt))
+            string_index[(kind, txt)] = ind
+            return ind
+
+    # actors
+    actors = []
+    actor_index = {}
+    vids = sorted(pg.vertices())
+    vertex_actors = []
+    for vid in vids:
+        actor = pg.actor(vid)
+        if actor is None:
+            vertex_actors.append(-1)
+        else:
+            if id(actor) not in actor_index:
+                kind, actor_id, data = describe_actor(actor)
+                actor_index[id(actor)] = len(actors)
+                actors.append((kind, add_string(actor_id), add_string(data)))
+            vertex_actors.append(actor_index[id(actor)])
+
+    # ports
+    pids = sorted(pg.ports())
+    port_vids = [pg.vertex(pid) for pid in pids]
+    port_locals = [add_string(pg.local_id(pid)) for pid in pids]
+    port_outs = [1 if pg.is_out_port(pid) else 0 for pid in pids]
+
+    # edges
+    eids = sorted(pg.edges())
+    sources = [pg.source_port(eid) for eid in eids]
+    targets = [pg.target_port(eid) for eid in eids]
+
+    chunks = [_header.pack(MAGIC, VERSION, len(strings), len(actors),
+                           len(vids), len(pids), len(eids)),
+              "".join(skind for skind, txt in strings),
+              _pack('i', [len(txt) for skind, txt in strings]),
+              "".join(txt for skind, txt in strings),
+              _pack('B', [akind for akind, iid, idata in actors]),
+              _pack('i', [iid for akind, iid, idata in actors]),
+              _pack('i', [idata for akind, iid, idata in actors]),
+              _pack('i', vids),
+              _pack('i', vertex_actors),
+              _pack('i', pids),
+              _pack('i', port_vids),
+              _pack('i', port_locals),
+              _pack('B', port_outs),
+              _pack('i', eids),
+              _pack('i', sources),
+              _pack('i', targets)]
+
+    return "".join(chunks)
+
+
+def loads(data):
+    """ Create a portgraph from bytes.
+
+    Actors are not created, they will be on first access.
+
+    args:
+        - data (str): bytes created by dumps
+
+    return:
+        - (PortGraph)
+    """
+    try:
+        (magic, version, nb_strings, nb_actors,
+         nb_vertices, nb_ports, nb_edges) = _header.unpack_from(data)
+    except struct.error:
+        raise ValueError("data is not a saved portgraph")
+
+    if magic != MAGIC:
+        raise ValueError("data is not a saved portgraph")
+
+    if version != VERSION:
+        raise ValueError("unsupported format version %d" % version)
+
+    ofs = _header.size
+
+    # strings
+    kinds = data[ofs:ofs + nb_strings]
+    ofs += nb_strings
+    lengths, ofs = _unpack('i', data, ofs, nb_strings)
+    raw = []
+    for length in lengths:
+        raw.append(data[ofs:ofs + length])
+        ofs += length
+
+    # actors
+    actor_kinds, ofs = _unpack('B', data, ofs, nb_actors)
+    actor_ids, ofs = _unpack('i', data, ofs, nb_actors)
+    actor_data, ofs = _unpack('i', data, ofs, nb_actors)
+    refs = [ActorRef(resolve_actor, kind, raw[iid], raw[idata])
+            for kind, iid, idata in zip(actor_kinds, actor_ids, actor_data)]
+
+    vids, ofs = _unpack('i', data, ofs, nb_vertices)
+    vertex_actors, ofs = _unpack('i', data, ofs, nb_vertices)
+
+    pids, ofs = _unpack('i', data, ofs, nb_ports)
+    port_vids, ofs = _unpack('i', data, ofs, nb_ports)
+    port_locals, ofs = _unpack('i', data, ofs, nb_ports)
+    port_outs, ofs = _unpack('B', data, ofs, nb_ports)
+
+    eids, ofs = _unpack('i', data, ofs, nb_edges)
+    sources, ofs = _unpack('i', data, ofs, nb_edges)
+    targets, ofs = _unpack('i', data, ofs, nb_edges)
+
+    if ofs != len(data):
+        raise ValueError("corrupted data")
+
+    # fill portgraph tables without the checks of edition methods
+    pg = PortGraph()
+    vertex_ports = pg.vertex_property("_ports")
+    vertex_actor = pg.vertex_property("_actor")
+    for vid, ind in zip(vids, vertex_actors):
+        PropertyGraph.add_vertex(pg, vid)
+        vertex_ports[vid] = set()
+        vertex_actor[vid] = None if ind < 0 else refs[ind]
+
+    local_ids = {}
+    for pid, vid, ind, is_out in zip(pids, port_vids, port_locals, port_outs):
+        if ind not in local_ids:
+            local_ids[ind] = decode_string(kinds[ind], raw[ind])
+
+        pg._pid_generator.get_id(pid)
+        pg._ports[pid] = Port(vid, local_ids[ind], bool(is_out))
+        vertex_ports[vid].add(pid)
+
+    source_port = pg.edge_property("_source_port")
+    target_port = pg.edge_property("_target_port")
+    for eid, sid, tid in zip(eids, sources, targets):
+        PropertyGraph.add_edge(pg, pg.vertex(sid), pg.vertex(tid), eid)
+        source_port[eid] = sid
+        target_port[eid] = tid
+
+    return pg
+
+
+def save(portgraph, filename):
+    """ Write a portgraph in a file.
+
+    args:
+        - portgraph (PortGraph): portgraph to save
+        - filename (str): path to file
+    """
+    with open(filename, 'wb') as f:
+        f.write(dumps(portgraph))
+
+
+def load(filename):
+    """ Read a portgraph from a file.
+
+    args:
+        - filename (str): path to file written by save
+
+    return:
+        - (PortGraph)
+    """
+    with open(filename, 'rb') as f:
+        return loads(f.read())
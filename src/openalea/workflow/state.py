@@ -5,6 +5,7 @@ THe main goal is to provide a snapshot of what happened
 to data in a workflow.
 """
 
+from copy import copy
 from hashlib import sha512
 
 
@@ -18,6 +19,207 @@ def hash_port_graph(pg):
     return sha512(str(vids) + str(eids) + str(pids)).digest()
 
 
+def edited_vertices(old_pg, new_pg):
+    """ Find vertices of a portgraph that differ from
+    vertices of another portgraph.
+
+    A vertex differs if it does not exist in the old portgraph,
+    if its actor is not the same object, if its ports or if its
+    incoming connections are not the same.
+
+    args:
+        - old_pg (PortGraph): reference portgraph
+        - new_pg (PortGraph): edited portgraph
+
+    return:
+        - (set of vid)
+    """
+    def signature(pg, vid):
+        ports = set((pid, pg.local_id(pid), pg.is_out_port(pid))
+                    for pid in pg.ports(vid))
+        edges = set((pg.source_port(eid), pg.target_port(eid))
+                    for eid in pg.in_edges(vid))
+        return ports, edges
+
+    edited = set()
+    for vid in new_pg.vertices():
+        if (vid not in old_pg or
+                old_pg.actor(vid) is not new_pg.actor(vid) or
+                signature(old_pg, vid) != signature(new_pg, vid)):
+            edited.add(vid)
+
+    return edited
+
+
+def edited_ports(old_pg, new_pg):
+    """ Find ports of a portgraph whose definition changed
+    in another portgraph.
+
+    A port differs if it does not exist in the new portgraph
+    or if its vertex, its local id or its direction are not
+    the same.
+
+    args:
+        - old_pg (PortGraph): reference portgraph
+        - new_pg (PortGraph): edited portgraph
+
+    return:
+        - (set of pid)
+    """
+    def signature(pg, pid):
+        return pg.vertex(pid), pg.local_id(pid), pg.is_out_port(pid)
+
+    new_pids = set(new_pg.ports())
+    return set(pid for pid in old_pg.ports()
+               if pid not in new_pids or
+               signature(old_pg, pid) != signature(new_pg, pid))
+
+
+# marker of entries removed from a ChainedDict but still in its parents
+_REMOVED = object()
+
+
+class ChainedDict(dict):
+    """ Dictionary whose missing entries are looked up in
+    a parent dictionary.
+
+    The parent is never modified through its children, it
+    must not be modified at all once shared.
+    """
+    # maximum number of layers before shared entries are merged
+    max_depth = 16
+
+    def __init__(self, parent=None):
+        dict.__init__(self)
+        self._parent = parent
+
+    def parent(self):
+        return self._parent
+
+    def layers(self):
+        """ Iterate on parents of this dictionary,
+        closest first.
+
+        return:
+            - (iter of ChainedDict)
+        """
+        table = self._parent
+        while table is not None:
+            yield table
+            table = table._parent
+
+    def depth(self):
+        """ Number of layers in this dictionary.
+
+        return:
+            - (int)
+        """
+        return 1 + sum(1 for table in self.layers())
+
+    def __getitem__(self, key):
+        val = dict.__getitem__(self, key)
+        if val is _REMOVED:
+            raise KeyError(key)
+
+        return val
+
+    def __missing__(self, key):
+        for table in self.layers():
+            if dict.__contains__(table, key):
+                return dict.__getitem__(table, key)
+
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key) is not _REMOVED
+
+        for table in self.layers():
+            if dict.__contains__(table, key):
+                return dict.__getitem__(table, key) is not _REMOVED
+
+        return False
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def flatten(self):
+        """ Construct a plain dictionary with all entries.
+
+        return:
+            - (dict)
+        """
+        ret = {}
+        for table in reversed(list(self.layers())):
+            ret.update(table)
+
+        ret.update(self)
+        return dict((key, val) for key, val in ret.items()
+                    if val is not _REMOVED)
+
+    def items(self):
+        return self.flatten().items()
+
+    def keys(self):
+        return self.flatten().keys()
+
+    def values(self):
+        return self.flatten().values()
+
+    def __iter__(self):
+        return iter(self.flatten())
+
+    def __len__(self):
+        return len(self.flatten())
+
+    def clear(self):
+        dict.clear(self)
+        self._parent = None
+
+    def drop(self, keys):
+        """ Remove entries, whether they are stored
+        in this dictionary or in its parents.
+
+        Parents are left untouched, entries stored in them
+        are marked as removed in this dictionary.
+
+        args:
+            - keys (iter of key): keys to remove, missing ones are ignored
+        """
+        for key in keys:
+            if key in self:
+                if any(dict.__contains__(table, key)
+                       for table in self.layers()):
+                    dict.__setitem__(self, key, _REMOVED)
+                else:
+                    dict.__delitem__(self, key)
+
+    def fork(self):
+        """ Find dictionary to share with forks.
+
+        Once returned, this dictionary must not be modified anymore.
+        Layers are merged into a new dictionary once there are
+        more than max_depth of them.
+
+        return:
+            - (ChainedDict): None if there is nothing to share
+        """
+        if dict.__len__(self) == 0:
+            shared = self._parent
+        else:
+            shared = self
+
+        if shared is not None and shared.depth() > self.max_depth:
+            merged = type(self)()
+            dict.update(merged, shared.flatten())
+            return merged
+
+        return shared
+
+
 class WorkflowState(object):
     """ Store outputs of node and provide a way to access them
     """
@@ -30,13 +232,22 @@ class WorkflowState(object):
         self._portgraph = portgraph
         self._init_sha = hash_port_graph(portgraph)
 
-        self._data = {}
-        self._param = {}
-        self._when = {}
+        self._init_tables()
+        self.clear()
 
-        self._last_evaluation = {}
+        if hasattr(portgraph, 'register_listener'):
+            portgraph.register_listener(self)
 
-        self.clear()
+    def _init_tables(self):
+        """ Create containers used to store data.
+        """
+        self._data = ChainedDict()
+        self._param = ChainedDict()
+        self._when = ChainedDict()
+
+        self._last_evaluation = ChainedDict()
+        self._input_when = ChainedDict()
+        self._reads = ChainedDict()
 
     def clear(self):
         """ Clear state
@@ -44,10 +255,200 @@ class WorkflowState(object):
         self._data.clear()
         self._param.clear()
         self._when.clear()
+        self._reads.clear()
         self._last_evaluation.clear()
         for vid in self._portgraph.vertices():
             self._last_evaluation[vid] = None
 
+        self._edited = set()
+        self.portgraph_changed()
+
+    def portgraph_changed(self):
+        """ Update information cached about the structure of
+        the portgraph.
+
+        Must be called each time the portgraph is edited.
+        """
+        pg = self._portgraph
+        last = self._last_evaluation
+        for vid in pg.vertices():
+            if vid not in last:
+                last[vid] = None
+
+        # output ports connected to each input port, sorted by priority
+        self._sources = {}
+        self._source_vertices = {}
+        # connected input ports whose when depends on each vertex
+        self._targets = dict((vid, set()) for vid in pg.vertices())
+        for pid in pg.in_ports():
+            npids = sorted(pg.connected_ports(pid), self.cmp_port_priority)
+            self._sources[pid] = tuple(npids)
+            vids = tuple(pg.vertex(npid) for npid in npids)
+            self._source_vertices[pid] = vids
+            for vid in vids:
+                self._targets[vid].add(pid)
+
+        self._input_when.clear()
+        for pid, vids in self._source_vertices.items():
+            if len(vids) > 0:
+                self._input_when[pid] = min(last[vid] for vid in vids)
+
+        self._lonely = set(pid for pid, npids in self._sources.items()
+                           if len(npids) == 0)
+        self._missing = set(pid for pid in self._lonely
+                            if pid not in self._param)
+
+    def _update_input_port(self, pid):
+        """ Update information cached about a single input port.
+        """
+        pg = self._portgraph
+        npids = sorted(pg.connected_ports(pid), self.cmp_port_priority)
+        vids = tuple(pg.vertex(npid) for npid in npids)
+        for vid in self._source_vertices.get(pid, ()):
+            if vid not in vids and vid in self._targets:
+                self._targets[vid].discard(pid)
+        for vid in vids:
+            self._targets[vid].add(pid)
+
+        self._sources[pid] = tuple(npids)
+        self._source_vertices[pid] = vids
+        if len(vids) == 0:
+            self._lonely.add(pid)
+            if pid not in self._param:
+                self._missing.add(pid)
+        else:
+            self._lonely.discard(pid)
+            self._missing.discard(pid)
+            last = self._last_evaluation
+            self._input_when[pid] = min(last[vid] for vid in vids)
+
+    def notify(self, sender, event):
+        """ Update information cached about the structure of
+        the portgraph after an edition.
+
+        Tables describing the structure of the portgraph are shared
+        between forks, updates must leave them in the same state
+        whatever the number of forks notified.
+
+        args:
+            - sender (PortGraph): edited portgraph
+            - event (tuple): see PortGraph
+        """
+        name = event[0]
+        if name == 'add_vertex':
+            vid = event[1]
+            self._last_evaluation[vid] = None
+            self._targets.setdefault(vid, set())
+            self._edited.add(vid)
+        elif name == 'remove_vertex':
+            self._targets.pop(event[1], None)
+            self._edited.discard(event[1])
+        elif name == 'add_port':
+            pid, vid = event[1:]
+            self._edited.add(vid)
+            if self._portgraph.is_in_port(pid):
+                # params of a removed port with the same id are obsolete
+                self._sources[pid] = ()
+                self._source_vertices[pid] = ()
+                self._lonely.add(pid)
+                self._missing.add(pid)
+        elif name == 'remove_port':
+            pid, vid = event[1:]
+            self._edited.add(vid)
+            self._sources.pop(pid, None)
+            self._source_vertices.pop(pid, None)
+            self._lonely.discard(pid)
+            self._missing.discard(pid)
+            for table in (self._data, self._param, self._when):
+                table.drop((pid,))
+        elif name in ('connect', 'disconnect'):
+            self._edited.add(self._portgraph.vertex(event[3]))
+            self._update_input_port(event[3])
+        elif name == 'set_actor':
+            # results of previous actor are obsolete
+            self._edited.add(event[1])
+            self.set_last_evaluation(event[1], None)
+        elif name == 'add_actors':
+            for vid in event[1]:
+                self._last_evaluation[vid] = None
+            self._edited.update(event[1])
+            self.portgraph_changed()
+        else:
+            self._edited.update(self._portgraph.vertices())
+            self.portgraph_changed()
+
+    def rebase(self, portgraph=None):
+        """ Accept editions of the portgraph.
+
+        Results of vertices whose upstream part of the portgraph
+        is unchanged are kept, all vertices downstream of edited
+        vertices will be evaluated again.
+
+        args:
+            - portgraph (PortGraph): new portgraph, edited version of
+                        the current one. If None, editions of current
+                        portgraph notified so far are accepted.
+        """
+        old_pg = self._portgraph
+        if portgraph is None or portgraph is old_pg:
+            pg = old_pg
+            edited = self._edited
+        else:
+            pg = portgraph
+            edited = edited_vertices(old_pg, pg)
+            # values stored on ports whose definition changed are obsolete
+            pids = edited_ports(old_pg, pg)
+            for table in (self._data, self._param, self._when):
+                table.drop(pids)
+            if hasattr(old_pg, 'unregister_listener'):
+                old_pg.unregister_listener(self)
+            if hasattr(pg, 'register_listener'):
+                pg.register_listener(self)
+
+        # invalidate downstream cone of edited vertices
+        invalid = set()
+        front = [vid for vid in edited if vid in pg]
+        while len(front) > 0:
+            vid = front.pop()
+            if vid not in invalid:
+                invalid.add(vid)
+                front.extend(pg.out_neighbors(vid))
+
+        self._portgraph = pg
+        self._init_sha = hash_port_graph(pg)
+        self._edited = set()
+
+        last = self._last_evaluation
+        for vid in pg.vertices():
+            if vid in invalid or vid not in last:
+                last[vid] = None
+
+        self.portgraph_changed()
+
+    def fork(self):
+        """ Create a new state sharing all data with this one.
+
+        Data stored afterward in either state is not visible
+        in the other one. Only modified entries are copied.
+
+        return:
+            - (WorkflowState)
+        """
+        child = copy(self)
+        for name in ('_data', '_param', '_when', '_last_evaluation',
+                     '_input_when', '_reads'):
+            table = getattr(self, name)
+            shared = table.fork()
+            setattr(self, name, type(table)(shared))
+            setattr(child, name, type(table)(shared))
+
+        child._missing = set(self._missing)
+        child._edited = set(self._edited)
+        if hasattr(self._portgraph, 'register_listener'):
+            self._portgraph.register_listener(child)
+
+        return child
+
     def portgraph(self):
         return self._portgraph
 
@@ -86,14 +487,16 @@ class WorkflowState(object):
          - param (any): value used as parameter
          - when (exec_id): id of execution when this action occurs
         """
-        if self._portgraph.is_out_port(pid):
-            raise UserWarning("no params associated to output ports")
+        if pid not in self._lonely:
+            if self._portgraph.is_out_port(pid):
+                raise UserWarning("no params associated to output ports")
 
-        if self._portgraph.nb_connections(pid) > 0:
-            raise UserWarning("no params associated to connected ports")
+            if self._portgraph.nb_connections(pid) > 0:
+                raise UserWarning("no params associated to connected ports")
 
         self._param[pid] = param
         self._when[pid] = when
+        self._missing.discard(pid)
 
     def cmp_port_priority(self, pid1, pid2):
         """ Compare port priority.
@@ -108,20 +511,20 @@ class WorkflowState(object):
         args:
          - pid (pid): id of port (in or out)
         """
-        pg = self._portgraph
-
-        if pg.is_out_port(pid):
+        try:
+            npids = self._sources[pid]
+        except KeyError:
+            # output port
             return self._data[pid]
+
+        if len(npids) == 0:
+            # lonely input port
+            return self._param[pid]
+        elif len(npids) == 1:
+            return self._data[npids[0]]
         else:
-            npids = list(pg.connected_ports(pid))
-            if len(npids) == 0:
-                # lonely input port
-                return self._param[pid]
-            elif len(npids) == 1:
-                return self.get(npids[0])
-            else:
-                npids.sort(self.cmp_port_priority)
-                return [self.get(nid) for nid in npids]
+            data = self._data
+            return [data[npid] for npid in npids]
 
     def when(self, pid):
         """ Retrieve execution id of storage
@@ -138,17 +541,15 @@ class WorkflowState(object):
         args:
          - pid (pid): id of port to check
         """
-        pg = self._portgraph
+        if pid in self._lonely:
+            return self._when[pid]
 
-        if pg.is_out_port(pid):
-            return self.last_evaluation(pg.vertex(pid))
-        else:
-            npids = list(pg.connected_ports(pid))
-            if len(npids) == 0:
-                # lonely input port
-                return self._when[pid]
-            else:
-                return min(self.when(pid) for pid in npids)
+        if pid in self._sources:
+            # connected input port
+            return self._input_when[pid]
+
+        # output port
+        return self.last_evaluation(self._portgraph.vertex(pid))
 
     def is_ready_for_evaluation(self):
         """ Test whether the state contains enough information
@@ -157,11 +558,15 @@ class WorkflowState(object):
         Simply check that each lonely input port has
         some data attached to it.
         """
-        pg = self._portgraph
-        param = self._param
+        return len(self._missing) == 0
 
-        return all(pid in param for pid in pg.in_ports()
-                   if pg.nb_connections(pid) == 0)
+    def missing_params(self):
+        """ Iterate on lonely input ports without data.
+
+        return:
+            - (iter of pid)
+        """
+        return iter(self._missing)
 
     def last_evaluation(self, vid):
         """ Retrieve execution id of last evaluation of this node.
@@ -175,6 +580,44 @@ class WorkflowState(object):
         """
         return self._last_evaluation[vid]
 
+    def delayed_reads(self, vid):
+        """ Retrieve delayed input ports whose value was requested
+        by the node during its last evaluation.
+
+        args:
+            - vid (vid): id of actor/task
+
+        return:
+            - (tuple of pid)
+        """
+        pg = self._portgraph
+        # ports may have been removed since last evaluation
+        return tuple(pid for pid in self._reads.get(vid, ())
+                     if pid in self._sources and pg.vertex(pid) == vid)
+
+    def set_delayed_reads(self, vid, pids):
+        """ Store delayed input ports whose value was requested
+        by the node during its last evaluation.
+
+        args:
+            - vid (vid): id of actor/task
+            - pids (list of pid): ids of delayed input ports
+        """
+        self._reads[vid] = tuple(pids)
+
+    def outdated_vertices(self, exec_id):
+        """ Find vertices not evaluated during a given execution.
+
+        args:
+            - exec_id (eid): id of execution
+
+        return:
+            - (set of vid)
+        """
+        last = self._last_evaluation
+        return set(vid for vid in self._portgraph.vertices()
+                   if last[vid] != exec_id)
+
     def set_last_evaluation(self, vid, exec_id):
         """ Store execution id of last evaluation of the node
 
@@ -183,4 +626,10 @@ class WorkflowState(object):
             - exec_id (id): id of last execution that evaluated
                             this node.
         """
-        self._last_evaluation[vid] = exec_id
+        last = self._last_evaluation
+        last[vid] = exec_id
+
+        # propagate to connected input ports
+        for pid in self._targets.get(vid, ()):
+            self._input_when[pid] = min(last[nid]
+                                        for nid in self._source_vertices[pid])
@@ -0,0 +1,252 @@
+""" This module provide an evaluation algorithm that pipelines
+items produced by streaming nodes through downstream nodes.
+
+Each node downstream of a streaming node is evaluated once per
+item in its own thread. Items are exchanged through bounded
+queues so that a fast producer waits for slow consumers instead
+of accumulating items in memory.
+"""
+
+import sys
+from Queue import Empty, Full, Queue
+from threading import Event, Thread
+
+from evaluation import BruteEvaluation, EvaluationError, evaluation_order
+
+# marker sent through queues when a stream is exhausted
+_END = object()
+
+
+class StreamAborted(Exception):
+    """ Raised in a pipeline thread when another one failed.
+    """
+    pass
+
+
+def get_item(queue, abort):
+    """ Wait for an item unless pipeline has been aborted.
+    """
+    while True:
+        try:
+            return queue.get(timeout=0.1)
+        except Empty:
+            if abort.is_set():
+                raise StreamAborted()
+
+
+def put_item(queue, item, abort):
+    """ Wait for some room in queue unless pipeline has been aborted.
+    """
+    while True:
+        try:
+            return queue.put(item, timeout=0.1)
+        except Full:
+            if abort.is_set():
+                raise StreamAborted()
+
+
+class StreamEvaluation(BruteEvaluation):
+    """ Evaluate streaming nodes and the nodes downstream
+    of them once per item.
+
+    After evaluation, output ports of streamed nodes hold the
+    value of the last item, except collected ports which hold
+    the list of all items.
+    """
+    def __init__(self, portgraph, maxsize=16, collect=()):
+        """ Constructor
+
+        args:
+            - portgraph (PortGraph): the portgraph to evaluate
+            - maxsize (int): maximum number of items waiting
+                             between two nodes
+            - collect (list of pid): output ports whose successive
+                                     values are all stored
+        """
+        BruteEvaluation.__init__(self, portgraph)
+        self._maxsize = maxsize
+        self._collect = set(collect)
+
+    def streamed_vertices(self):
+        """ Find vertices evaluated once per item, i.e. streaming
+        nodes and all nodes downstream of them.
+
+        return:
+            - (set of vid)
+        """
+        pg = self._portgraph
+        streamed = set()
+        front = [vid for vid in pg.vertices() if pg.actor(vid).is_streaming()]
+        while len(front) > 0:
+            vid = front.pop()
+            if vid not in streamed:
+                streamed.add(vid)
+                front.extend(pg.out_neighbors(vid))
+
+        return streamed
+
+    def eval(self, env, state, vid=None):
+        pg = self._portgraph
+
+        if not state.is_ready_for_evaluation():
+            raise EvaluationError("state not ready for evaluation")
+
+        order = evaluation_order(pg)
+        if vid is not None:
+            upstream = set()
+            front = [vid]
+            while len(front) > 0:
+                uid = front.pop()
+                if uid not in upstream:
+                    upstream.add(uid)
+                    front.extend(pg.in_neighbors(uid))
+            order = [nid for nid in order if nid in upstream]
+
+        # nodes not downstream of a stream are evaluated once
+        streamed = self.streamed_vertices()
+        current_eid = env.current_execution()
+        for nid in order:
+            if nid not in streamed:
+                if state.last_evaluation(nid) != current_eid:
+                    self.eval_from_node(env, state, nid)
+
+        vids = [nid for nid in order if nid in streamed]
+        if len(vids) > 0:
+            self.eval_pipeline(env, state, vids)
+
+    def eval_pipeline(self, env, state, vids):
+        """ Evaluate streamed nodes concurrently.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): state holding results of non
+                                     streamed nodes
+            - vids (list of vid): streamed vertices to evaluate
+        """
+        pg = self._portgraph
+        abort = Event()
+        errors = []
+
+        queues = {}
+        for vid in vids:
+            for nid in set(pg.in_neighbors(vid)):
+                if nid in vids:
+                    queues[(nid, vid)] = Queue(self._maxsize)
+
+        threads = [Thread(target=self.eval_streamed_node,
+                          args=(env, state, vid, queues, abort, errors))
+                   for vid in vids]
+        for th in threads:
+            th.daemon = True
+            th.start()
+
+        for th in threads:
+            th.join()
+
+        if len(errors) > 0:
+            typ, err, tb = errors[0]
+            raise typ, err, tb
+
+    def eval_streamed_node(self, env, state, vid, queues, abort, errors):
+        """ Evaluate a node for each item coming from upstream.
+
+        args:
+            - env (EvaluationEnvironment): environment in which to perform
+                                           the evaluation
+            - state (WorkflowState): state holding results of non
+                                     streamed nodes
+            - vid (vid): id of vertex to evaluate
+            - queues (dict of (vid, vid): Queue): queue for each
+                                     connected pair of streamed vertices
+            - abort (Event): set when a node failed
+            - errors (list): store exceptions raised by nodes
+        """
+        pg = self._portgraph
+        node = pg.actor(vid)
+
+        inqueues = [q for (nid, tid), q in queues.items() if tid == vid]
+        outqueues = [q for (nid, tid), q in queues.items() if nid == vid]
+        ended = set()
+
+        sources = [(pid, sorted(pg.connected_ports(pid)))
+                   for pid in (pg.in_port(vid, key) for key in node.inputs())]
+        outputs = [pg.out_port(vid, key) for key in node.outputs()]
+        collected = dict((pid, []) for pid in outputs if pid in self._collect)
+
+        def items():
+            if len(inqueues) == 0:
+                yield {}
+                return
+
+            while True:
+                item = {}
+                for q in inqueues:
+                    values = get_item(q, abort)
+                    if values is _END:
+                        ended.add(q)
+                        return
+                    item.update(values)
+
+                yield item
+
+        def get(pid, item):
+            if pid in item:
+                return item[pid]
+            else:
+                return state.get(pid)
+
+        last = None
+        try:
+            for item in items():
+                inputs = []
+                for pid, npids in sources:
+                    if len(npids) == 0:
+                        inputs.append(state.get(pid))
+                    elif len(npids) == 1:
+                        inputs.append(get(npids[0], item))
+                    else:
+                        inputs.append([get(npid, item) for npid in npids])
+
+                rets = node(inputs)
+                if not node.is_streaming():
+                    rets = (rets,)
+
+                for values in rets:
+                    try:
+                        if len(values) != len(outputs):
+                            msg = "mismatch nb out ports vs. function result"
+                            raise EvaluationError(msg)
+                    except TypeError:
+                        msg = "Function needs to return a list of values"
+                        raise EvaluationError(msg)
+
+                    last = dict(zip(outputs, values))
+                    for q in outqueues:
+                        put_item(q, last, abort)
+                    for pid, vals in collected.items():
+                        vals.append(last[pid])
+
+            state.set_last_evaluation(vid, env.current_execution())
+            if last is not None:
+                for pid, val in last.items():
+                    state.store(pid, val)
+            for pid, vals in collected.items():
+                state.store(pid, vals)
+
+            # consume remaining items of longer upstream streams
+            for q in inqueues:
+                while q not in ended:
+                    if get_item(q, abort) is _END:
+                        ended.add(q)
+        except StreamAborted:
+            pass
+        except Exception:
+            errors.append(sys.exc_info())
+            abort.set()
+        finally:
+            for q in outqueues:
+                try:
+                    put_item(q, _END, abort)
+                except StreamAborted:
+                    pass
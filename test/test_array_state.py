@@ -0,0 +1,113 @@
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_raises
+
+try:
+    from openalea.workflow.array_state import ArrayWorkflowState, ExecArray
+except ImportError:
+    raise SkipTest("numpy not available")
+
+from openalea.workflow.evaluation import BruteEvaluation, LazyEvaluation
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.port_graph import PortGraph
+
+
+def test_exec_array():
+    table = ExecArray()
+    assert 0 not in table
+    assert_raises(KeyError, lambda: table[0])
+
+    table[3] = None
+    table[5] = 10
+    assert 3 in table
+    assert 4 not in table
+    assert table[3] is None
+    assert table[5] == 10
+    assert table.get(4) is None
+    assert_raises(ValueError, lambda: table.__setitem__(0, -3))
+
+    child = ExecArray(table.fork())
+    child[5] = 11
+    child[20] = 1
+    assert table[5] == 10
+    assert 20 not in table
+    assert child[5] == 11
+
+    table.clear()
+    assert 5 not in table
+    assert child[5] == 11
+
+    child.drop([3, 5, 40])
+    assert 5 not in child
+    assert child[20] == 1
+
+
+def get_pg():
+    def double(x):
+        y = x * 2
+        return y
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(double), 0)
+    pg.add_actor(FuncNode(double), 2)
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'x'))
+
+    return pg
+
+
+def test_array_ws_metadata():
+    pg = get_pg()
+    ws = ArrayWorkflowState(pg)
+    assert ws.last_evaluation(0) is None
+    assert ws.last_evaluation(2) is None
+    assert_raises(KeyError, lambda: ws.last_evaluation(1))
+    assert_raises(KeyError, lambda: ws.when(pg.in_port(0, 'x')))
+
+    ws.store_param(pg.in_port(0, 'x'), 1, 3)
+    assert ws.when(pg.in_port(0, 'x')) == 3
+
+    ws.set_last_evaluation(0, 4)
+    assert ws.when(pg.in_port(2, 'x')) == 4
+    assert ws.outdated_vertices(4) == {2}
+    assert ws.outdated_vertices(None) == {0}
+
+    fws = ws.fork()
+    fws.set_last_evaluation(2, 5)
+    assert ws.last_evaluation(2) is None
+    assert fws.last_evaluation(2) == 5
+
+    ws.clear()
+    assert ws.last_evaluation(0) is None
+    assert fws.last_evaluation(0) == 4
+
+
+def test_array_ws_evaluation():
+    pg = get_pg()
+
+    for algo_cls in (BruteEvaluation, LazyEvaluation):
+        env = EvaluationEnvironment()
+        ws = ArrayWorkflowState(pg)
+        ws.store_param(pg.in_port(0, 'x'), 1, env.current_execution())
+
+        algo = algo_cls(pg)
+        assert algo.requires_evaluation(env, ws)
+        algo.eval(env, ws)
+        assert not algo.requires_evaluation(env, ws)
+        assert ws.get(pg.out_port(2, 'y')) == 4
+
+
+def test_array_ws_outdated_vertices_ignore_removed_vertices():
+    pg = get_pg()
+    vid = pg.add_vertex()
+    env = EvaluationEnvironment()
+    ws = ArrayWorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 1, env.current_execution())
+    assert ws.outdated_vertices(env.current_execution()) == {0, 2, vid}
+
+    pg.remove_vertex(vid)
+    assert ws.outdated_vertices(env.current_execution()) == {0, 2}
+
+    algo = BruteEvaluation(pg)
+    algo.eval(env, ws)
+    assert algo.stale_vertices(env, ws) == set()
+    assert not algo.requires_evaluation(env, ws)
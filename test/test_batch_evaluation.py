@@ -0,0 +1,82 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.batch_evaluation import BatchEvaluation
+from openalea.workflow.evaluation import EvaluationError
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode, vectorized
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+calls = []
+
+
+def add(a, b):
+    calls.append('add')
+    c = a + b
+    return c
+
+
+@vectorized
+def double(x):
+    calls.append('double')
+    y = [2 * v for v in x]
+    return y
+
+
+def total(vals):
+    return sum(vals)
+
+
+def get_pg():
+    pg = PortGraph()
+    pg.add_actor(FuncNode(add), 0)
+    pg.add_actor(FuncNode(double), 1)
+    pg.add_actor(FuncNode(total), 2)
+    pg.connect(pg.out_port(0, 'c'), pg.in_port(1, 'x'))
+    pg.connect(pg.out_port(0, 'c'), pg.in_port(2, 'vals'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'vals'))
+
+    return pg
+
+
+def test_batch_evaluation_map_and_vectorize():
+    pg = get_pg()
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'a'), [1, 2, 3], 0)
+    ws.store_param(pg.in_port(0, 'b'), [10, 20, 30], 0)
+
+    del calls[:]
+    BatchEvaluation(pg).eval(env, ws)
+    assert calls == ['add'] * 3 + ['double']
+
+    assert ws.get(pg.out_port(0, 'c')) == [11, 22, 33]
+    assert ws.get(pg.out_port(1, 'y')) == [22, 44, 66]
+    assert ws.get(pg.out_port(2, 'res')) == [33, 66, 99]
+
+
+def test_batch_evaluation_params_must_have_same_size():
+    pg = get_pg()
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'a'), [1, 2, 3], 0)
+    ws.store_param(pg.in_port(0, 'b'), [10, 20], 0)
+
+    algo = BatchEvaluation(pg)
+    assert_raises(EvaluationError, lambda: algo.eval(env, ws))
+
+
+def test_batch_evaluation_without_params():
+    def func():
+        return 1
+
+    pg = PortGraph()
+    vid = pg.add_actor(FuncNode(func))
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+
+    algo = BatchEvaluation(pg)
+    assert_raises(EvaluationError, lambda: algo.eval(env, ws))
+
+    algo.eval(env, ws, size=2)
+    assert ws.get(pg.out_port(vid, 'res')) == [1, 1]
@@ -0,0 +1,129 @@
+from openalea.workflow.common_subexpression import (CSEEvaluation,
+                                                    find_equivalent_vertices)
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode, pure
+from openalea.workflow.map_reduce import MapNode
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+evaluated = []
+
+
+def inc(a):
+    evaluated.append(a)
+    b = a + 1
+    return b
+
+
+def add(a, b):
+    evaluated.append((a, b))
+    c = a + b
+    return c
+
+
+def get_pg(pure=True):
+    pg = PortGraph()
+    for vid in range(4):
+        pg.add_actor(FuncNode(inc), vid)
+        pg.actor(vid).set_pure(pure)
+
+    pg.add_actor(FuncNode(add), 4)
+    pg.add_actor(FuncNode(add), 5)
+    pg.connect(pg.out_port(0, 'b'), pg.in_port(2, 'a'))
+    pg.connect(pg.out_port(1, 'b'), pg.in_port(3, 'a'))
+    pg.connect(pg.out_port(2, 'b'), pg.in_port(4, 'a'))
+    pg.connect(pg.out_port(3, 'b'), pg.in_port(4, 'b'))
+    pg.connect(pg.out_port(2, 'b'), pg.in_port(5, 'a'))
+
+    return pg
+
+
+def get_state(pg, v0, v1):
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'a'), v0, 0)
+    ws.store_param(pg.in_port(1, 'a'), v1, 0)
+    ws.store_param(pg.in_port(5, 'b'), 0, 0)
+
+    return ws
+
+
+def test_find_equivalent_vertices():
+    pg = get_pg()
+
+    reps = find_equivalent_vertices(pg, get_state(pg, 1, 1))
+    assert reps == {1: 0, 3: 2}
+
+    reps = find_equivalent_vertices(pg, get_state(pg, 1, 2))
+    assert reps == {}
+
+    reps = find_equivalent_vertices(pg, get_state(pg, [1], [1]))
+    assert reps == {}
+
+
+def test_find_equivalent_vertices_only_for_pure_nodes():
+    pg = get_pg(False)
+
+    reps = find_equivalent_vertices(pg, get_state(pg, 1, 1))
+    assert reps == {}
+
+
+def test_cse_evaluation_evaluates_representative_only():
+    pg = get_pg()
+    env = EvaluationEnvironment()
+    ws = get_state(pg, 1, 1)
+
+    del evaluated[:]
+    CSEEvaluation(pg).eval(env, ws)
+    assert len(evaluated) == 4
+    assert ws.get(pg.out_port(3, 'b')) == 3
+    assert ws.get(pg.out_port(4, 'c')) == 6
+    assert ws.last_evaluation(3) == env.current_execution()
+
+    pg = get_pg(False)
+    ws = get_state(pg, 1, 1)
+
+    del evaluated[:]
+    CSEEvaluation(pg).eval(env, ws)
+    assert len(evaluated) == 6
+    assert ws.get(pg.out_port(4, 'c')) == 6
+
+
+def test_find_equivalent_vertices_same_id_different_actors():
+    @pure
+    def double(x):
+        y = x * 2
+        return y
+
+    @pure
+    def square(x):
+        y = x * x
+        return y
+
+    def get_scale(k):
+        @pure
+        def scale(x):
+            y = x * k
+            return y
+
+        return scale
+
+    for n1, n2 in [(MapNode(FuncNode(double)), MapNode(FuncNode(square))),
+                   (FuncNode(get_scale(2)), FuncNode(get_scale(3)))]:
+        assert n1.is_pure() and n2.is_pure()
+        pg = PortGraph()
+        pg.add_actor(n1, 0)
+        pg.add_actor(n2, 1)
+        ws = WorkflowState(pg)
+        ws.store_param(pg.in_port(0, 'x'), (3, 4), 0)
+        ws.store_param(pg.in_port(1, 'x'), (3, 4), 0)
+        assert find_equivalent_vertices(pg, ws) == {}
+
+    pg = PortGraph()
+    pg.add_actor(MapNode(FuncNode(double)), 0)
+    pg.add_actor(MapNode(FuncNode(square)), 1)
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), (3, 4), 0)
+    ws.store_param(pg.in_port(1, 'x'), (3, 4), 0)
+    CSEEvaluation(pg).eval(EvaluationEnvironment(), ws)
+    assert ws.get(pg.out_port(0, 'y')) == [6, 8]
+    assert ws.get(pg.out_port(1, 'y')) == [9, 16]
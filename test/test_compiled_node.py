@@ -0,0 +1,140 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.compiled_node import CompiledNode, compile_portgraph
+from openalea.workflow.evaluation import BruteEvaluation, evaluation_order
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+from openalea.workflow.sub_port_graph import SubPortGraph
+
+
+def get_pg():
+    def add(a, b):
+        c = a + b
+        return c
+
+    def split(txt):
+        return txt[0], txt[1:]
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(split), 0)
+    pg.add_actor(FuncNode(add), 1)
+    pg.add_actor(FuncNode(add), 2)
+    pg.connect(pg.out_port(0, 'res1'), pg.in_port(1, 'a'))
+    pg.connect(pg.out_port(0, 'res2'), pg.in_port(1, 'b'))
+    pg.connect(pg.out_port(1, 'c'), pg.in_port(2, 'a'))
+
+    return pg
+
+
+def test_evaluation_order_respects_dependencies():
+    pg = get_pg()
+
+    assert evaluation_order(pg) == [0, 1, 2]
+
+
+def test_compile_portgraph_lonely_ports_become_arguments():
+    pg = get_pg()
+    func = compile_portgraph(pg)
+
+    assert func("abc", "d") == ("abcd",)
+
+
+def test_compile_portgraph_explicit_ports():
+    pg = get_pg()
+    inputs = [('b', pg.in_port(2, 'b')), ('txt', pg.in_port(0, 'txt'))]
+    outputs = [('head', pg.out_port(0, 'res1')), ('c', pg.out_port(2, 'c'))]
+    func = compile_portgraph(pg, inputs, outputs)
+
+    assert func("d", "abc") == ("a", "abcd")
+
+    assert_raises(UserWarning,
+                  lambda: compile_portgraph(pg, [(0, pg.in_port(1, 'a'))]))
+
+
+def test_compile_portgraph_hidden_ports_use_defaults():
+    def scale(x, k=3):
+        y = x * k
+        return y
+
+    def mul(x, k):
+        y = x * k
+        return y
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(scale), 0)
+    func = compile_portgraph(pg, [('x', pg.in_port(0, 'x'))])
+    assert func(2) == (6,)
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(mul), 0)
+    assert_raises(UserWarning,
+                  lambda: compile_portgraph(pg, [('x', pg.in_port(0, 'x'))]))
+
+
+def test_compile_portgraph_same_result_as_evaluation():
+    pg = get_pg()
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'txt'), "toto", 0)
+    ws.store_param(pg.in_port(2, 'b'), "titi", 0)
+    BruteEvaluation(pg).eval(env, ws)
+
+    func = compile_portgraph(pg)
+    assert func("toto", "titi") == (ws.get(pg.out_port(2, 'c')),)
+
+
+def test_compile_portgraph_fan_in():
+    def func(a):
+        return a
+
+    def fan(a):
+        return a
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(func), 0)
+    pg.add_actor(FuncNode(func), 1)
+    pg.add_actor(FuncNode(fan), 2)
+    pg.connect(pg.out_port(1, 'a'), pg.in_port(2, 'a'))
+    pg.connect(pg.out_port(0, 'a'), pg.in_port(2, 'a'))
+
+    assert compile_portgraph(pg)(1, 2) == ([1, 2],)
+
+
+def test_compile_subportgraph():
+    pg = get_pg()
+    sub = SubPortGraph(pg, (1, 2))
+    func = compile_portgraph(sub)
+
+    assert func("a", "b", "c") == ("abc",)
+
+
+def test_compiled_node_used_as_actor():
+    pg = get_pg()
+    node = CompiledNode(pg, [('txt', pg.in_port(0, 'txt')),
+                             ('b', pg.in_port(2, 'b'))],
+                        [('res', pg.out_port(2, 'c'))])
+    assert tuple(node.inputs()) == ('txt', 'b')
+    assert tuple(node.outputs()) == ('res',)
+    assert node.is_lazy()
+    assert "def " in node.source()
+
+    mpg = PortGraph()
+    vid = mpg.add_actor(node)
+    env = EvaluationEnvironment()
+    ws = WorkflowState(mpg)
+    ws.store_param(mpg.in_port(vid, 'txt'), "abc", 0)
+    ws.store_param(mpg.in_port(vid, 'b'), "d", 0)
+    BruteEvaluation(mpg).eval(env, ws)
+
+    assert ws.get(mpg.out_port(vid, 'res')) == "abcd"
+
+
+def test_compiled_node_reuse_generated_code():
+    pg = get_pg()
+    func1 = compile_portgraph(pg)
+    func2 = compile_portgraph(pg)
+
+    assert func1.__code__ is func2.__code__
@@ -0,0 +1,148 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.composite_node import CompositeNode, flatten
+from openalea.workflow.evaluation import BruteEvaluation, EvaluationError
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+
+def add(a, b):
+    c = a + b
+    return c
+
+
+def get_inner():
+    pg = PortGraph()
+    pg.add_actor(FuncNode(add), 0)
+    pg.add_actor(FuncNode(add), 1)
+    pg.connect(pg.out_port(0, 'c'), pg.in_port(1, 'a'))
+
+    return pg
+
+
+def get_composite():
+    inner = get_inner()
+    return CompositeNode(inner, [('x', inner.in_port(0, 'a')),
+                                 ('y', inner.in_port(0, 'b')),
+                                 ('z', inner.in_port(1, 'b'))],
+                         [('res', inner.out_port(1, 'c'))])
+
+
+def test_composite_node_ports():
+    node = get_composite()
+    assert tuple(node.inputs()) == ('x', 'y', 'z')
+    assert tuple(node.outputs()) == ('res',)
+    assert node.input_pid('z') == node.portgraph().in_port(1, 'b')
+
+    inner = get_inner()
+    ipid = inner.in_port(1, 'a')
+    opid = inner.out_port(1, 'c')
+    assert_raises(UserWarning, lambda: CompositeNode(inner, [('x', ipid)]))
+    assert_raises(UserWarning, lambda: CompositeNode(inner, [('x', opid)]))
+    assert_raises(UserWarning,
+                  lambda: CompositeNode(inner, None, [('x', ipid)]))
+
+
+def test_composite_node_default_ports():
+    inner = get_inner()
+    node = CompositeNode(inner)
+    assert len(tuple(node.inputs())) == 3
+    assert tuple(node.outputs()) == (inner.out_port(1, 'c'),)
+
+
+def test_composite_node_call():
+    node = get_composite()
+    assert node((1, 2, 3)) == (6,)
+    assert node(('a', 'b', 'c')) == ('abc',)
+
+
+def test_composite_node_use_defaults_for_hidden_ports():
+    inner = get_inner()
+    node = CompositeNode(inner, [('x', inner.in_port(0, 'a'))],
+                         [('res', inner.out_port(0, 'c'))])
+    assert_raises(EvaluationError, lambda: node((1,)))
+
+    inner.actor(0).input('b').default = 10
+    inner.actor(1).input('b').default = 0
+    node.reset()
+
+    assert node((1,)) == (11,)
+
+
+def test_composite_node_use_defaults_of_functions():
+    def scale(x, k=3):
+        y = x * k
+        return y
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(scale), 0)
+    node = CompositeNode(pg, [('x', pg.in_port(0, 'x'))])
+    assert node.hidden_params() == {pg.in_port(0, 'k'): 3}
+    assert node((2,)) == (6,)
+
+
+def get_outer():
+    def num(n):
+        return n
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(num), 0)
+    pg.add_actor(get_composite(), 1)
+    pg.add_actor(FuncNode(num), 2)
+    pg.connect(pg.out_port(0, 'n'), pg.in_port(1, 'x'))
+    pg.connect(pg.out_port(0, 'n'), pg.in_port(1, 'y'))
+    pg.connect(pg.out_port(1, 'res'), pg.in_port(2, 'n'))
+
+    return pg
+
+
+def evaluate(pg):
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    for pid in pg.in_ports():
+        if pg.nb_connections(pid) == 0:
+            ws.store_param(pid, 1, env.current_execution())
+
+    BruteEvaluation(pg).eval(env, ws)
+
+    return ws.get(pg.out_port(2, 'n'))
+
+
+def test_composite_node_in_portgraph():
+    pg = get_outer()
+    assert evaluate(pg) == 3
+
+
+def test_flatten_inline_composite_vertices():
+    pg = get_outer()
+    inlined, params = flatten(pg)
+
+    assert params == {}
+    assert tuple(inlined.keys()) == (1,)
+    assert 1 not in pg
+    assert len(tuple(pg.vertices())) == 4
+    assert sorted(inlined[1].keys()) == [0, 1]
+
+    assert evaluate(pg) == 3
+
+
+def test_flatten_nested_composites():
+    pg = get_outer()
+    outer = CompositeNode(pg, [], [('res', pg.out_port(2, 'n'))])
+
+    mpg = PortGraph()
+    vid = mpg.add_actor(outer)
+    inlined, params = flatten(mpg)
+
+    # hidden port 'z' of inner composite keeps its default value
+    (pid, val), = params.items()
+    assert mpg.local_id(pid) == 'b'
+    assert mpg.nb_connections(pid) == 0
+    assert val is None
+    assert vid in inlined
+    assert len(inlined) == 2
+    assert len(tuple(mpg.vertices())) == 4
+    assert not any(isinstance(mpg.actor(v), CompositeNode)
+                   for v in mpg.vertices())
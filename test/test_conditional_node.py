@@ -0,0 +1,227 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.compiled_node import CompiledNode
+from openalea.workflow.conditional_node import IfNode, SwitchNode
+from openalea.workflow.evaluation import BruteEvaluation, LazyEvaluation
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+evaluated = []
+
+
+def branch_a(x):
+    evaluated.append('a')
+    y = x + 1
+    return y
+
+
+def branch_b(x):
+    evaluated.append('b')
+    y = x * 10
+    return y
+
+
+def get_pg(node):
+    pg = PortGraph()
+    pg.add_actor(FuncNode(branch_a), 0)
+    pg.add_actor(FuncNode(branch_b), 1)
+    pg.add_actor(node, 2)
+
+    return pg
+
+
+def test_if_node_ports():
+    node = IfNode()
+    assert tuple(node.inputs()) == ('cond', 'if_true', 'if_false')
+    assert not node.is_delayed('cond')
+    assert node.is_delayed('if_true')
+    assert node.is_delayed('if_false')
+
+    assert node((True, lambda: 1, lambda: 2)) == (1,)
+    assert node((False, lambda: 1, lambda: 2)) == (2,)
+
+
+def test_switch_node_ports():
+    node = SwitchNode(['a', 'b'])
+    assert tuple(node.inputs()) == ('key', 'a', 'b')
+    assert node.is_delayed('a')
+
+    assert node(('b', lambda: 1, lambda: 2)) == (2,)
+    assert_raises(KeyError, lambda: node(('c', lambda: 1, lambda: 2)))
+    assert_raises(KeyError, lambda: SwitchNode(['key']))
+
+
+def test_if_node_evaluate_only_selected_branch():
+    pg = get_pg(IfNode())
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'if_true'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'if_false'))
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 1, 0)
+    ws.store_param(pg.in_port(1, 'x'), 1, 0)
+    ws.store_param(pg.in_port(2, 'cond'), True, 0)
+
+    algo = BruteEvaluation(pg)
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert evaluated == ['a']
+    assert ws.get(pg.out_port(2, 'res')) == 2
+
+    env.new_execution()
+    ws.store_param(pg.in_port(2, 'cond'), False, env.current_execution())
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert evaluated == ['b']
+    assert ws.get(pg.out_port(2, 'res')) == 10
+
+
+def test_if_node_lazy_evaluation():
+    pg = get_pg(IfNode())
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'if_true'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'if_false'))
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 1, 0)
+    ws.store_param(pg.in_port(1, 'x'), 1, 0)
+    ws.store_param(pg.in_port(2, 'cond'), True, 0)
+
+    algo = LazyEvaluation(pg)
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert evaluated == ['a']
+
+    # unused branch modified, selected branch is not evaluated again
+    env.new_execution()
+    ws.store_param(pg.in_port(1, 'x'), 2, env.current_execution())
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert evaluated == []
+    assert ws.get(pg.out_port(2, 'res')) == 2
+
+    # switching branch takes modification into account
+    env.new_execution()
+    ws.store_param(pg.in_port(2, 'cond'), False, env.current_execution())
+    algo.eval(env, ws)
+    assert evaluated == ['b']
+    assert ws.get(pg.out_port(2, 'res')) == 20
+
+
+def test_if_node_lazy_evaluation_skip_unchanged_node():
+    def expensive(res):
+        evaluated.append('expensive')
+        return res
+
+    pg = get_pg(IfNode())
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'if_true'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'if_false'))
+    vid = pg.add_actor(FuncNode(expensive))
+    pg.connect(pg.out_port(2, 'res'), pg.in_port(vid, 'res'))
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 1, 0)
+    ws.store_param(pg.in_port(1, 'x'), 1, 0)
+    ws.store_param(pg.in_port(2, 'cond'), True, 0)
+
+    algo = LazyEvaluation(pg)
+    algo.eval(env, ws)
+    assert ws.delayed_reads(2) == (pg.in_port(2, 'if_true'),)
+    assert not algo.requires_evaluation(env, ws)
+
+    # nothing changed, neither if node nor downstream are called
+    eid = env.current_execution()
+    env.new_execution()
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert evaluated == []
+    assert ws.last_evaluation(2) == eid
+
+    # selected branch modified
+    env.new_execution()
+    ws.store_param(pg.in_port(0, 'x'), 2, env.current_execution())
+    algo.eval(env, ws)
+    assert evaluated == ['a', 'expensive']
+    assert ws.get(pg.out_port(vid, 'res')) == 3
+    assert ws.last_evaluation(2) == env.current_execution()
+
+
+def test_if_node_unselected_branch_is_not_stale():
+    pg = get_pg(IfNode())
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'if_true'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'if_false'))
+
+    for algo_cls in (BruteEvaluation, LazyEvaluation):
+        env = EvaluationEnvironment()
+        ws = WorkflowState(pg)
+        ws.store_param(pg.in_port(0, 'x'), 1, 0)
+        ws.store_param(pg.in_port(1, 'x'), 1, 0)
+        ws.store_param(pg.in_port(2, 'cond'), True, 0)
+
+        algo = algo_cls(pg)
+        assert algo.stale_vertices(env, ws) == {2}
+        algo.eval(env, ws)
+        assert ws.last_evaluation(1) is None
+        assert not algo.requires_evaluation(env, ws)
+
+
+def test_if_node_lazy_explain():
+    pg = get_pg(IfNode())
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'if_true'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'if_false'))
+    cond = pg.in_port(2, 'cond')
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 1, 0)
+    ws.store_param(pg.in_port(1, 'x'), 1, 0)
+    ws.store_param(cond, True, 0)
+
+    algo = LazyEvaluation(pg)
+    algo.eval(env, ws)
+
+    # unselected branch is never evaluated
+    env.new_execution()
+    ws.store_param(pg.in_port(1, 'x'), 2, env.current_execution())
+    assert algo.explain(env, ws) == []
+
+    env.new_execution()
+    ws.store_param(pg.in_port(0, 'x'), 2, env.current_execution())
+    assert algo.explain(env, ws) == [
+        (0, ('input_changed', pg.in_port(0, 'x'))),
+        (2, ('upstream_rerun', pg.in_port(2, 'if_true')))]
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert evaluated == ['a']
+    assert algo.explain(env, ws) == []
+
+    env.new_execution()
+    ws.store_param(cond, False, env.current_execution())
+    assert algo.explain(env, ws) == [(2, ('input_changed', cond))]
+
+
+def test_switch_node_evaluate_only_selected_branch():
+    pg = get_pg(SwitchNode(['a', 'b']))
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'a'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'b'))
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 1, 0)
+    ws.store_param(pg.in_port(1, 'x'), 1, 0)
+    ws.store_param(pg.in_port(2, 'key'), 'b', 0)
+
+    del evaluated[:]
+    BruteEvaluation(pg).eval(env, ws)
+    assert evaluated == ['b']
+    assert ws.get(pg.out_port(2, 'res')) == 10
+
+
+def test_delayed_nodes_can_not_be_compiled():
+    pg = get_pg(IfNode())
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(2, 'if_true'))
+
+    assert_raises(UserWarning, lambda: CompiledNode(pg))
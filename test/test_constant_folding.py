@@ -0,0 +1,107 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.constant_folding import (FoldingEvaluation,
+                                                find_param_only_vertices)
+from openalea.workflow.evaluation import EvaluationError
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+evaluated = []
+
+
+def scale(x, k):
+    evaluated.append(k)
+    y = x * k
+    return y
+
+
+def get_pg():
+    pg = PortGraph()
+    for vid in range(4):
+        pg.add_actor(FuncNode(scale), vid)
+
+    pg.actor(2).set_lazy(False)
+    pg.actor(3).set_lazy(False)
+    pg.actor(3).set_pure(True)
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(1, 'x'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(2, 'x'))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(3, 'x'))
+
+    return pg
+
+
+def get_state(pg, env):
+    ws = WorkflowState(pg)
+    for vid in range(4):
+        if vid == 0:
+            ws.store_param(pg.in_port(vid, 'x'), 1, env.current_execution())
+        ws.store_param(pg.in_port(vid, 'k'), vid + 1, env.current_execution())
+
+    return ws
+
+
+def test_find_param_only_vertices():
+    pg = get_pg()
+    assert find_param_only_vertices(pg) == [0, 1, 3]
+
+    pg.actor(0).set_lazy(False)
+    assert find_param_only_vertices(pg) == []
+
+
+def test_folding_evaluation_needs_ready_state():
+    pg = get_pg()
+    algo = FoldingEvaluation(pg)
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+
+    assert_raises(EvaluationError, lambda: algo.eval(env, ws))
+
+
+def test_folding_evaluation_skip_frozen_vertices():
+    pg = get_pg()
+    env = EvaluationEnvironment()
+    ws = get_state(pg, env)
+    algo = FoldingEvaluation(pg)
+
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert sorted(evaluated) == [1, 2, 3, 4]
+    assert algo.frozen() == {0, 1, 3}
+    assert ws.get(pg.out_port(3, 'y')) == 8
+    assert not algo.requires_evaluation(env, ws)
+
+    env.new_execution()
+    assert algo.requires_evaluation(env, ws)
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert evaluated == [3]
+    assert ws.last_evaluation(0) == 0
+    assert not algo.requires_evaluation(env, ws)
+
+
+def test_folding_evaluation_reevaluate_on_param_change():
+    pg = get_pg()
+    env = EvaluationEnvironment()
+    ws = get_state(pg, env)
+    algo = FoldingEvaluation(pg)
+    algo.eval(env, ws)
+
+    env.new_execution()
+    ws.store_param(pg.in_port(1, 'k'), 10, env.current_execution())
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert sorted(evaluated) == [3, 4, 10]
+    assert ws.get(pg.out_port(3, 'y')) == 40
+
+    # state cleared
+    ws.clear()
+    env.new_execution()
+    for pid, val in [(pg.in_port(0, 'x'), 1), (pg.in_port(0, 'k'), 1),
+                     (pg.in_port(1, 'k'), 2), (pg.in_port(2, 'k'), 3),
+                     (pg.in_port(3, 'k'), 4)]:
+        ws.store_param(pid, val, env.current_execution())
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert sorted(evaluated) == [1, 2, 3, 4]
@@ -372,3 +372,181 @@ def test_lazy_do_not_reevaluate_node_if_same_execution():
 
     algo.eval_node(env, ws, vid)
     assert len(evaluated) == 1
+
+
+def test_lazy_reevaluate_node_evaluated_in_other_branch():
+    evaluated = []
+
+    def func(txt):
+        evaluated.append(txt)
+        return txt
+
+    pg = PortGraph()
+    vid = pg.add_actor(FuncNode(func))
+
+    algo = LazyEvaluation(pg)
+    env = EvaluationEnvironment()
+    eid0 = env.current_execution()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(vid, 'txt'), 'toto', eid0)
+
+    algo.eval(env, ws)
+    assert len(evaluated) == 1
+
+    # follow baseline, inputs unchanged
+    env.new_execution()
+    algo.eval(env, ws)
+    assert len(evaluated) == 1
+
+    # branch from baseline, node evaluated in baseline still valid
+    eida = env.new_execution(eid0)
+    algo.eval(env, ws)
+    assert len(evaluated) == 1
+
+    ws.store_param(pg.in_port(vid, 'txt'), 'titi', eida)
+    algo.eval(env, ws)
+    assert len(evaluated) == 2
+
+    # sibling branch, results of first branch are invalid
+    env.new_execution(eida, '+')
+    algo.eval(env, ws)
+    assert len(evaluated) == 3
+
+
+def test_evaluation_stale_vertices():
+    def func(txt):
+        return txt
+
+    pg = PortGraph()
+    vid1 = pg.add_actor(FuncNode(func))
+    vid2 = pg.add_actor(FuncNode(func))
+    pg.connect(pg.out_port(vid1, 'txt'), pg.in_port(vid2, 'txt'))
+
+    algo = BruteEvaluation(pg)
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(vid1, 'txt'), 'toto', env.current_execution())
+    assert algo.stale_vertices(env, ws) == {vid1, vid2}
+
+    algo.eval(env, ws, vid1)
+    assert algo.stale_vertices(env, ws) == {vid2}
+    assert algo.requires_evaluation(env, ws)
+
+    algo.eval(env, ws)
+    assert algo.stale_vertices(env, ws) == set()
+    assert not algo.requires_evaluation(env, ws)
+
+
+def test_evaluation_requires_evaluation_without_traversal():
+    def func(txt):
+        return txt
+
+    pg = PortGraph()
+    vids = [pg.add_actor(FuncNode(func)) for i in range(50)]
+    for vid, nid in zip(vids[:-1], vids[1:]):
+        pg.connect(pg.out_port(vid, 'txt'), pg.in_port(nid, 'txt'))
+
+    algo = BruteEvaluation(pg)
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(vids[0], 'txt'), 'toto', env.current_execution())
+
+    def traversal(*args):
+        raise AssertionError("portgraph traversed")
+
+    algo.reachable_vertices = traversal
+    algo.upstream_vertices = traversal
+    assert algo.guarded_vertices() == set()
+    assert algo.requires_evaluation(env, ws)
+    assert len(algo.stale_vertices(env, ws)) == 50
+    algo.eval(env, ws)
+    assert not algo.requires_evaluation(env, ws)
+
+    # cache follows editions of the portgraph
+    node = FuncNode(func)
+    node.set_delayed('txt', True)
+    vid = pg.add_actor(node)
+    pg.connect(pg.out_port(vids[-1], 'txt'), pg.in_port(vid, 'txt'))
+    assert algo.guarded_vertices() == set(vids)
+
+
+def test_lazy_evaluation_plan():
+    evaluated = []
+
+    def func(txt):
+        evaluated.append(txt)
+        return txt
+
+    pg = PortGraph()
+    vid1 = pg.add_actor(FuncNode(func))
+    vid2 = pg.add_actor(FuncNode(func))
+    vid3 = pg.add_actor(FuncNode(func))
+    pg.connect(pg.out_port(vid1, 'txt'), pg.in_port(vid2, 'txt'))
+    pg.connect(pg.out_port(vid2, 'txt'), pg.in_port(vid3, 'txt'))
+
+    algo = LazyEvaluation(pg)
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(vid1, 'txt'), 'toto', env.current_execution())
+    assert algo.evaluation_plan(env, ws) == [vid1, vid2, vid3]
+    assert len(evaluated) == 0
+
+    algo.eval(env, ws)
+    assert algo.evaluation_plan(env, ws) == []
+
+    env.new_execution()
+    assert algo.evaluation_plan(env, ws) == []
+
+    # modification propagates downstream
+    ws.store_param(pg.in_port(vid1, 'txt'), 'titi', env.current_execution())
+    assert algo.evaluation_plan(env, ws) == [vid1, vid2, vid3]
+    algo.eval(env, ws)
+
+    # non lazy nodes always reevaluated
+    env.new_execution()
+    pg.actor(vid2).set_lazy(False)
+    assert algo.evaluation_plan(env, ws) == [vid2, vid3]
+
+    del evaluated[:]
+    algo.eval(env, ws)
+    assert len(evaluated) == 2
+
+
+def test_lazy_explain():
+    def func(txt):
+        return txt
+
+    pg = PortGraph()
+    vid1 = pg.add_actor(FuncNode(func))
+    vid2 = pg.add_actor(FuncNode(func))
+    vid3 = pg.add_actor(FuncNode(func))
+    pg.connect(pg.out_port(vid1, 'txt'), pg.in_port(vid2, 'txt'))
+    pg.connect(pg.out_port(vid2, 'txt'), pg.in_port(vid3, 'txt'))
+    pid1 = pg.in_port(vid1, 'txt')
+
+    algo = LazyEvaluation(pg)
+    env = EvaluationEnvironment()
+    eid0 = env.current_execution()
+    ws = WorkflowState(pg)
+    ws.store_param(pid1, 'toto', eid0)
+    assert algo.explain(env, ws) == [(vid1, ('never_evaluated', None)),
+                                     (vid2, ('never_evaluated', None)),
+                                     (vid3, ('never_evaluated', None))]
+    algo.eval(env, ws)
+
+    env.new_execution()
+    ws.store_param(pid1, 'titi', env.current_execution())
+    pg.actor(vid3).set_lazy(False)
+    assert algo.explain(env, ws) == [
+        (vid1, ('input_changed', pid1)),
+        (vid2, ('upstream_rerun', pg.in_port(vid2, 'txt'))),
+        (vid3, ('not_lazy', None))]
+
+    algo.eval(env, ws)
+    eid1 = env.current_execution()
+    pg.actor(vid3).set_lazy(True)
+
+    env.new_execution(eid0)
+    assert algo.explain(env, ws) == [(vid1, ('other_branch', eid1)),
+                                     (vid2, ('other_branch', eid1)),
+                                     (vid3, ('other_branch', eid1))]
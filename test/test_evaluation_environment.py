@@ -1,3 +1,5 @@
+from nose.tools import assert_raises
+
 from openalea.workflow.evaluation_environment import EvaluationEnvironment
 
 
@@ -24,3 +26,80 @@ def test_env_clear_free_ids():
 
     env.clear()
     assert env.current_execution() == eid0
+
+
+def test_env_lineage():
+    env = EvaluationEnvironment()
+    eid0 = env.current_execution()
+    assert env.parent(eid0) is None
+    assert env.depth(eid0) == 0
+
+    eid1 = env.new_execution()
+    assert env.parent(eid1) == eid0
+    assert env.rel_type(eid1) == '>'
+    assert env.depth(eid1) == 1
+
+    eid2 = env.new_execution(eid0)
+    assert env.parent(eid2) == eid0
+
+    eid3 = env.new_execution(eid2, '+')
+    assert env.parent(eid3) == eid0
+    assert env.rel_type(eid3) == '+'
+
+    assert_raises(KeyError, lambda: env.new_execution(1000))
+    assert_raises(ValueError, lambda: env.new_execution(eid0, '?'))
+
+
+def test_env_is_ancestor():
+    env = EvaluationEnvironment()
+    eid0 = env.current_execution()
+    eid1 = env.new_execution()
+    eid2 = env.new_execution()
+    eida = env.new_execution(eid1)
+    eidb = env.new_execution()
+
+    assert env.is_ancestor(eid0, eid0)
+    assert env.is_ancestor(eid0, eid2)
+    assert env.is_ancestor(eid1, eidb)
+    assert env.is_ancestor(eida, eidb)
+    assert not env.is_ancestor(eid2, eidb)
+    assert not env.is_ancestor(eidb, eid2)
+    assert not env.is_ancestor(eid2, eid1)
+
+
+def test_env_is_newer():
+    env = EvaluationEnvironment()
+    eid0 = env.current_execution()
+    eid1 = env.new_execution()
+    eid2 = env.new_execution(eid0)
+
+    assert env.is_newer(eid1, eid0)
+    assert not env.is_newer(eid0, eid1)
+    assert not env.is_newer(eid1, eid1)
+
+    # executions in other branches are considered newer
+    assert env.is_newer(eid1, eid2)
+    assert env.is_newer(eid2, eid1)
+
+    assert not env.is_newer(None, eid0)
+    assert env.is_newer(eid0, None)
+
+
+def test_env_set_current_execution():
+    env = EvaluationEnvironment()
+    eid0 = env.current_execution()
+    env.new_execution()
+
+    env.set_current_execution(eid0)
+    assert env.current_execution() == eid0
+    assert_raises(KeyError, lambda: env.set_current_execution(1000))
+
+
+def test_env_clear_lineage():
+    env = EvaluationEnvironment()
+    env.new_execution()
+    env.clear()
+
+    eid = env.current_execution()
+    assert env.parent(eid) is None
+    assert env.depth(eid) == 0
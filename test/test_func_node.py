@@ -1,6 +1,9 @@
 from nose.tools import assert_raises
 
-from openalea.workflow.func_node import RawFuncNode, FuncNode, argtype, rettype
+from openalea.workflow.func_node import (RawFuncNode, FuncNode,
+                                         argtype, rettype,
+                                         pure, threadsafe, picklable,
+                                         cost, output_size, vectorized)
 
 
 def test_raw_func_node_func_is_callable():
@@ -62,6 +65,19 @@ def test_func_node_inline():
     assert n((1, 2)) == (3, )
 
 
+def test_func_node_default_values():
+    def func(a, b=3, c=None):
+        return a
+
+    n = FuncNode(func)
+    assert n.input('a').default is None
+    assert n.input('b').default == 3
+    assert n.input('c').default is None
+    assert not n.has_default('a')
+    assert n.has_default('b')
+    assert n.has_default('c')
+
+
 def test_func_node_no_args_or_kwds():
     def func1(a, *args):
         return None
@@ -228,3 +244,50 @@ def test_func_node_return_value():
 
     n = FuncNode(func)
     assert n() == ('a', 1)
+
+
+def importable_func(a):
+    return a
+
+
+def test_raw_func_node_execution_hints_default():
+    def func(a):
+        return a
+
+    n = RawFuncNode(func)
+    assert not n.is_pure()
+    assert not n.is_thread_safe()
+    assert not n.is_picklable()
+    assert n.cost() == 1
+    assert n.output_size() is None
+
+    n = RawFuncNode(importable_func)
+    assert n.is_picklable()
+
+
+def test_func_node_execution_hints_decorators():
+    @pure
+    @threadsafe
+    @vectorized
+    @picklable(True)
+    @cost(10)
+    @output_size(8)
+    def func(a):
+        return a
+
+    n = FuncNode(func)
+    assert n.is_pure()
+    assert n.is_thread_safe()
+    assert n.is_vectorized()
+    assert n.is_picklable()
+    assert n.cost() == 10
+    assert n.output_size() == 8
+
+    @cost(-1)
+    def func(a):
+        return a
+
+    assert_raises(ValueError, lambda: FuncNode(func))
+
+    n = RawFuncNode(picklable(False)(lambda a: a))
+    assert not n.is_picklable()
@@ -0,0 +1,127 @@
+from openalea.workflow.evaluation import BruteEvaluation
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.fusion import (FusedNode,
+                                      find_chains,
+                                      fuse_chains,
+                                      unfuse_chains)
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+
+def parse(txt):
+    return txt.strip()
+
+
+def clean(txt):
+    return txt.lower()
+
+
+def split(txt):
+    return txt[0], txt[1:]
+
+
+def join(a, b):
+    txt = a + b
+    return txt
+
+
+def get_pg():
+    pg = PortGraph()
+    pg.add_actor(FuncNode(parse), 0)
+    pg.add_actor(FuncNode(clean), 1)
+    pg.add_actor(FuncNode(split), 2)
+    pg.add_actor(FuncNode(join), 3)
+    pg.add_actor(FuncNode(clean), 4)
+    pg.connect(pg.out_port(0, 'res'), pg.in_port(1, 'txt'), 0)
+    pg.connect(pg.out_port(1, 'res'), pg.in_port(2, 'txt'), 1)
+    pg.connect(pg.out_port(2, 'res1'), pg.in_port(3, 'b'), 2)
+    pg.connect(pg.out_port(2, 'res2'), pg.in_port(3, 'a'), 3)
+    pg.connect(pg.out_port(3, 'txt'), pg.in_port(4, 'txt'), 4)
+
+    return pg
+
+
+def evaluate(pg):
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'txt'), "  TOTO  ", 0)
+    BruteEvaluation(pg).eval(env, ws)
+
+    return ws
+
+
+def test_find_chains():
+    pg = get_pg()
+
+    assert find_chains(pg) == [[0, 1, 2], [3, 4]]
+    assert find_chains(pg, [pg.out_port(1, 'res')]) == [[0, 1], [3, 4]]
+
+
+def test_find_chains_skip_streaming_and_delayed_nodes():
+    for flag in ('streaming', 'delayed'):
+        pg = PortGraph()
+        for vid in range(4):
+            pg.add_actor(FuncNode(clean), vid)
+            if vid > 0:
+                pg.connect(pg.out_port(vid - 1, 'res'),
+                           pg.in_port(vid, 'txt'))
+
+        node = pg.actor(1)
+        if flag == 'streaming':
+            node.set_streaming(True)
+        else:
+            node.set_delayed('txt', True)
+
+        assert find_chains(pg) == [[2, 3]]
+        fuse_chains(pg)
+        assert isinstance(pg.actor(2), FusedNode)
+        assert pg.actor(1) is node
+
+
+def test_fuse_chains_keep_results():
+    pg = get_pg()
+    ref = evaluate(pg).get(pg.out_port(4, 'res'))
+    pid = pg.out_port(4, 'res')
+
+    fusions = fuse_chains(pg)
+    assert len(fusions) == 2
+    assert sorted(pg.vertices()) == [0, 3]
+    assert isinstance(pg.actor(0), FusedNode)
+    assert pg.out_port(3, 'res') == pid
+
+    ws = evaluate(pg)
+    assert ws.get(pid) == ref == "otot"
+
+
+def test_fuse_chains_keep_pinned_ports():
+    pg = get_pg()
+    pid = pg.out_port(1, 'res')
+
+    fuse_chains(pg, [pid])
+    assert sorted(pg.vertices()) == [0, 2, 3]
+    assert pg.out_port(0, 'res') == pid
+
+    ws = evaluate(pg)
+    assert ws.get(pid) == "toto"
+
+
+def test_unfuse_chains_restore_portgraph():
+    pg = get_pg()
+    ports = sorted((pid, pg.vertex(pid), pg.local_id(pid))
+                   for pid in pg.ports())
+    edges = sorted((eid, pg.source_port(eid), pg.target_port(eid))
+                   for eid in pg.edges())
+    actors = dict((vid, pg.actor(vid)) for vid in pg.vertices())
+
+    fusions = fuse_chains(pg)
+    unfuse_chains(pg, fusions)
+
+    assert sorted((pid, pg.vertex(pid), pg.local_id(pid))
+                  for pid in pg.ports()) == ports
+    assert sorted((eid, pg.source_port(eid), pg.target_port(eid))
+                  for eid in pg.edges()) == edges
+    assert all(pg.actor(vid) is actor for vid, actor in actors.items())
+
+    ws = evaluate(pg)
+    assert ws.get(pg.out_port(4, 'res')) == "otot"
@@ -0,0 +1,169 @@
+from nose.tools import assert_raises
+
+from openalea.workflow import evaluation
+from openalea.workflow.common_subexpression import CSEEvaluation
+from openalea.workflow.conditional_node import IfNode
+from openalea.workflow.constant_folding import FoldingEvaluation
+from openalea.workflow.evaluation import (BruteEvaluation, EvaluationError,
+                                          LazyEvaluation)
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.loop_execution import LoopExecution
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+evaluated = []
+
+
+def grow(size, rate):
+    evaluated.append('grow')
+    new_size = size * rate
+    return new_size
+
+
+def light(angle):
+    evaluated.append('light')
+    intensity = angle * 2
+    return intensity
+
+
+def get_pg():
+    pg = PortGraph()
+    pg.add_actor(FuncNode(grow), 0)
+    pg.add_actor(FuncNode(light), 1)
+    pg.connect(pg.out_port(1, 'intensity'), pg.in_port(0, 'rate'))
+
+    return pg
+
+
+def test_loop_execution_check_feedback_ports():
+    pg = get_pg()
+    size = pg.in_port(0, 'size')
+    new_size = pg.out_port(0, 'new_size')
+    rate = pg.in_port(0, 'rate')
+
+    assert_raises(UserWarning, lambda: LoopExecution(pg, [(size, size)]))
+    assert_raises(UserWarning, lambda: LoopExecution(pg, [(new_size, rate)]))
+    assert_raises(ValueError,
+                  lambda: LoopExecution(pg, [(new_size, size)], history=0))
+
+
+def test_loop_execution_feedback():
+    pg = get_pg()
+    size = pg.in_port(0, 'size')
+    new_size = pg.out_port(0, 'new_size')
+
+    loop = LoopExecution(pg, [(new_size, size)], history=3)
+    assert loop.plan() == [1, 0]
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    assert_raises(EvaluationError, lambda: loop.step(env, ws))
+
+    ws.store_param(size, 1, env.current_execution())
+    ws.store_param(pg.in_port(1, 'angle'), 1, env.current_execution())
+
+    del evaluated[:]
+    loop.run(env, ws, 5)
+    assert loop.nb_steps() == 5
+    assert ws.get(new_size) == 2 ** 5
+    assert loop.history(new_size) == [8, 16, 32]
+
+    # upstream nodes whose inputs do not change are evaluated once
+    assert evaluated.count('light') == 1
+    assert evaluated.count('grow') == 5
+
+    loop.clear_history()
+    assert loop.nb_steps() == 0
+    assert loop.history(new_size) == []
+
+
+def test_loop_execution_reuse_evaluation_order():
+    pg = get_pg()
+    size = pg.in_port(0, 'size')
+    new_size = pg.out_port(0, 'new_size')
+
+    calls = []
+
+    def order(portgraph):
+        calls.append(portgraph)
+        return original(portgraph)
+
+    original = evaluation.evaluation_order
+    evaluation.evaluation_order = order
+    try:
+        loop = LoopExecution(pg, [(new_size, size)])
+        env = EvaluationEnvironment()
+        ws = WorkflowState(pg)
+        ws.store_param(size, 1, env.current_execution())
+        ws.store_param(pg.in_port(1, 'angle'), 1, env.current_execution())
+        loop.run(env, ws, 5)
+        assert loop.plan() == [1, 0]
+    finally:
+        evaluation.evaluation_order = original
+
+    assert ws.get(new_size) == 2 ** 5
+    assert len(calls) == 1
+
+
+def test_loop_execution_record():
+    pg = get_pg()
+    size = pg.in_port(0, 'size')
+    new_size = pg.out_port(0, 'new_size')
+    angle = pg.in_port(1, 'angle')
+    intensity = pg.out_port(1, 'intensity')
+
+    loop = LoopExecution(pg, [(new_size, size)], history=2,
+                         record=[intensity])
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(size, 1, env.current_execution())
+    ws.store_param(angle, 1, env.current_execution())
+    loop.step(env, ws)
+
+    loop.step(env, ws, {angle: 2})
+    assert loop.history(intensity) == [2, 4]
+    assert loop.history(new_size) == [2, 8]
+
+
+def test_loop_execution_use_algo_eval():
+    def cond(size):
+        big = size > 4
+        return big
+
+    def shrink(size):
+        evaluated.append('shrink')
+        small = size / 2
+        return small
+
+    pg = get_pg()
+    size = pg.in_port(0, 'size')
+    new_size = pg.out_port(0, 'new_size')
+    vid = pg.add_actor(FuncNode(cond))
+    pg.connect(new_size, pg.in_port(vid, 'size'))
+    sid = pg.add_actor(FuncNode(shrink))
+    pg.connect(new_size, pg.in_port(sid, 'size'))
+    ifnode = pg.add_actor(IfNode())
+    pg.connect(pg.out_port(vid, 'big'), pg.in_port(ifnode, 'cond'))
+    pg.connect(new_size, pg.in_port(ifnode, 'if_true'))
+    pg.connect(pg.out_port(sid, 'small'), pg.in_port(ifnode, 'if_false'))
+    res = pg.out_port(ifnode, 'res')
+
+    for algo_cls in (LazyEvaluation, BruteEvaluation, CSEEvaluation,
+                     FoldingEvaluation):
+        env = EvaluationEnvironment()
+        ws = WorkflowState(pg)
+        ws.store_param(size, 1, env.current_execution())
+        ws.store_param(pg.in_port(1, 'angle'), 1, env.current_execution())
+
+        loop = LoopExecution(pg, [(new_size, size)], history=4,
+                             record=[res], algo_cls=algo_cls)
+        del evaluated[:]
+        loop.run(env, ws, 4)
+        assert loop.history(res) == [1, 2, 8, 16]
+
+        # delayed branch only evaluated when selected, folding
+        # evaluates all param only vertices beforehand
+        if algo_cls is not FoldingEvaluation:
+            assert evaluated.count('shrink') == 2
@@ -0,0 +1,117 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.evaluation import BruteEvaluation
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode, threadsafe
+from openalea.workflow.map_reduce import MapNode, ReduceNode
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+
+@threadsafe
+def scale(x, k):
+    y = x * k
+    return y
+
+
+def add(a, b):
+    c = a + b
+    return c
+
+
+def test_map_node_ports():
+    node = MapNode(FuncNode(scale))
+    assert tuple(node.inputs()) == ('x', 'k')
+    assert tuple(node.mapped_inputs()) == ('x',)
+    assert tuple(node.outputs()) == ('y',)
+    assert node.is_thread_safe()
+
+    assert_raises(KeyError, lambda: MapNode(FuncNode(scale), ['z']))
+    assert_raises(UserWarning, lambda: MapNode(FuncNode(add), pool='thread'))
+    assert_raises(UserWarning, lambda: MapNode(FuncNode(scale), pool='toto'))
+    assert_raises(ValueError, lambda: MapNode(FuncNode(scale), chunksize=0))
+
+    def func(a):
+        return a
+
+    assert_raises(UserWarning, lambda: MapNode(FuncNode(func), pool='process'))
+
+
+def test_map_node_id_of_actor():
+    node = MapNode(FuncNode(scale))
+    assert node.get_id() == "openalea.workflow.map_reduce:MapNode"
+    assert node.actor_id() == FuncNode(scale).get_id()
+    assert MapNode(FuncNode(add)).actor_id() == FuncNode(add).get_id()
+
+    node = ReduceNode(FuncNode(add))
+    assert node.get_id() == "openalea.workflow.map_reduce:ReduceNode"
+    assert node.actor_id() == FuncNode(add).get_id()
+
+
+def test_reduce_node_forward_hints():
+    actor = FuncNode(add)
+    actor.set_thread_safe(True)
+    actor.set_picklable(True)
+    node = ReduceNode(actor)
+    assert node.is_thread_safe()
+    assert node.is_picklable()
+
+    actor = FuncNode(add)
+    actor.set_thread_safe(False)
+    actor.set_picklable(False)
+    node = ReduceNode(actor)
+    assert not node.is_thread_safe()
+    assert not node.is_picklable()
+
+
+def test_map_node_call():
+    node = MapNode(FuncNode(scale))
+    assert node(([1, 2, 3], 2)) == ([2, 4, 6],)
+    assert node(([], 2)) == ([],)
+
+    node = MapNode(FuncNode(add), ['a', 'b'])
+    assert node(([1, 2], [10, 20])) == ([11, 22],)
+    assert_raises(ValueError, lambda: node(([1, 2], [10])))
+
+
+def test_map_node_pools():
+    elms = range(10)
+    ref = ([elm * 3 for elm in elms],)
+    for pool in ('thread', 'process'):
+        for chunksize in (1, 3, 20):
+            node = MapNode(FuncNode(scale), pool=pool, nb_workers=2,
+                           chunksize=chunksize)
+            assert node((elms, 3)) == ref
+
+
+def test_reduce_node():
+    node = ReduceNode(FuncNode(add))
+    assert tuple(node.inputs()) == ('seq', 'initial')
+    assert tuple(node.outputs()) == ('c',)
+
+    assert node(([1, 2, 3], None)) == (6,)
+    assert node(([1, 2, 3], 10)) == (16,)
+    assert node(([], 10)) == (10,)
+    assert_raises(ValueError, lambda: node(([], None)))
+
+    def single(a):
+        return a
+
+    assert_raises(UserWarning, lambda: ReduceNode(FuncNode(single)))
+    assert_raises(UserWarning, lambda: ReduceNode(MapNode(FuncNode(single))))
+
+
+def test_map_reduce_in_portgraph():
+    pg = PortGraph()
+    pg.add_actor(MapNode(FuncNode(scale), pool='thread'), 0)
+    pg.add_actor(ReduceNode(FuncNode(add)), 1)
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(1, 'seq'))
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), [1, 2, 3], 0)
+    ws.store_param(pg.in_port(0, 'k'), 10, 0)
+    ws.store_param(pg.in_port(1, 'initial'), None, 0)
+    BruteEvaluation(pg).eval(env, ws)
+
+    assert ws.get(pg.out_port(1, 'c')) == 60
@@ -115,6 +115,16 @@ def test_node_is_lazy_by_default():
     assert n.is_lazy()
 
 
+def test_node_is_not_pure_by_default():
+    n = Node()
+    assert not n.is_pure()
+
+    n.set_pure(True)
+    assert n.is_pure()
+    n.set_pure(False)
+    assert not n.is_pure()
+
+
 def test_node_priority():
     n = Node()
     assert n.priority() == 0
@@ -134,3 +144,45 @@ def test_node_caption():
     assert n.caption() == "toto"
     n.set_caption(1)
     assert n.caption() == "1"
+
+
+def test_node_execution_hints():
+    n = Node()
+    assert n.cost() == 1
+    assert n.output_size() is None
+    assert not n.is_thread_safe()
+    assert not n.is_picklable()
+
+    n.set_cost(2.5)
+    assert n.cost() == 2.5
+    assert_raises(TypeError, lambda: n.set_cost("bcp"))
+    assert_raises(ValueError, lambda: n.set_cost(-1))
+
+    n.set_output_size(1024)
+    assert n.output_size() == 1024
+    n.set_output_size(None)
+    assert n.output_size() is None
+    assert_raises(TypeError, lambda: n.set_output_size(1.5))
+
+    n.set_thread_safe(True)
+    assert n.is_thread_safe()
+
+    n.set_picklable(True)
+    assert n.is_picklable()
+
+    assert not n.is_vectorized()
+    n.set_vectorized(True)
+    assert n.is_vectorized()
+
+
+def test_node_delayed_inputs():
+    node = Node()
+    node.add_input('a')
+    assert not node.is_delayed('a')
+
+    node.set_delayed('a', True)
+    assert node.is_delayed('a')
+    node.set_delayed('a', False)
+    assert not node.is_delayed('a')
+
+    assert_raises(KeyError, lambda: node.set_delayed('b', True))
@@ -0,0 +1,107 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode, cost
+from openalea.workflow.parameter_sweep import (ParameterSweep,
+                                               cartesian,
+                                               sweep_order)
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+
+evaluated = []
+
+
+@cost(100)
+def heavy(x):
+    evaluated.append('heavy')
+    y = x * 10
+    return y
+
+
+def add(a, b):
+    evaluated.append('add')
+    c = a + b
+    return c
+
+
+def get_pg():
+    pg = PortGraph()
+    pg.add_actor(FuncNode(heavy), 0)
+    pg.add_actor(FuncNode(add), 1)
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(1, 'a'))
+
+    return pg
+
+
+def test_cartesian():
+    assignments = cartesian([(0, [1, 2]), (1, ['a', 'b', 'c'])])
+    assert len(assignments) == 6
+    assert {0: 2, 1: 'b'} in assignments
+
+
+def test_sweep_order_vary_expensive_params_less_often():
+    pg = get_pg()
+    x = pg.in_port(0, 'x')
+    b = pg.in_port(1, 'b')
+    assignments = cartesian([(b, [1, 2, 3]), (x, [1, 2])])
+
+    order = sweep_order(pg, assignments)
+    xs = [assignments[ind][x] for ind in order]
+    assert xs == [1, 1, 1, 2, 2, 2]
+
+
+def test_parameter_sweep_reuse_upstream_results():
+    pg = get_pg()
+    x = pg.in_port(0, 'x')
+    b = pg.in_port(1, 'b')
+    assignments = cartesian([(b, [1, 2, 3]), (x, [1, 2])])
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    sweep = ParameterSweep(pg, [pg.out_port(1, 'c')])
+
+    del evaluated[:]
+    results = sweep.run(env, ws, assignments)
+    assert evaluated.count('heavy') == 2
+    assert evaluated.count('add') == 6
+
+    for assignment, res in zip(assignments, results):
+        assert res == [assignment[x] * 10 + assignment[b]]
+
+
+def test_parameter_sweep_restore_params_not_assigned():
+    pg = PortGraph()
+    pg.add_actor(FuncNode(add), 0)
+    a = pg.in_port(0, 'a')
+    b = pg.in_port(0, 'b')
+
+    sweep = ParameterSweep(pg, [pg.out_port(0, 'c')])
+    assignments = [{a: 10}, {b: 100}, {a: 1}]
+    for ordered in (False, True):
+        env = EvaluationEnvironment()
+        ws = WorkflowState(pg)
+        ws.store_param(a, 0, env.current_execution())
+        ws.store_param(b, 0, env.current_execution())
+
+        results = sweep.run(env, ws, assignments, ordered)
+        assert results == [[10], [100], [1]]
+
+
+def test_parameter_sweep_parallel():
+    pg = get_pg()
+    x = pg.in_port(0, 'x')
+    b = pg.in_port(1, 'b')
+    assignments = cartesian([(x, [1, 2, 3])])
+
+    sweep = ParameterSweep(pg, [pg.out_port(1, 'c')])
+    results = sweep.run_parallel({b: 5}, assignments, 2)
+    assert results == [[15], [25], [35]]
+
+    def func(a):
+        return a
+
+    vid = pg.add_actor(FuncNode(func))
+    pg.connect(pg.out_port(1, 'c'), pg.in_port(vid, 'a'))
+    sweep = ParameterSweep(pg, [pg.out_port(1, 'c')])
+    assert_raises(UserWarning,
+                  lambda: sweep.run_parallel({b: 5}, assignments, 2))
@@ -1,3 +1,5 @@
+import pickle
+
 from nose.tools import assert_raises
 
 from openalea.workflow.node import Node
@@ -405,6 +407,53 @@ def test_portgraph_add_actor():
     assert set(pg.local_id(pid) for pid in pg.out_ports(vid2)) == keys
 
 
+def test_portgraph_add_actors():
+    pg = PortGraph()
+    first = Node()
+    pg.add_actor(first)
+    actors = []
+    for i in range(3):
+        actor = Node()
+        actor.add_input("in", "descr")
+        actor.add_output("out", "descr")
+        actors.append(actor)
+
+    # bad connections
+    assert_raises(IndexError, lambda: pg.add_actors(actors, [(0, "out",
+                                                              3, "in")]))
+    assert_raises(InvalidPort, lambda: pg.add_actors(actors, [(0, "in",
+                                                               1, "in")]))
+    assert_raises(InvalidPort, lambda: pg.add_actors(actors, [(0, "out",
+                                                               1, "out")]))
+    assert len(pg) == 1
+    assert len(tuple(pg.ports())) == 0
+
+    vids = pg.add_actors(actors, [(0, "out", 1, "in"), (1, "out", 2, "in"),
+                                  (0, "out", 2, "in")])
+    assert len(vids) == 3
+    assert len(pg) == 4
+    for vid, actor in zip(vids, actors):
+        assert pg.actor(vid) is actor
+        assert pg.local_id(pg.in_port(vid, "in")) == "in"
+        assert pg.is_out_port(pg.out_port(vid, "out"))
+
+    assert pg.nb_edges() == 3
+    assert set(pg.out_neighbors(vids[0])) == set(vids[1:])
+    pid = pg.in_port(vids[2], "in")
+    assert set(pg.connected_ports(pid)) == {pg.out_port(vids[0], "out"),
+                                            pg.out_port(vids[1], "out")}
+
+    # same graph than one built with single calls
+    pg2 = PortGraph()
+    pg2.add_actor(first)
+    for actor in actors:
+        pg2.add_actor(actor)
+    for src, tgt in [(1, 2), (2, 3), (1, 3)]:
+        pg2.connect(pg2.out_port(src, "out"), pg2.in_port(tgt, "in"))
+
+    assert pg.diff(pg2).is_empty()
+
+
 def test_portgraph_add_in_port():
     pg = PortGraph()
     assert_raises(InvalidVertex, lambda: pg.add_in_port(0, "toto"))
@@ -572,3 +621,165 @@ def test_portgraph_big():
     assert set(pg.connected_ports(pid41)) == set()
     assert set(pg.out_edges(vid3)) == set()
     assert_raises(InvalidPort, lambda: pg.is_in_port(pid33))
+
+
+class Listener(object):
+    def __init__(self):
+        self.events = []
+
+    def notify(self, sender, event):
+        self.events.append((sender, event))
+
+
+def test_pg_notify_listeners():
+    pg = PortGraph()
+    listener = Listener()
+    pg.register_listener(listener)
+
+    pg.add_vertex(0)
+    pg.add_out_port(0, "out", 0)
+    pg.add_vertex(1)
+    pg.add_in_port(1, "in", 1)
+    eid = pg.connect(0, 1)
+    pg.remove_edge(eid)
+    pg.remove_port(1)
+    pg.remove_vertex(1)
+    pg.clear_edges()
+    pg.clear()
+
+    assert all(sender is pg for sender, event in listener.events)
+    assert [event for sender, event in listener.events] == [
+        ('add_vertex', 0), ('set_actor', 0), ('add_port', 0, 0),
+        ('add_vertex', 1), ('set_actor', 1), ('add_port', 1, 1),
+        ('connect', eid, 0, 1), ('disconnect', eid, 0, 1),
+        ('remove_port', 1, 1), ('remove_vertex', 1),
+        ('clear_edges',), ('clear',)]
+
+    pg.unregister_listener(listener)
+    pg.add_vertex(0)
+    assert len(listener.events) == 12
+
+
+def test_pg_notify_add_actors():
+    pg = PortGraph()
+    listener = Listener()
+    pg.register_listener(listener)
+
+    vids = pg.add_actors([Node(), Node()])
+    assert [event for sender, event in listener.events] == [
+        ('add_actors', tuple(vids))]
+
+
+def test_pg_add_actors_bad_actor_leaves_portgraph_untouched():
+    pg = PortGraph()
+    listener = Listener()
+    pg.register_listener(listener)
+    actor = Node()
+    actor.add_input("in", "descr")
+
+    assert_raises(AttributeError, lambda: pg.add_actors([actor, object(),
+                                                         actor]))
+    assert len(pg) == 0
+    assert len(tuple(pg.ports())) == 0
+    assert listener.events == []
+
+    vids = pg.add_actors([actor])
+    assert tuple(pg.vertices()) == tuple(vids)
+
+
+def test_pg_listeners_are_weak_references():
+    pg = PortGraph()
+    listener = Listener()
+    pg.register_listener(listener)
+    del listener
+
+    pg.add_vertex(0)
+
+
+def test_pg_pickle_without_listeners():
+    pg = PortGraph()
+    pg.register_listener(Listener())
+    pg.add_vertex(0)
+    pg.add_out_port(0, "out", 0)
+
+    pg2 = pickle.loads(pickle.dumps(pg, 0))
+    assert tuple(pg2.ports()) == (0,)
+    pg2.add_vertex(1)
+
+
+def get_pg_for_diff(actors, links):
+    pg = PortGraph()
+    for vid, actor in actors:
+        pg.add_actor(actor, vid)
+
+    for eid, (vid1, vid2) in links:
+        pg.connect(pg.out_port(vid1, 'out'), pg.in_port(vid2, 'in'), eid)
+
+    return pg
+
+
+def get_node():
+    node = Node()
+    node.add_input('in')
+    node.add_output('out')
+    return node
+
+
+def test_pg_diff_same_portgraphs():
+    nodes = [get_node() for i in range(3)]
+    actors = list(enumerate(nodes))
+    links = [(0, (0, 1)), (1, (1, 2))]
+    pg1 = get_pg_for_diff(actors, links)
+    pg2 = get_pg_for_diff(actors, links)
+
+    assert pg1.diff(pg2).is_empty()
+
+    pg2 = get_pg_for_diff([(i, get_node()) for i in range(3)], links)
+    patch = pg1.diff(pg2)
+    assert len(patch.actors) == 3
+    assert pg1.diff(pg2, lambda a1, a2: True).is_empty()
+
+
+def test_pg_apply_patch():
+    nodes = [get_node() for i in range(5)]
+    pg1 = get_pg_for_diff([(i, nodes[i]) for i in range(4)],
+                          [(0, (0, 1)), (1, (1, 2)), (2, (2, 3))])
+    pg2 = get_pg_for_diff([(i, nodes[i]) for i in range(4)],
+                          [(0, (0, 1)), (1, (1, 2)), (2, (2, 3))])
+    pg2.remove_vertex(2)
+    pg2.add_actor(nodes[4], 4)
+    pg2.connect(pg2.out_port(1, 'out'), pg2.in_port(3, 'in'), 3)
+    pg2.connect(pg2.out_port(3, 'out'), pg2.in_port(4, 'in'), 4)
+
+    patch = pg1.diff(pg2)
+    assert patch.removed_vertices == [2]
+    assert patch.added_vertices == [4]
+    assert sorted(patch.removed_edges) == [1, 2]
+    assert patch.actors == [(4, nodes[4])]
+
+    listener = Listener()
+    pg1.register_listener(listener)
+    pg1.apply_patch(patch)
+    assert pg1.diff(pg2).is_empty()
+    assert pg2.diff(pg1).is_empty()
+    assert ('remove_vertex', 2) in [evt for sender, evt in listener.events]
+
+
+def test_pg_apply_patch_recreated_ports():
+    nodes = [get_node() for i in range(2)]
+    pg1 = get_pg_for_diff([(0, nodes[0]), (1, nodes[1])], [(0, (0, 1))])
+
+    pg2 = PortGraph()
+    pg2.add_vertex(0)
+    pg2.add_out_port(0, 'out', 1)
+    pg2.add_in_port(0, 'in', 0)
+    pg2.set_actor(0, nodes[0])
+    pg2.add_vertex(1)
+    pg2.add_in_port(1, 'in', 2)
+    pg2.add_out_port(1, 'out', 3)
+    pg2.set_actor(1, nodes[1])
+    pg2.connect(1, 2, 0)
+
+    pg1.apply_patch(pg1.diff(pg2))
+    assert pg1.diff(pg2).is_empty()
+    assert pg1.source_port(0) == 1
@@ -0,0 +1,136 @@
+import os
+import tempfile
+from ast import literal_eval
+
+from nose.tools import assert_raises
+
+from openalea.workflow.conditional_node import IfNode
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.node import Node
+from openalea.workflow.port_graph import ActorRef, PortGraph
+from openalea.workflow.serialization import (describe_actor, dumps, load,
+                                             loads, save)
+
+
+def func(a, b):
+    c = a + b
+    return c
+
+
+def get_pg():
+    pg = PortGraph()
+    n1 = FuncNode(func)
+    n2 = Node()
+    n2.add_input(u"in\xe9", "descr")
+    n2.add_input(1, "descr")
+    n2.add_output("out", "descr")
+
+    pg.add_actor(n1)
+    pg.add_actor(n2)
+    pg.add_actor(n1)
+    pg.add_vertex(10)
+    pg.connect(pg.out_port(0, 'c'), pg.in_port(1, 1))
+    pg.connect(pg.out_port(1, 'out'), pg.in_port(2, 'a'))
+    pg.connect(pg.out_port(0, 'c'), pg.in_port(2, 'b'))
+
+    return pg
+
+
+def test_serialization_round_trip():
+    pg = get_pg()
+    pg2 = loads(dumps(pg))
+
+    assert set(pg2.vertices()) == set(pg.vertices())
+    assert set(pg2.ports()) == set(pg.ports())
+    assert set(pg2.edges()) == set(pg.edges())
+    for pid in pg.ports():
+        assert pg2.vertex(pid) == pg.vertex(pid)
+        assert pg2.local_id(pid) == pg.local_id(pid)
+        assert pg2.is_out_port(pid) == pg.is_out_port(pid)
+    for eid in pg.edges():
+        assert pg2.source_port(eid) == pg.source_port(eid)
+        assert pg2.target_port(eid) == pg.target_port(eid)
+
+    assert pg2.actor(10) is None
+    assert pg2.actor(0).get_id() == pg.actor(0).get_id()
+    assert pg2.actor(0)([1, 2]) == (3,)
+    assert tuple(pg2.actor(1).inputs()) == tuple(pg.actor(1).inputs())
+    assert pg2.actor(0) is pg2.actor(2)
+
+    # loaded portgraph can be edited
+    vid = pg2.add_actor(FuncNode(func))
+    assert vid not in pg.vertices()
+    pg2.connect(pg2.out_port(0, 'c'), pg2.in_port(vid, 'a'))
+
+
+def test_serialization_actors_are_lazy():
+    pg = loads(dumps(get_pg()))
+
+    assert isinstance(pg.vertex_property("_actor")[0], ActorRef)
+    actor = pg.actor(0)
+    assert isinstance(actor, FuncNode)
+    assert pg.vertex_property("_actor")[0] is actor
+    assert isinstance(pg.vertex_property("_actor")[2], ActorRef)
+
+
+def test_serialization_keep_edited_func_node():
+    node = FuncNode(func)
+    node._lazy = False
+    node._priority = 5
+    node._caption = "sum"
+    node.set_delayed('b', True)
+    pg = PortGraph()
+    pg.add_actor(node, 0)
+    pg.add_actor(FuncNode(func), 1)
+
+    pg2 = loads(dumps(pg))
+    actor = pg2.actor(0)
+    assert actor.get_id() == node.get_id()
+    assert not actor._lazy
+    assert actor._priority == 5
+    assert actor._caption == "sum"
+    assert actor.is_delayed('b')
+    assert actor([1, 2]) == (3,)
+
+    # unedited nodes are only stored by their id
+    assert describe_actor(FuncNode(func))[2] == ""
+    assert literal_eval(describe_actor(node)[2]) == dict(_lazy=False,
+                                                         _priority=5,
+                                                         _caption="sum",
+                                                         _delayed=('b',))
+
+
+def test_serialization_actor_created_from_class_id():
+    pg = PortGraph()
+    pg.add_actor(IfNode(), 0)
+    assert describe_actor(pg.actor(0))[2] == ""
+
+    pg2 = loads(dumps(pg))
+    actor = pg2.actor(0)
+    assert isinstance(actor, IfNode)
+    assert tuple(actor.inputs()) == tuple(pg.actor(0).inputs())
+    assert actor.is_delayed('if_true')
+
+
+def test_serialization_save_load():
+    pg = get_pg()
+    fid, filename = tempfile.mkstemp()
+    os.close(fid)
+    try:
+        save(pg, filename)
+        pg2 = load(filename)
+    finally:
+        os.remove(filename)
+
+    assert set(pg2.edges()) == set(pg.edges())
+
+
+def test_serialization_bad_data():
+    assert_raises(ValueError, lambda: loads(""))
+    assert_raises(ValueError, lambda: loads("toto" * 10))
+    assert_raises(ValueError, lambda: loads(dumps(get_pg()) + "a"))
+
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_in_port(0, (1, 2))
+    assert_raises(UserWarning, lambda: dumps(pg))
@@ -1,7 +1,10 @@
 from nose.tools import assert_raises
 
+from openalea.workflow.evaluation import LazyEvaluation
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
 from openalea.workflow.port_graph import PortGraph
-from openalea.workflow.state import WorkflowState
+from openalea.workflow.state import ChainedDict, WorkflowState, edited_vertices
 from openalea.workflow.sub_port_graph import get_upstream_subportgraph
 
 
@@ -127,6 +130,30 @@ def test_ws_retrieve_data_on_multiple_connections_input_ports():
     assert tuple(ws.get(2)) == ("data0", "data1")
 
 
+def test_ws_portgraph_changed_update_connections():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_out_port(0, "out", 0)
+    pg.add_vertex(1)
+    pg.add_out_port(1, "out", 1)
+    pg.add_vertex(2)
+    pg.add_in_port(2, "in", 2)
+    pg.connect(1, 2)
+
+    ws = WorkflowState(pg)
+    ws.store(0, "data0")
+    ws.store(1, "data1")
+    ws.set_last_evaluation(0, 1)
+    ws.set_last_evaluation(1, 2)
+    assert ws.get(2) == "data1"
+    assert ws.when(2) == 2
+
+    pg.connect(0, 2)
+    ws.portgraph_changed()
+    assert tuple(ws.get(2)) == ("data0", "data1")
+    assert ws.when(2) == 1
+
+
 def test_ws_is_ready_for_evaluation():
     pg = PortGraph()
     pg.add_vertex(0)
@@ -150,6 +177,46 @@ def test_ws_is_ready_for_evaluation():
     assert ws.is_ready_for_evaluation()
 
 
+def test_ws_missing_params():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_in_port(0, "in1", 0)
+    pg.add_in_port(0, "in2", 1)
+    pg.add_out_port(0, "out", 2)
+    pg.add_vertex(1)
+    pg.add_in_port(1, "in", 3)
+    pg.connect(2, 3)
+
+    ws = WorkflowState(pg)
+    assert set(ws.missing_params()) == {0, 1}
+
+    ws.store_param(0, "param", 0)
+    assert set(ws.missing_params()) == {1}
+
+    fws = ws.fork()
+    fws.store_param(1, "param", 0)
+    assert fws.is_ready_for_evaluation()
+    assert not ws.is_ready_for_evaluation()
+
+    ws.clear()
+    assert set(ws.missing_params()) == {0, 1}
+
+
+def test_ws_portgraph_changed_update_missing_params():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_out_port(0, "out", 0)
+    pg.add_vertex(1)
+    pg.add_in_port(1, "in", 1)
+
+    ws = WorkflowState(pg)
+    assert not ws.is_ready_for_evaluation()
+
+    pg.connect(0, 1)
+    ws.portgraph_changed()
+    assert ws.is_ready_for_evaluation()
+
+
 def test_ws_nodes_not_evaluated_on_creation():
     pg = PortGraph()
     pg.add_vertex(0)
@@ -243,6 +310,46 @@ def test_ws_when_connected_input_port():
     assert ws.when(2) == 10
 
 
+def test_ws_when_removed_input_port_reused_as_output_port():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_out_port(0, "out", 0)
+    pg.add_vertex(1)
+    pg.add_in_port(1, "in", 1)
+    pg.connect(0, 1)
+
+    ws = WorkflowState(pg)
+    ws.set_last_evaluation(0, 10)
+    assert ws.when(1) == 10
+
+    pg.remove_port(1)
+    pg.add_out_port(1, "out", 1)
+    assert ws.when(1) is None
+    ws.set_last_evaluation(1, 11)
+    assert ws.when(1) == 11
+
+
+def test_ws_when_connected_input_port_in_fork():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_out_port(0, "out", 0)
+    pg.add_vertex(1)
+    pg.add_in_port(1, "in", 1)
+    pg.connect(0, 1)
+
+    ws = WorkflowState(pg)
+    ws.set_last_evaluation(0, 10)
+
+    fws = ws.fork()
+    fws.set_last_evaluation(0, 12)
+    assert fws.when(1) == 12
+    assert ws.when(1) == 10
+
+    ws.clear()
+    assert ws.when(1) is None
+    assert fws.when(1) == 12
+
+
 def test_ws_sub_ready_for_evaluation_if_no_input_port():
     pg = PortGraph()
     pg.add_vertex(0)
@@ -276,3 +383,317 @@ def test_ws_sub_ready_for_evaluation_if_no_input_port():
 #     subpg = get_upstream_subportgraph(pg, 2)
 #     subws = WorkflowState(subpg)
 #     assert subws.is_ready_for_evaluation()
+
+
+def test_chained_dict_lookup_parent():
+    parent = ChainedDict()
+    parent['a'] = 1
+    parent['b'] = 2
+    child = ChainedDict(parent)
+    child['b'] = 3
+    child['c'] = 4
+
+    assert child['a'] == 1
+    assert child['b'] == 3
+    assert parent['b'] == 2
+    assert 'a' in child
+    assert 'c' not in parent
+    assert child.get('d') is None
+    assert_raises(KeyError, lambda: child['d'])
+    assert dict(child.items()) == dict(a=1, b=3, c=4)
+    assert len(child) == 3
+
+    child.clear()
+    assert len(child) == 0
+    assert parent['a'] == 1
+
+
+def test_chained_dict_drop():
+    parent = ChainedDict()
+    parent['a'] = 1
+    parent['b'] = 2
+    child = ChainedDict(parent)
+    child['c'] = 3
+
+    child.drop(['a', 'c', 'd'])
+    assert dict(child.items()) == dict(b=2)
+    assert dict(parent.items()) == dict(a=1, b=2)
+    assert 'a' not in child
+    assert_raises(KeyError, lambda: child['a'])
+    assert child.get('a') is None
+    assert len(child) == 1
+
+    # entries of parents are not copied
+    assert dict.__len__(child) == 1
+
+    # removal is shared with forks
+    grandchild = ChainedDict(child.fork())
+    assert 'a' not in grandchild
+    grandchild['a'] = 5
+    assert grandchild['a'] == 5
+    assert 'a' not in child
+
+
+def test_ws_fork_share_data():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_in_port(0, "in", 0)
+    pg.add_out_port(0, "out", 1)
+
+    ws = WorkflowState(pg)
+    ws.store_param(0, "param", 0)
+    ws.store(1, "data")
+    ws.set_last_evaluation(0, 0)
+
+    fws = ws.fork()
+    assert fws.portgraph() is pg
+    assert fws.get(0) == "param"
+    assert fws.get(1) == "data"
+    assert fws.when(0) == 0
+    assert fws.last_evaluation(0) == 0
+    assert fws.is_ready_for_evaluation()
+
+
+def test_ws_fork_isolate_modifications():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_in_port(0, "in", 0)
+    pg.add_out_port(0, "out", 1)
+
+    ws = WorkflowState(pg)
+    ws.store_param(0, "param", 0)
+    ws.store(1, "data")
+
+    fws = ws.fork()
+    fws.store(1, "fork")
+    ws.store_param(0, "new", 1)
+    assert ws.get(1) == "data"
+    assert fws.get(1) == "fork"
+    assert fws.get(0) == "param"
+    assert fws.when(0) == 0
+
+    ffws = fws.fork()
+    ffws.store(1, "fork2")
+    assert fws.get(1) == "fork"
+
+    fws.clear()
+    assert_raises(KeyError, lambda: fws.get(1))
+    assert ws.get(1) == "data"
+    assert ffws.get(0) == "param"
+
+
+def test_ws_follow_portgraph_editions():
+    pg = PortGraph()
+    pg.add_vertex(0)
+    pg.add_out_port(0, "out", 0)
+    pg.add_vertex(1)
+    pg.add_in_port(1, "in", 1)
+
+    ws = WorkflowState(pg)
+    fws = ws.fork()
+    assert set(ws.missing_params()) == {1}
+
+    ws.store(0, "data")
+    ws.set_last_evaluation(0, 3)
+    pg.connect(0, 1)
+    assert ws.is_ready_for_evaluation()
+    assert fws.is_ready_for_evaluation()
+    assert ws.get(1) == "data"
+    assert ws.when(1) == 3
+
+    pg.add_vertex(2)
+    pg.add_in_port(2, "in", 2)
+    assert ws.last_evaluation(2) is None
+    assert set(ws.missing_params()) == {2}
+    ws.store_param(2, "param", 0)
+
+    pg.remove_vertex(2)
+    assert ws.is_ready_for_evaluation()
+
+    pg.remove_edge(tuple(pg.edges())[0])
+    assert set(ws.missing_params()) == {1}
+    assert_raises(KeyError, lambda: ws.get(1))
+
+    pg.add_vertex(2)
+    pg.add_in_port(2, "in", 2)
+    assert set(ws.missing_params()) == {1, 2}
+
+    pg.clear()
+    assert ws.is_ready_for_evaluation()
+
+
+def get_chain(actors):
+    pg = PortGraph()
+    for vid, actor in enumerate(actors):
+        pg.add_actor(actor, vid)
+        if vid > 0:
+            pg.connect(pg.out_port(vid - 1, 'y'), pg.in_port(vid, 'x'))
+
+    return pg
+
+
+def test_ws_rebase_keep_upstream_results():
+    evaluated = []
+
+    def func(x):
+        evaluated.append(x)
+        y = x + 1
+        return y
+
+    pg = get_chain([FuncNode(func), FuncNode(func)])
+    algo = LazyEvaluation(pg)
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 0, env.current_execution())
+    algo.eval(env, ws)
+    assert evaluated == [0, 1]
+
+    # add a display node at the end
+    vid = pg.add_actor(FuncNode(func))
+    pg.connect(pg.out_port(1, 'y'), pg.in_port(vid, 'x'))
+    assert not ws.portgraph_still_valid()
+    ws.rebase()
+    assert ws.portgraph_still_valid()
+
+    env.new_execution()
+    algo.eval(env, ws)
+    assert evaluated == [0, 1, 2]
+
+    # modify connection in the middle
+    eid, = pg.in_edges(1)
+    pg.remove_edge(eid)
+    pg.connect(pg.out_port(0, 'y'), pg.in_port(1, 'x'))
+    ws.rebase()
+    assert ws.last_evaluation(0) is not None
+    assert ws.last_evaluation(1) is None
+    assert ws.last_evaluation(vid) is None
+
+
+def test_ws_rebase_on_new_portgraph():
+    def func(x):
+        y = x
+        return y
+
+    actors = [FuncNode(func) for i in range(3)]
+    pg = get_chain(actors[:2])
+    pg2 = get_chain(actors[:2])
+    assert edited_vertices(pg, pg2) == set()
+
+    pg2 = get_chain([actors[0], actors[2]])
+    assert edited_vertices(pg, pg2) == {1}
+
+    ws = WorkflowState(pg)
+    ws.set_last_evaluation(0, 0)
+    ws.set_last_evaluation(1, 0)
+    ws.rebase(pg2)
+    assert ws.portgraph() is pg2
+    assert ws.last_evaluation(0) == 0
+    assert ws.last_evaluation(1) is None
+
+    # state follows editions of new portgraph only
+    pg.remove_vertex(0)
+    ws.rebase()
+    assert ws.last_evaluation(0) == 0
+
+
+def test_ws_rebase_drop_values_of_redefined_ports():
+    def inc(x):
+        y = x + 1
+        return y
+
+    def dbl(z):
+        w = z * 2
+        return w
+
+    pg = PortGraph()
+    pg.add_actor(FuncNode(inc), 0)
+    pid = pg.in_port(0, 'x')
+    pout = pg.out_port(0, 'y')
+
+    pg2 = PortGraph()
+    pg2.add_actor(FuncNode(dbl), 0)
+    assert pg2.in_port(0, 'z') == pid
+    assert pg2.out_port(0, 'w') == pout
+
+    ws = WorkflowState(pg)
+    ws.store_param(pid, 10, 0)
+    ws.store(pout, 11)
+    ws.rebase(pg2)
+    assert_raises(KeyError, lambda: ws.get(pid))
+    assert_raises(KeyError, lambda: ws.get(pout))
+    assert not ws.is_ready_for_evaluation()
+
+    # in place editions
+    ws = WorkflowState(pg)
+    ws.store_param(pid, 10, 0)
+    pg.remove_port(pid)
+    pg.add_in_port(0, 'z', pid)
+    ws.rebase()
+    assert_raises(KeyError, lambda: ws.get(pid))
+    assert not ws.is_ready_for_evaluation()
+
+
+def test_ws_survive_patch():
+    def func(x):
+        y = x
+        return y
+
+    actors = [FuncNode(func) for i in range(3)]
+    pg = get_chain(actors[:2])
+    pg2 = get_chain(actors[:2])
+    vid = pg2.add_actor(actors[2])
+    pg2.connect(pg2.out_port(1, 'y'), pg2.in_port(vid, 'x'))
+
+    ws = WorkflowState(pg)
+    ws.set_last_evaluation(0, 0)
+    ws.set_last_evaluation(1, 0)
+
+    pg.apply_patch(pg.diff(pg2))
+    ws.rebase()
+    assert ws.last_evaluation(0) == 0
+    assert ws.last_evaluation(1) == 0
+    assert ws.last_evaluation(vid) is None
+
+
+def test_ws_survive_add_actors():
+    def func(x):
+        y = x
+        return y
+
+    pg = get_chain([FuncNode(func) for i in range(2)])
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 1, 0)
+    ws.set_last_evaluation(0, 0)
+    ws.set_last_evaluation(1, 0)
+
+    vid, = pg.add_actors([FuncNode(func)])
+    assert ws.last_evaluation(0) == 0
+    assert ws.last_evaluation(vid) is None
+    assert not ws.is_ready_for_evaluation()
+    assert set(ws.missing_params()) == {pg.in_port(vid, 'x')}
+
+
+def test_ws_fork_many_times():
+    def func(x):
+        y = x + 1
+        return y
+
+    pg = get_chain([FuncNode(func), FuncNode(func)])
+    vid = pg.add_actor(FuncNode(func))
+    algo = LazyEvaluation(pg)
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'x'), 0, env.current_execution())
+    ws.store_param(pg.in_port(vid, 'x'), 0, env.current_execution())
+    algo.eval(env, ws)
+    first = ws.last_evaluation(vid)
+
+    for i in range(1100):
+        ws.store_param(pg.in_port(0, 'x'), i, env.new_execution())
+        algo.eval(env, ws)
+        fws = ws.fork()
+
+    assert ws.last_evaluation(vid) == first
+    assert ws.get(pg.out_port(1, 'y')) == 1101
+    assert fws.get(pg.out_port(1, 'y')) == 1101
+    assert ws._last_evaluation.depth() <= ChainedDict.max_depth + 1
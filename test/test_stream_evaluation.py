@@ -0,0 +1,126 @@
+from nose.tools import assert_raises
+
+from openalea.workflow.evaluation import BruteEvaluation, EvaluationError
+from openalea.workflow.evaluation_environment import EvaluationEnvironment
+from openalea.workflow.func_node import FuncNode
+from openalea.workflow.port_graph import PortGraph
+from openalea.workflow.state import WorkflowState
+from openalea.workflow.stream_evaluation import StreamEvaluation
+
+
+def chunks(txt, size):
+    for i in range(0, len(txt), size):
+        chunk = txt[i:i + size]
+        yield chunk
+
+
+def upper(chunk):
+    return chunk.upper()
+
+
+def count(nb):
+    for i in range(nb):
+        yield i, i * 2
+
+
+def join(a, b):
+    res = "%s%s" % (a, b)
+    return res
+
+
+def get_pg():
+    pg = PortGraph()
+    pg.add_actor(FuncNode(chunks), 0)
+    pg.add_actor(FuncNode(upper), 1)
+    pg.add_actor(FuncNode(join), 2)
+    pg.connect(pg.out_port(0, 'chunk'), pg.in_port(1, 'chunk'))
+    pg.connect(pg.out_port(1, 'res'), pg.in_port(2, 'a'))
+
+    return pg
+
+
+def get_state(pg):
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'txt'), "abcdefg", 0)
+    ws.store_param(pg.in_port(0, 'size'), 2, 0)
+    ws.store_param(pg.in_port(2, 'b'), "!", 0)
+
+    return ws
+
+
+def test_func_node_generator_outputs():
+    n = FuncNode(chunks)
+    assert n.is_streaming()
+    assert tuple(n.outputs()) == ('chunk',)
+    assert list(n(("abc", 2))) == [("ab",), ("c",)]
+
+    n = FuncNode(count)
+    assert tuple(n.outputs()) == ('i', 'res')
+    assert list(n((2,))) == [(0, 0), (1, 2)]
+
+    assert not FuncNode(upper).is_streaming()
+
+
+def test_stream_evaluation_pipeline_items():
+    pg = get_pg()
+    env = EvaluationEnvironment()
+    ws = get_state(pg)
+
+    algo = StreamEvaluation(pg, maxsize=1, collect=[pg.out_port(2, 'res')])
+    assert algo.streamed_vertices() == {0, 1, 2}
+    algo.eval(env, ws)
+
+    assert ws.get(pg.out_port(0, 'chunk')) == "g"
+    assert ws.get(pg.out_port(1, 'res')) == "G"
+    assert ws.get(pg.out_port(2, 'res')) == ["AB!", "CD!", "EF!", "G!"]
+    assert not algo.requires_evaluation(env, ws)
+
+
+def test_stream_evaluation_mix_with_regular_nodes():
+    def num(n):
+        return n
+
+    pg = get_pg()
+    vid = pg.add_actor(FuncNode(num))
+    pg.connect(pg.out_port(vid, 'n'), pg.in_port(0, 'size'))
+    vid2 = pg.add_actor(FuncNode(chunks))
+    pg.connect(pg.out_port(vid2, 'chunk'), pg.in_port(2, 'b'))
+
+    env = EvaluationEnvironment()
+    ws = WorkflowState(pg)
+    ws.store_param(pg.in_port(0, 'txt'), "abcdefg", 0)
+    ws.store_param(pg.in_port(vid, 'n'), 3, 0)
+    ws.store_param(pg.in_port(vid2, 'txt'), "xy", 0)
+    ws.store_param(pg.in_port(vid2, 'size'), 1, 0)
+
+    algo = StreamEvaluation(pg, collect=[pg.out_port(2, 'res')])
+    algo.eval(env, ws)
+
+    assert ws.get(pg.out_port(vid, 'n')) == 3
+    assert ws.get(pg.out_port(2, 'res')) == ["ABCx", "DEFy"]
+
+
+def test_stream_evaluation_propagate_errors():
+    def fail(chunk):
+        raise ValueError(chunk)
+
+    pg = get_pg()
+    pg.set_actor(1, None)
+    pg.remove_vertex(1)
+    vid = pg.add_actor(FuncNode(fail))
+    pg.connect(pg.out_port(0, 'chunk'), pg.in_port(vid, 'chunk'))
+
+    env = EvaluationEnvironment()
+    ws = get_state(pg)
+    ws.store_param(pg.in_port(2, 'a'), "a", 0)
+
+    algo = StreamEvaluation(pg, maxsize=1)
+    assert_raises(ValueError, lambda: algo.eval(env, ws))
+
+
+def test_brute_evaluation_refuses_streaming_nodes():
+    pg = get_pg()
+    env = EvaluationEnvironment()
+    ws = get_state(pg)
+
+    assert_raises(EvaluationError, lambda: BruteEvaluation(pg).eval(env, ws))